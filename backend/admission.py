@@ -0,0 +1,208 @@
+"""Engelleyici LLM/TTS işlerini sınırlı bir işçi havuzunda çalıştıran kabul kontrolü
+
+eventlet altında openai/ollama/torch çağrıları olay döngüsünü kilitler; tek
+bir yavaş üretim o işçideki tüm socket bağlantılarını (connect/disconnect
+dahil) bekletir. GenerationPool bu işleri gerçek OS thread'lerinde çalıştırır,
+sonuçları ise çağıranın greenlet'ine kısa aralıklarla uyuyarak (sleep)
+aktarır. Aynı anda en fazla max_concurrent üretim çalışır, en fazla max_queue
+iş bekler; kuyruk doluysa yeni işler Overloaded ile reddedilir.
+"""
+import math
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import jsonify
+
+import metrics
+
+GENERATION_WAIT_SECONDS = metrics.histogram('generation_queue_wait_seconds', 'İşin kuyrukta bekleme süresi', ['pool'])
+GENERATION_SECONDS = metrics.histogram('generation_job_seconds', 'Havuzdaki işin çalışma süresi', ['pool'])
+GENERATION_REJECTED = metrics.counter('generation_rejected_total', 'Kuyruk dolu olduğu için reddedilen işler', ['pool'])
+
+
+class Overloaded(Exception):
+    """Bekleme kuyruğu dolu; retry_after saniye sonra tekrar denenmeli"""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Sunucu yoğun, {retry_after} saniye sonra tekrar deneyin")
+        self.retry_after = retry_after
+
+
+def _once(fn):
+    yield fn()
+
+
+class Job:
+    """Havuza gönderilmiş tek iş; sonuçları results() ile okunur"""
+
+    def __init__(self, pool, iterable, timer=None):
+        self.pool = pool
+        self.iterable = iterable
+        self.timer = timer
+        self.items = queue.Queue()
+        self.cancelled = threading.Event()
+        self.started = False
+        self.submitted_at = time.monotonic()
+
+    @property
+    def position(self):
+        """Kuyruktaki sıra (1'den başlar); çalışıyorsa 0"""
+        return self.pool.position(self)
+
+    def results(self, on_position=None):
+        """İşin ürettiği öğeleri sırayla ver
+
+        Kuyrukta beklerken sıra değiştikçe on_position(position) çağrılır.
+        Okuma yarıda bırakılırsa (ör. istemci ayrıldı) iş iptal edilir.
+        """
+        last_position = None
+        try:
+            while True:
+                try:
+                    kind, value = self.items.get_nowait()
+                except queue.Empty:
+                    if on_position and not self.started:
+                        position = self.position
+                        if position and position != last_position:
+                            last_position = position
+                            on_position(position)
+                    self.pool.sleep(self.pool.poll_interval)
+                    continue
+
+                if kind == 'item':
+                    yield value
+                elif kind == 'error':
+                    raise value
+                else:
+                    return
+        finally:
+            self.cancelled.set()
+
+    def result(self, on_position=None):
+        """Tek sonuç üreten işlerin sonucunu döndür"""
+        for value in self.results(on_position):
+            return value
+
+
+class GenerationPool:
+    """Sınırlı eş zamanlılık ve sınırlı bekleme kuyruğu olan işçi havuzu"""
+
+    def __init__(self, max_concurrent=4, max_queue=16, sleep=time.sleep, poll_interval=0.01, name='generation'):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.sleep = sleep
+        self.poll_interval = poll_interval
+
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrent, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._waiting = deque()
+        self._active = 0
+
+        self.completed = 0
+        self.rejected = 0
+        self.avg_seconds = None
+
+    @classmethod
+    def from_env(cls, sleep=time.sleep):
+        """Ayarları ortam değişkenlerinden oku"""
+        return cls(
+            max_concurrent=int(os.getenv('GENERATION_MAX_CONCURRENT', 4)),
+            max_queue=int(os.getenv('GENERATION_MAX_QUEUE', 16)),
+            sleep=sleep
+        )
+
+    def submit(self, iterable, timer=None):
+        """İşi kuyruğa al; kuyruk doluysa Overloaded fırlat
+
+        iterable havuzdaki thread'de yinelenir (generator ise gövdesi orada
+        çalışır). timer (timing.PhaseTimer) verilirse kuyrukta bekleme süresi
+        'queue' aşamasına yazılır.
+        """
+        job = Job(self, iterable, timer)
+        with self._lock:
+            if self._active + len(self._waiting) >= self.max_concurrent + self.max_queue:
+                self.rejected += 1
+                GENERATION_REJECTED.inc(pool=self.name)
+                raise Overloaded(self._retry_after())
+            self._waiting.append(job)
+        self._executor.submit(self._run, job)
+        return job
+
+    def call(self, fn, on_position=None, timer=None):
+        """fn()'i havuzda çalıştırıp sonucunu döndür"""
+        return self.submit(_once(fn), timer).result(on_position)
+
+    def position(self, job):
+        with self._lock:
+            try:
+                return self._waiting.index(job) + 1
+            except ValueError:
+                return 0
+
+    def stats(self):
+        """Çalışan/bekleyen iş sayıları ve ortalama iş süresi"""
+        with self._lock:
+            return {
+                "active": self._active,
+                "waiting": len(self._waiting),
+                "max_concurrent": self.max_concurrent,
+                "max_queue": self.max_queue,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "avg_seconds": self.avg_seconds,
+                "retry_after": self._retry_after()
+            }
+
+    def _retry_after(self):
+        # Kuyruktaki işlerin ortalama sürede eriyeceği tahmini süre
+        avg = self.avg_seconds if self.avg_seconds is not None else 5.0
+        return max(1, math.ceil(avg * (len(self._waiting) + 1) / self.max_concurrent))
+
+    def _run(self, job):
+        with self._lock:
+            self._waiting.remove(job)
+            if job.cancelled.is_set():
+                return
+            self._active += 1
+        job.started = True
+
+        started = time.monotonic()
+        GENERATION_WAIT_SECONDS.observe(started - job.submitted_at, pool=self.name)
+        if job.timer is not None:
+            job.timer.add('queue', started - job.submitted_at)
+        iterator = iter(job.iterable)
+        try:
+            for item in iterator:
+                if job.cancelled.is_set():
+                    break
+                job.items.put(('item', item))
+            job.items.put(('end', None))
+        except Exception as e:
+            job.items.put(('error', e))
+        finally:
+            close = getattr(iterator, 'close', None)
+            if close:
+                close()
+            elapsed = time.monotonic() - started
+            GENERATION_SECONDS.observe(elapsed, pool=self.name)
+            with self._lock:
+                self._active -= 1
+                self.completed += 1
+                # Üstel hareketli ortalama
+                self.avg_seconds = elapsed if self.avg_seconds is None else 0.8 * self.avg_seconds + 0.2 * elapsed
+
+
+def overloaded_response(error):
+    """Kuyruk doluyken dönen 503 yanıtı"""
+    response = jsonify({
+        "error": "Sunucu yoğun, lütfen biraz sonra tekrar deneyin",
+        "retry_after": error.retry_after
+    })
+    response.status_code = 503
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
@@ -0,0 +1,166 @@
+"""Figür, normalize edilmiş soru, model ve örnekleme ayarlarına göre sohbet yanıtı önbelleği"""
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+from turkish_text import turkish_lower
+
+# Kesme işaretleri silinir ("İstanbul'u" == "İstanbulu"), diğer noktalama boşluğa döner
+APOSTROPHES_RE = re.compile(r"['’‘`´]")
+WHITESPACE_RE = re.compile(r'\s+')
+# Şapkalı harfler yazımda sıkça atlanır ("hâlâ" == "hala")
+CIRCUMFLEX_MAP = str.maketrans({'â': 'a', 'î': 'i', 'û': 'u'})
+
+
+def normalize_message(message):
+    """Aynı soruyu farklı yazımlardan bağımsız hale getir
+
+    Türkçe büyük/küçük harf kuralları (I/ı, İ/i) uygulanır, noktalama
+    kaldırılır ve boşluklar tek boşluğa indirilir.
+    """
+    text = turkish_lower(unicodedata.normalize('NFC', message)).translate(CIRCUMFLEX_MAP)
+    text = APOSTROPHES_RE.sub('', text)
+    text = ''.join(' ' if unicodedata.category(ch).startswith('P') else ch for ch in text)
+    return WHITESPACE_RE.sub(' ', text).strip()
+
+
+def answer_key(figure_id, message, model, sampling, history=()):
+    """Önbellek anahtarı: yanıtı belirleyen tüm alanlar
+
+    Sohbet geçmişi de yanıtı etkilediği için anahtara girer; pratikte
+    isabetler geçmişi olmayan (ilk) sorulardan gelir.
+    """
+    context = json.dumps(list(history), sort_keys=True, ensure_ascii=False) if history else ''
+    return (figure_id, normalize_message(message), model, json.dumps(sampling, sort_keys=True), context)
+
+
+class AnswerCache:
+    """TTL ve LRU tahliyeli, süreç içi yanıt önbelleği
+
+    Kayıtlar yalnızca yanıt metnini tutar; ses, aynı cümleler için TTS
+    önbelleğinden gelir. ANSWER_CACHE_DISABLED_FIGURES ile veya figürde
+    "cache_answers": False ile figür bazında kapatılabilir.
+    """
+
+    def __init__(self, max_entries=1000, ttl=3600, disabled_figures=()):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.disabled_figures = set(disabled_figures)
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+
+    @classmethod
+    def from_env(cls):
+        """Ayarları ortam değişkenlerinden oku"""
+        disabled = os.getenv('ANSWER_CACHE_DISABLED_FIGURES', '')
+        return cls(
+            max_entries=int(os.getenv('ANSWER_CACHE_MAX_ENTRIES', 1000)),
+            ttl=int(os.getenv('ANSWER_CACHE_TTL', 3600)),
+            disabled_figures=[figure_id.strip() for figure_id in disabled.split(',') if figure_id.strip()]
+        )
+
+    def enabled_for(self, figure_id, figure):
+        """Bu figürün yanıtları önbelleğe alınabilir mi?"""
+        return (
+            self.max_entries > 0
+            and figure_id not in self.disabled_figures
+            and figure.get('cache_answers', True)
+        )
+
+    def get(self, key):
+        """Süresi dolmamış kaydı döndür, yoksa None"""
+        now = time.monotonic()
+        with self._lock:
+            item = self._entries.get(key)
+            if item is not None and item[0] <= now:
+                del self._entries[key]
+                self.expirations += 1
+                item = None
+            if item is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def put(self, key, response):
+        """Yanıtı kaydet"""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stream(self, figure_id, figure, message, model, sampling, produce, history=()):
+        """produce() ile üretilecek yanıt akışını önbellek üzerinden geçir"""
+        key = None
+        if self.enabled_for(figure_id, figure):
+            key = answer_key(figure_id, message, model, sampling, history)
+        return CachedAnswer(self, key, produce)
+
+    def stats(self):
+        """İsabet/ıskalama sayaçları"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "expirations": self.expirations,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl
+            }
+
+
+class CachedAnswer:
+    """Yanıt parçalarını önbellekten ya da produce() akışından veren iterable
+
+    İsabet olursa kayıtlı metin tek parça olarak verilir. Iskalamada akış
+    olduğu gibi aktarılır ve yalnızca hatasız tamamlanırsa kaydedilir; yarıda
+    kalan, hata veren veya boş dönen üretimler önbelleğe girmez. Akış hangi
+    modelin yanıt verdiğini söylüyorsa (llm_backends.RoutedAnswer) yanıt
+    yalnızca yük devri olmadan, anahtardaki modelden ve önbelleğe alınabilir
+    bir arka uçtan geldiyse saklanır. cached alanı,
+    yinelemeye başlandıktan sonra yanıtın önbellekten gelip gelmediğini
+    söyler.
+    """
+
+    def __init__(self, cache, key, produce):
+        self.cache = cache
+        self.key = key
+        self.produce = produce
+        self.cached = False
+
+    def __iter__(self):
+        if self.key is not None:
+            response = self.cache.get(self.key)
+            if response is not None:
+                self.cached = True
+                yield response
+                return
+
+        parts = []
+        deltas = self.produce()
+        for delta in deltas:
+            parts.append(delta)
+            yield delta
+
+        response = ''.join(parts)
+        if self.key is not None and response.strip() and self._storable(deltas):
+            self.cache.put(self.key, response)
+
+    def _storable(self, deltas):
+        if not getattr(deltas, 'cacheable', True):
+            return False
+        model = getattr(deltas, 'model', None)
+        return model is None or model == self.key[2]
@@ -1,24 +1,48 @@
 from flask import Flask, request, jsonify, make_response
 from flask_cors import CORS
 from flask_socketio import SocketIO, emit
-from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity
-from werkzeug.security import generate_password_hash, check_password_hash
-from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
-import openai
+from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity, decode_token
+from sqlalchemy.exc import IntegrityError
+import hmac
 import os
 from dotenv import load_dotenv
-from gtts import gTTS
-import io
-import base64
 import json
 from datetime import datetime, timedelta
+from streaming import wants_stream, wants_sse, stream_response, serialize_phase
+from tts_pipeline import SpeechPipeline, batch_events, batch_texts, encode_segment, speak
+import tts
+from tts_cache import get_cache
+from audio_files import audio_url, send_audio, transcode_pool
+from audio_formats import get_transcoder
+from answer_cache import AnswerCache
+from conversation import ConversationStore
+from admission import GenerationPool, Overloaded, overloaded_response
+from llm_backends import LLMRouter, OpenAIBackend, OllamaBackend, StubBackend, build_backends
+import metrics
+from metrics import metrics_response
+import timing
+from timing import PhaseTimer, request_timer
+from profiler import admin_authorized, profile_request
+from figures import FigureRegistry, catalog_response
+from warmup import Warmup, prime_llm
+from auth import PasswordHasher, TokenCache
+from database import db, init_db, upgrade_schema
+from models import User, duplicate_field
+from leaderboard import LeaderboardIndex, load_standings
+from progress import ProgressBuffer, load_progress, parse_progress, progress_fields, save_progress
 
 # Environment variables yükle
 load_dotenv()
 
 app = Flask(__name__)
+app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', 'dev-secret-key')
+app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=int(os.getenv('JWT_ACCESS_TOKEN_HOURS', 24)))
+jwt = JWTManager(app)
+# Veritabanı: MSSQL'de bağlantı havuzu, SQLite'ta WAL (bkz. database.py)
+DATABASE_URL = init_db(app)
 CORS(app)
+# Her yanıtta aşama süreleri (Server-Timing)
+timing.init_app(app)
 socketio = SocketIO(app, cors_allowed_origins="*")
 
 # Demo kullanıcılar
@@ -61,28 +85,73 @@ DEMO_USERS = [
     }
 ]
 
-# Tarihi figürler ve kişilikleri
-HISTORICAL_FIGURES = {
-    "fatih_sultan_mehmet": {
-        "name": "Fatih Sultan Mehmet",
-        "personality": "Ben Fatih Sultan Mehmet. 1453'te İstanbul'u fetheden Osmanlı padişahıyım. Bilim, sanat ve strateji konularında konuşmayı severim. Sert ama adil bir liderim.",
-        "era": "15. yüzyıl",
-        "location": "İstanbul, Osmanlı İmparatorluğu"
-    },
-    "ataturk": {
-        "name": "Mustafa Kemal Atatürk",
-        "personality": "Ben Mustafa Kemal Atatürk. Türkiye Cumhuriyeti'nin kurucusu ve ilk cumhurbaşkanıyım. Modernleşme, eğitim ve bağımsızlık konularında tutkulu bir liderim.",
-        "era": "19-20. yüzyıl",
-        "location": "Ankara, Türkiye"
-    },
-    "napoleon": {
-        "name": "Napolyon Bonaparte",
-        "personality": "Ben Napolyon Bonaparte. Fransız İmparatoru ve büyük bir askeri dehayım. Strateji, savaş ve yönetim konularında uzmanım.",
-        "era": "18-19. yüzyıl",
-        "location": "Paris, Fransa"
+# Girişte listeyi taramamak için e-posta ve kullanıcı adına göre dizin
+DEMO_USERS_BY_EMAIL = {user['email'].lower(): user for user in DEMO_USERS}
+DEMO_USERS_BY_USERNAME = {user['username']: user for user in DEMO_USERS}
+
+def demo_user_profile(demo_user):
+    """Demo kullanıcının istemciye dönen profili"""
+    return {
+        'id': f"demo_{demo_user['username']}",
+        'username': demo_user['username'],
+        'email': demo_user['email'],
+        'fullName': demo_user['full_name'],
+        'level': demo_user['level'],
+        'experience': demo_user['experience'],
+        'coins': demo_user['coins'],
+        'gems': demo_user['gems'],
+        'currentStreak': demo_user['current_streak'],
+        'longestStreak': demo_user['longest_streak'],
+        'createdAt': datetime.utcnow().isoformat(),
+        'lastLogin': datetime.utcnow().isoformat()
     }
+
+# Parola özetleme/doğrulama sınırlı işçi havuzunda; olay döngüsünü kilitlemez
+password_hasher = PasswordHasher.from_env(sleep=socketio.sleep)
+
+# Socket bağlantılarında aynı token'ın imzası her seferinde doğrulanmaz
+token_cache = TokenCache.from_env(decode_token)
+
+def write_progress(batch):
+    """İlerleme tamponunun yazıcı thread'inden toplu kayıt"""
+    with app.app_context():
+        return save_progress(batch)
+
+# İlerleme güncellemeleri birleştirilip periyodik olarak toplu yazılır
+progress_buffer = ProgressBuffer.from_env(write_progress).start()
+
+def load_leaderboard():
+    """Sıralama tablolarının yeniden kurulumu: veritabanı + demo kullanıcılar"""
+    # Tamponda bekleyen ilerlemeler de okunacak anlık görüntüye girsin
+    progress_buffer.flush()
+    with app.app_context():
+        users, figures = load_standings()
+    users.extend(
+        (f"demo_{demo_user['username']}", demo_user['experience'], None,
+         {"username": demo_user['username'], "fullName": demo_user['full_name']})
+        for demo_user in DEMO_USERS
+    )
+    return users, figures
+
+# Genel, sınıf ve figür sıralamaları; profil ve ilerleme yazımlarıyla güncellenir
+leaderboard = LeaderboardIndex.from_env().start(load_leaderboard)
+
+# Tarihi figürler ve kişilikleri: data/figures.json, dosya değişince yeniden yüklenir
+HISTORICAL_FIGURES = FigureRegistry.from_env().start()
+
+# Model konfigürasyonu
+MODEL_CONFIG = {
+    "model_name": "gpt-3.5-turbo",
+    "max_tokens": 500,
+    "temperature": 0.7
 }
 
+# Aynı figüre sorulan aynı soruların yanıtları
+answer_cache = AnswerCache.from_env()
+
+# Kullanıcı + figür başına sohbet hafızası
+conversations = ConversationStore.from_env()
+
 @app.route('/')
 def home():
     return jsonify({
@@ -103,39 +172,61 @@ def register():
         if not data.get('username') or not data.get('email') or not data.get('password') or not data.get('fullName'):
             return jsonify({"error": "Tüm alanlar gerekli"}), 400
         
-        # Kullanıcı zaten var mı kontrol et
-        if User.query.filter_by(email=data['email']).first():
-            return jsonify({"error": "Bu e-posta adresi zaten kullanılıyor"}), 400
+        timer = request_timer()
+        
+        with timer.phase('hash'):
+            password_hash = password_hasher.hash(data['password'])
         
-        if User.query.filter_by(username=data['username']).first():
-            return jsonify({"error": "Bu kullanıcı adı zaten kullanılıyor"}), 400
+        class_code = (data.get('classCode') or '').strip()[:32] or None
         
         # Yeni kullanıcı oluştur
         user = User(
-            username=data['username'],
-            email=data['email'],
-            password_hash=generate_password_hash(data['password']),
+            username=data['username'].strip(),
+            email=data['email'].strip().lower(),
+            password_hash=password_hash,
             full_name=data['fullName'],
             level=1,
             experience=0,
             coins=100,
             gems=10,
             current_streak=0,
-            longest_streak=0
+            longest_streak=0,
+            class_code=class_code
         )
         
-        db.session.add(user)
-        db.session.commit()
+        # Önceden sorgulamadan tek INSERT; çakışmayı benzersiz indeksler yakalar
+        with timer.phase('db'):
+            db.session.add(user)
+            try:
+                db.session.flush()
+            except IntegrityError as e:
+                db.session.rollback()
+                field = duplicate_field(e)
+                if field == 'email':
+                    return jsonify({"error": "Bu e-posta adresi zaten kullanılıyor"}), 400
+                if field == 'username':
+                    return jsonify({"error": "Bu kullanıcı adı zaten kullanılıyor"}), 400
+                raise
+            # commit nesneyi bayatlatır; profili okumak için yeni SELECT olmasın
+            user_id = user.id
+            profile = user.to_dict()
+            db.session.commit()
+        leaderboard.update_user(user_id, profile['experience'], class_code, profile)
         
         # Token oluştur
-        access_token = create_access_token(identity=user.id)
+        with timer.phase('token'):
+            access_token = create_access_token(identity=user_id)
         
-        return jsonify({
-            "message": "Kayıt başarılı",
-            "access_token": access_token,
-            "user": user.to_dict()
-        }), 201
+        with serialize_phase(timer):
+            response = jsonify({
+                "message": "Kayıt başarılı",
+                "access_token": access_token,
+                "user": profile
+            })
+        return response, 201
         
+    except Overloaded as e:
+        return overloaded_response(e)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -143,71 +234,69 @@ def register():
 def login():
     try:
         data = request.get_json()
-        print(f"🔍 Login attempt - Data: {data}")
-        
-        email = data.get('email')
+        email = (data.get('email') or '').strip()
         password = data.get('password')
         
-        print(f"📧 Email: {email}")
-        print(f"🔐 Password: {password}")
-        
         if not email or not password:
-            print("❌ Email veya password eksik")
             return jsonify({"error": "E-posta ve şifre gerekli"}), 400
         
-        # Demo kullanıcıları kontrol et
-        print(f"📋 Available demo users: {[user['email'] for user in DEMO_USERS]}")
-        demo_user = next((user for user in DEMO_USERS if user['email'] == email), None)
-        print(f"👤 Demo user found: {demo_user is not None}")
-        
-        if demo_user:
-            print(f"🔐 Password match: {demo_user['password'] == password}")
-            print(f"📧 Demo user email: {demo_user['email']}")
-            print(f"🔑 Demo user password: {demo_user['password']}")
+        timer = request_timer()
         
-        if demo_user and demo_user['password'] == password:
+        # Demo kullanıcıları kontrol et (bellekte, e-postaya göre dizinli)
+        demo_user = DEMO_USERS_BY_EMAIL.get(email.lower())
+        if demo_user and hmac.compare_digest(demo_user['password'].encode(), password.encode()):
             # Demo kullanıcı için token oluştur
-            access_token = create_access_token(identity=f"demo_{demo_user['username']}")
+            with timer.phase('token'):
+                access_token = create_access_token(identity=f"demo_{demo_user['username']}")
             return jsonify({
                 "message": "Demo giriş başarılı",
                 "access_token": access_token,
-                "user": {
-                    'id': f"demo_{demo_user['username']}",
-                    'username': demo_user['username'],
-                    'email': demo_user['email'],
-                    'fullName': demo_user['full_name'],
-                    'level': demo_user['level'],
-                    'experience': demo_user['experience'],
-                    'coins': demo_user['coins'],
-                    'gems': demo_user['gems'],
-                    'currentStreak': demo_user['current_streak'],
-                    'longestStreak': demo_user['longest_streak'],
-                    'createdAt': datetime.utcnow().isoformat(),
-                    'lastLogin': datetime.utcnow().isoformat()
-                }
+                "user": demo_user_profile(demo_user)
             })
         
-        # Gerçek kullanıcıları kontrol et
-        user = User.query.filter_by(email=email).first()
-        if user and check_password_hash(user.password_hash, password):
-            # Son giriş tarihini güncelle
+        # Gerçek kullanıcıları kontrol et; parola doğrulama işçi havuzunda
+        with timer.phase('db'):
+            user = User.query.filter_by(email=email.lower()).first()
+        password_ok = False
+        if user:
+            with timer.phase('hash'):
+                password_ok = password_hasher.verify(user.password_hash, password)
+        if password_ok:
+            # Son giriş tarihini güncelle; özet maliyeti değiştiyse parolayı yeniden özetle
             user.last_login = datetime.utcnow()
-            db.session.commit()
+            if password_hasher.needs_rehash(user.password_hash):
+                with timer.phase('hash'):
+                    user.password_hash = password_hasher.hash(password)
+            user_id = user.id
+            profile = user.to_dict()
+            with timer.phase('db'):
+                db.session.commit()
             
             # Token oluştur
-            access_token = create_access_token(identity=user.id)
+            with timer.phase('token'):
+                access_token = create_access_token(identity=user_id)
             
             return jsonify({
                 "message": "Giriş başarılı",
                 "access_token": access_token,
-                "user": user.to_dict()
+                "user": profile
             })
         
         return jsonify({"error": "Geçersiz e-posta veya şifre"}), 401
         
+    except Overloaded as e:
+        return overloaded_response(e)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/auth/stats', methods=['GET'])
+def auth_stats():
+    """Parola havuzu doluluğu ve token önbelleği isabet oranı"""
+    return jsonify({
+        "password_hasher": password_hasher.stats(),
+        "token_cache": token_cache.stats()
+    })
+
 @app.route('/api/auth/profile', methods=['GET'])
 @jwt_required()
 def get_profile():
@@ -217,25 +306,12 @@ def get_profile():
         # Demo kullanıcı kontrolü
         if str(user_id).startswith('demo_'):
             username = str(user_id).replace('demo_', '')
-            demo_user = next((user for user in DEMO_USERS if user['username'] == username), None)
+            demo_user = DEMO_USERS_BY_USERNAME.get(username)
             if demo_user:
-                return jsonify({
-                    'id': f"demo_{demo_user['username']}",
-                    'username': demo_user['username'],
-                    'email': demo_user['email'],
-                    'fullName': demo_user['full_name'],
-                    'level': demo_user['level'],
-                    'experience': demo_user['experience'],
-                    'coins': demo_user['coins'],
-                    'gems': demo_user['gems'],
-                    'currentStreak': demo_user['current_streak'],
-                    'longestStreak': demo_user['longest_streak'],
-                    'createdAt': datetime.utcnow().isoformat(),
-                    'lastLogin': datetime.utcnow().isoformat()
-                })
+                return jsonify(demo_user_profile(demo_user))
         
         # Gerçek kullanıcı
-        user = User.query.get(user_id)
+        user = db.session.get(User, user_id)
         if not user:
             return jsonify({"error": "Kullanıcı bulunamadı"}), 404
         
@@ -255,7 +331,7 @@ def update_profile():
         if str(user_id).startswith('demo_'):
             return jsonify({"error": "Demo kullanıcılar profil güncelleyemez"}), 403
         
-        user = User.query.get(user_id)
+        user = db.session.get(User, user_id)
         if not user:
             return jsonify({"error": "Kullanıcı bulunamadı"}), 404
         
@@ -274,12 +350,16 @@ def update_profile():
             user.current_streak = data['currentStreak']
         if 'longestStreak' in data:
             user.longest_streak = data['longestStreak']
+        if 'classCode' in data:
+            user.class_code = (data['classCode'] or '').strip()[:32] or None
         
+        profile = user.to_dict()
         db.session.commit()
+        leaderboard.update_user(user.id, user.experience, user.class_code, profile)
         
         return jsonify({
             "message": "Profil güncellendi",
-            "user": user.to_dict()
+            "user": profile
         })
         
     except Exception as e:
@@ -287,8 +367,102 @@ def update_profile():
 
 @app.route('/api/figures', methods=['GET'])
 def get_figures():
-    """Mevcut tarihi figürleri listele"""
-    return jsonify(HISTORICAL_FIGURES)
+    """Mevcut tarihi figürleri listele (önceden hazırlanmış gövde, ETag ile 304)"""
+    return catalog_response(HISTORICAL_FIGURES, request)
+
+def build_messages(figure, message, history=()):
+    """LLM için sistem + önceki konuşma + kullanıcı mesajlarını hazırla"""
+    return [
+        {
+            "role": "system", 
+            "content": f"Sen {figure['name']}sın. {figure['personality']} Tarihi gerçeklere dayalı olarak yanıt ver. Türkçe konuş."
+        },
+        *history,
+        {
+            "role": "user", 
+            "content": message
+        }
+    ]
+
+# LLM arka uçları (LLM_BACKENDS=openai,ollama gibi); istek en hızlı
+# sağlıklı arka uca gider, hata olursa sıradakine geçilir
+llm_router = LLMRouter.from_env(build_backends(os.getenv('LLM_BACKENDS') or 'openai', {
+    'openai': lambda: OpenAIBackend(build_messages, MODEL_CONFIG),
+    'ollama': lambda: OllamaBackend.from_env(build_messages),
+    'stub': StubBackend
+}))
+
+# Engelleyici LLM/TTS çağrıları olay döngüsü dışında, sınırlı sayıda çalışır
+generation_pool = GenerationPool.from_env(sleep=socketio.sleep)
+# Ses biçimi dönüştürme (ffmpeg) LLM işleriyle aynı kuyruğu paylaşmaz
+audio_pool = transcode_pool(sleep=socketio.sleep)
+
+def conversation_owner(identity, session_id=None):
+    """Sohbet hafızasının anahtarı: doğrulanmış kullanıcı + istemcinin oturum alt anahtarı
+
+    session_id yalnızca kullanıcının kendi sohbetlerini ayırır; başka bir
+    kullanıcının session_id'sini göndermek onun hafızasına erişim vermez.
+    """
+    if identity is None:
+        return None
+    return (identity, session_id or 'default')
+
+def answer_deltas(figure_id, figure, message, history=()):
+    """Yanıt parçalarını önce yanıt önbelleğinden, yoksa LLM arka uçlarından al"""
+    sampling = {
+        "max_tokens": MODEL_CONFIG["max_tokens"],
+        "temperature": MODEL_CONFIG["temperature"]
+    }
+    return answer_cache.stream(
+        figure_id, figure, message, llm_router.preferred_model(), sampling,
+        lambda: llm_router.stream(figure, message, history, figure_id),
+        history
+    )
+
+def synthesize_audio_url(text, engine=None):
+    """Metni seçilen TTS motoruyla sese çevir; (indirme yolu, sesi üreten motor) döndür"""
+    key, _, used = tts.synthesize_with_key(text, engine=engine)
+    return audio_url(key), used
+
+def timed_speech(timer, answer, engine=None):
+    """Yanıt akışını seslendirme hattından geçir; llm ve tts sürelerini ölç"""
+    pipeline = SpeechPipeline(timer.wrap('tts', tts.synthesizer(engine)))
+    return pipeline.run(timer.stream('llm', answer, first='llm_first_chunk'))
+
+def stream_chat_events(figure_id, figure, message, owner=None, timer=None, engine=None):
+    """HTTP akışı için chunk ve ses parçası olaylarını, en sonda tam metni üret
+
+    Cümleler tamamlandıkça seslendirilir; istemci ilk ses parçasını model
+    yazmaya devam ederken çalabilir.
+    """
+    timer = timer or PhaseTimer()
+    parts = []
+    engines = []
+    try:
+        history = conversations.history(owner, figure_id)
+        answer = answer_deltas(figure_id, figure, message, history)
+        for event, payload in timed_speech(timer, answer, engine):
+            if event == 'chunk':
+                parts.append(payload['delta'])
+            else:
+                engines.append(payload['engine'])
+                payload = encode_segment(payload)
+            yield event, payload
+        
+        ai_response = ''.join(parts)
+        conversations.record(owner, figure_id, figure['name'], message, ai_response)
+        
+        yield 'done', {
+            "response": ai_response,
+            "figure_name": figure['name'],
+            "audio_segments": len(engines),
+            "tts_engine": tts.engines_label(engines),
+            "cached": answer.cached,
+            "timings": timer.as_dict(),
+            "timestamp": datetime.now().isoformat()
+        }
+    except Exception as e:
+        yield 'error', {"error": str(e)}
 
 @app.route('/api/chat', methods=['POST'])
 @jwt_required()
@@ -307,39 +481,41 @@ def chat():
         
         figure = HISTORICAL_FIGURES[figure_id]
         
-        # OpenAI ile yanıt oluştur
-        response = openai.ChatCompletion.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {
-                    "role": "system", 
-                    "content": f"Sen {figure['name']}sın. {figure['personality']} Tarihi gerçeklere dayalı olarak yanıt ver. Türkçe konuş."
-                },
-                {
-                    "role": "user", 
-                    "content": message
-                }
-            ],
-            max_tokens=500,
-            temperature=0.7
+        try:
+            engine = tts.resolve_engine(data.get('tts_engine'))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        # Sohbet hafızası kullanıcıya, onun içinde istemcinin oturumuna bağlıdır
+        owner = conversation_owner(get_jwt_identity(), data.get('session_id'))
+        timer = request_timer()
+        
+        # Akış modu: token'lar üretildikçe gönderilir
+        if wants_stream(request, data):
+            job = generation_pool.submit(stream_chat_events(figure_id, figure, message, owner, timer, engine), timer)
+            return stream_response(job.results(), sse=wants_sse(request))
+        
+        # LLM ile yanıt oluştur; cümleler üretildikçe seslendirilir
+        answer = answer_deltas(figure_id, figure, message, conversations.history(owner, figure_id))
+        ai_response, audio_key, used_engine = generation_pool.call(
+            lambda: speak(timer.stream('llm', answer, first='llm_first_chunk'), timer.wrap('tts', tts.synthesizer(engine))),
+            timer=timer
         )
+        conversations.record(owner, figure_id, figure['name'], message, ai_response)
+        
+        with serialize_phase(timer):
+            response = jsonify({
+                "response": ai_response,
+                "figure_name": figure['name'],
+                "audio_url": audio_url(audio_key),
+                "tts_engine": used_engine,
+                "cached": answer.cached,
+                "timestamp": datetime.now().isoformat()
+            })
+        return response
         
-        ai_response = response.choices[0].message.content
-        
-        # TTS ile ses dosyası oluştur
-        tts = gTTS(text=ai_response, lang='tr', slow=False)
-        audio_buffer = io.BytesIO()
-        tts.write_to_fp(audio_buffer)
-        audio_buffer.seek(0)
-        audio_base64 = base64.b64encode(audio_buffer.read()).decode()
-        
-        return jsonify({
-            "response": ai_response,
-            "figure_name": figure['name'],
-            "audio": audio_base64,
-            "timestamp": datetime.now().isoformat()
-        })
-        
+    except Overloaded as e:
+        return overloaded_response(e)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -350,12 +526,29 @@ def get_progress(figure_id):
     """Kullanıcının belirli bir figür için ilerlemesini getir"""
     try:
         user_id = get_jwt_identity()
-        # Bu endpoint'te ilerleme verilerini localStorage'dan alacak frontend
-        # Backend'de ilerleme verilerini saklamak için gelecekte Progress modeli eklenebilir
+        
+        # Demo kullanıcıların ilerlemesi frontend'de saklanır
+        if str(user_id).startswith('demo_'):
+            return jsonify({
+                "message": "Demo kullanıcı ilerlemesi frontend'de saklanıyor",
+                "user_id": str(user_id),
+                "figure_id": figure_id,
+                "progress": None
+            })
+        
+        if figure_id not in HISTORICAL_FIGURES:
+            return jsonify({"error": "Geçersiz figür ID'si"}), 400
+        
+        user_id = int(user_id)
+        with request_timer().phase('db'):
+            progress = load_progress(user_id, figure_id)
+        # Henüz yazılmamış güncellemeler de görünsün
+        progress.update(progress_fields(progress_buffer.pending(user_id, figure_id)))
+        
         return jsonify({
-            "message": "İlerleme verileri frontend'de saklanıyor",
             "user_id": str(user_id),
-            "figure_id": figure_id
+            "figure_id": figure_id,
+            "progress": progress
         })
         
     except Exception as e:
@@ -364,27 +557,79 @@ def get_progress(figure_id):
 @app.route('/api/progress/<figure_id>/update', methods=['POST'])
 @jwt_required()
 def update_progress(figure_id):
-    """Kullanıcının ilerlemesini güncelle"""
+    """Kullanıcının ilerlemesini güncelle (tampona alınır, toplu yazılır)"""
     try:
         user_id = get_jwt_identity()
-        data = request.get_json()
+        data = request.get_json() or {}
         
         # Demo kullanıcılar için güncelleme yok
         if str(user_id).startswith('demo_'):
             return jsonify({"message": "Demo kullanıcı ilerlemesi güncellenemez"}), 200
         
-        # Gerçek kullanıcılar için ilerleme güncelleme
-        # Bu endpoint'te gelecekte Progress modeli ile veritabanında saklanacak
+        if figure_id not in HISTORICAL_FIGURES:
+            return jsonify({"error": "Geçersiz figür ID'si"}), 400
+        
+        try:
+            columns = parse_progress(data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        if not columns:
+            return jsonify({"error": "Güncellenecek ilerleme alanı yok"}), 400
+        
+        progress_buffer.update(int(user_id), figure_id, columns)
+        if 'experience' in columns:
+            leaderboard.update_figure(int(user_id), figure_id, columns['experience'])
+        
         return jsonify({
             "message": "İlerleme güncellendi",
             "user_id": str(user_id),
             "figure_id": figure_id,
-            "data": data
-        })
+            "data": progress_fields(columns)
+        }), 202
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/progress/stats', methods=['GET'])
+def progress_stats():
+    """İlerleme tamponu: bekleyen, birleştirilen ve yazılan güncellemeler"""
+    return jsonify(progress_buffer.stats())
+
+# Leaderboard endpoints
+def leaderboard_response(scope):
+    """?limit=50&offset=0; giriş yapılmışsa kullanıcının kendi sırası da döner"""
+    try:
+        limit = min(max(int(request.args.get('limit', 50)), 1), 100)
+        offset = max(int(request.args.get('offset', 0)), 0)
+    except ValueError:
+        return jsonify({"error": "limit ve offset tamsayı olmalı"}), 400
+    return jsonify(leaderboard.standings(scope, limit, offset, member=get_jwt_identity()))
+
+@app.route('/api/leaderboard', methods=['GET'])
+@jwt_required(optional=True)
+def get_leaderboard():
+    """Genel sıralama (deneyim puanı)"""
+    return leaderboard_response('global')
+
+@app.route('/api/leaderboard/class/<class_code>', methods=['GET'])
+@jwt_required(optional=True)
+def get_class_leaderboard(class_code):
+    """Sınıf içi sıralama"""
+    return leaderboard_response(f"class:{class_code}")
+
+@app.route('/api/leaderboard/figure/<figure_id>', methods=['GET'])
+@jwt_required(optional=True)
+def get_figure_leaderboard(figure_id):
+    """Figür bazında ilerleme sıralaması"""
+    if figure_id not in HISTORICAL_FIGURES:
+        return jsonify({"error": "Geçersiz figür ID'si"}), 400
+    return leaderboard_response(f"figure:{figure_id}")
+
+@app.route('/api/leaderboard/stats', methods=['GET'])
+def leaderboard_stats():
+    """Tablo boyutları ve son yeniden kurulum"""
+    return jsonify(leaderboard.stats())
+
 @app.route('/api/tts', methods=['POST'])
 def text_to_speech():
     """Metni sese çevir"""
@@ -395,38 +640,182 @@ def text_to_speech():
         if not text:
             return jsonify({"error": "text gerekli"}), 400
         
-        tts = gTTS(text=text, lang='tr', slow=False)
-        audio_buffer = io.BytesIO()
-        tts.write_to_fp(audio_buffer)
-        audio_buffer.seek(0)
-        audio_base64 = base64.b64encode(audio_buffer.read()).decode()
+        try:
+            engine = tts.resolve_engine(data.get('engine'))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         
-        return jsonify({
-            "audio": audio_base64,
-            "timestamp": datetime.now().isoformat()
-        })
+        timer = request_timer()
+        response_audio_url, used_engine = generation_pool.call(timer.wrap('tts', lambda: synthesize_audio_url(text, engine)), timer=timer)
+        
+        with serialize_phase(timer):
+            response = jsonify({
+                "audio_url": response_audio_url,
+                "tts_engine": used_engine,
+                "timestamp": datetime.now().isoformat()
+            })
+        return response
         
+    except Overloaded as e:
+        return overloaded_response(e)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/tts/batch', methods=['POST'])
+def text_to_speech_batch():
+    """Metin listesini tek istekte seslendir; aynı metinler bir kez seslendirilir
+
+    Sonuçlar girdi sırasıyla döner: akış modunda (stream veya Accept: NDJSON/SSE)
+    her öğe hazır olunca, aksi halde hepsi tek JSON yanıtta.
+    """
+    try:
+        data = request.get_json() or {}
+        
+        try:
+            texts = batch_texts(data.get('texts'))
+            engine = tts.resolve_engine(data.get('engine'))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        timer = request_timer()
+        events = batch_events(texts, timer.wrap('tts', tts.synthesizer(engine)))
+        
+        if wants_stream(request, data):
+            job = generation_pool.submit(events, timer)
+            return stream_response(job.results(), sse=wants_sse(request))
+        
+        results = generation_pool.call(lambda: list(events), timer=timer)
+        
+        with serialize_phase(timer):
+            response = jsonify(dict(
+                results[-1][1],
+                items=[payload for event, payload in results if event == 'item'],
+                timestamp=datetime.now().isoformat()
+            ))
+        return response
+        
+    except Overloaded as e:
+        return overloaded_response(e)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/tts/engines', methods=['GET'])
+def tts_engines():
+    """Kullanılabilir TTS motorları, varsayılan ve yedek motor"""
+    return jsonify(tts.engines_info())
+
+@app.route('/api/audio/<audio_hash>', methods=['GET'])
+def get_audio(audio_hash):
+    """Seslendirilmiş sesi ikili olarak gönder (ETag, Range, önbellek başlıkları)
+
+    ?format=ogg|webm|mp3&bitrate=24k veya Accept başlığıyla daha küçük biçim istenebilir.
+    """
+    return send_audio(audio_hash, request, audio_pool)
+
+@app.route('/api/audio/formats', methods=['GET'])
+def audio_format_stats():
+    """Biçim başına konuşma saniyesi başına bayt ve dönüştürme önbelleği"""
+    return jsonify(dict(get_transcoder().stats(), pool=audio_pool.stats()))
+
+@app.route('/api/tts/stats', methods=['GET'])
+def tts_stats():
+    """TTS önbellek isabet/ıskalama istatistikleri"""
+    return jsonify(get_cache().stats())
+
+@app.route('/api/chat/stats', methods=['GET'])
+def chat_stats():
+    """Yanıt önbelleği isabet/ıskalama istatistikleri"""
+    return jsonify(answer_cache.stats())
+
+@app.route('/api/conversation/<figure_id>', methods=['DELETE'])
+@jwt_required()
+def clear_conversation(figure_id):
+    """Figürle olan sohbet hafızasını sil (yeni sohbet)"""
+    owner = conversation_owner(get_jwt_identity(), request.args.get('session_id'))
+    conversations.clear(owner, figure_id)
+    return jsonify({"message": "Sohbet geçmişi silindi"})
+
+@app.route('/api/conversation/stats', methods=['GET'])
+def conversation_stats():
+    """Sohbet hafızası oturum ve tahliye sayaçları"""
+    return jsonify(conversations.stats())
+
+@app.route('/api/generation/stats', methods=['GET'])
+def generation_stats():
+    """Üretim havuzunun doluluk ve kuyruk durumu"""
+    return jsonify(generation_pool.stats())
+
+@app.route('/api/llm/backends', methods=['GET'])
+def get_llm_backends():
+    """LLM arka uçlarının gecikme, hata oranı ve sağlık durumu"""
+    return jsonify(llm_router.stats())
+
+# /metrics: anlık değerler kazıma (scrape) sırasında okunur
+metrics.gauge('generation_active', 'Çalışan üretim işleri', fn=lambda: generation_pool.stats()['active'])
+metrics.gauge('generation_queue_depth', 'Kuyrukta bekleyen üretim işleri', fn=lambda: generation_pool.stats()['waiting'])
+metrics.counter('cache_lookups_total', 'Önbellek aramaları', ['cache', 'result'], fn=lambda: {
+    ('answer', 'hit'): answer_cache.hits,
+    ('answer', 'miss'): answer_cache.misses,
+    ('tts', 'memory_hit'): get_cache().memory_hits,
+    ('tts', 'disk_hit'): get_cache().disk_hits,
+    ('tts', 'miss'): get_cache().misses
+})
+metrics.gauge('cache_hit_ratio', 'Önbellek isabet oranı', ['cache'], fn=lambda: {
+    ('answer',): answer_cache.stats()['hit_ratio'],
+    ('tts',): get_cache().stats()['hit_ratio']
+})
+metrics.gauge('conversation_sessions', 'Bellekteki sohbet oturumları', fn=lambda: conversations.stats()['sessions'])
+metrics.gauge('progress_pending', 'Tamponda yazılmayı bekleyen ilerleme kayıtları', fn=lambda: progress_buffer.stats()['pending'])
+metrics.counter('progress_updates_total', 'İlerleme güncellemeleri', ['result'], fn=lambda: {
+    ('coalesced',): progress_buffer.coalesced,
+    ('buffered',): progress_buffer.updates - progress_buffer.coalesced
+})
+SOCKET_CONNECTIONS = metrics.gauge('socket_connections', 'Açık socket bağlantıları')
+SOCKET_CONNECTS = metrics.counter('socket_connects_total', 'Kabul edilen socket bağlantıları')
+# Bağlantı -> bağlanırken doğrulanan token'ın kimliği
+socket_identities = {}
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus metin biçiminde metrikler"""
+    return metrics_response()
+
+@app.route('/api/admin/profile', methods=['POST'])
+def admin_profile():
+    """Canlı süreçte örnekleyici profil (X-Admin-Token gerekli); flamegraph için collapsed yığınlar"""
+    return profile_request(request, sleep=socketio.sleep)
+
+@app.route('/api/admin/figures/reload', methods=['POST'])
+def admin_reload_figures():
+    """Figür dosyasını beklemeden yeniden yükle (X-Admin-Token gerekli)"""
+    if not admin_authorized(request):
+        return jsonify({"error": "Yetkisiz"}), 403
+    changed = HISTORICAL_FIGURES.reload()
+    return jsonify(dict(HISTORICAL_FIGURES.stats(), changed=changed))
+
 @socketio.on('connect')
 def handle_connect(auth=None):
-    """WebSocket bağlantısı - JWT token kontrolü"""
+    """WebSocket bağlantısı - JWT token kontrolü (doğrulanan token'lar önbellekte)"""
+    token = auth.get('token') if auth else None
+    if not token:
+        print('Token olmadan bağlantı denemesi')
+        emit('auth_error', {'message': 'Token gerekli'})
+        return False
     try:
-        if auth and auth.get('token'):
-            # JWT token doğrulama (basit bir kontrol)
-            print(f'Kullanıcı bağlandı: {auth.get("token")}')
-            emit('connected', {'message': 'Sunucuya başarıyla bağlandınız'}) # Bu satır token başarılıysa çalışmalı
-        else:
-            print('Token olmadan bağlantı denemesi')
-            emit('auth_error', {'message': 'Token gerekli'})
-            return False
-    except Exception as e:
-        print(f'Bağlantı hatası: {e}')
-        emit('error', {'message': 'Bağlantı hatası'})
+        identity = token_cache.verify(token)
+    except Exception:
+        emit('auth_error', {'message': 'Geçersiz veya süresi dolmuş token'})
         return False
+    socket_identities[request.sid] = identity
+    print(f'Kullanıcı bağlandı: {identity}')
+    SOCKET_CONNECTIONS.inc()
+    SOCKET_CONNECTS.inc()
+    emit('connected', {'message': 'Sunucuya başarıyla bağlandınız'})
+
 @socketio.on('disconnect')
 def handle_disconnect():
+    socket_identities.pop(request.sid, None)
+    SOCKET_CONNECTIONS.dec()
     print('Kullanıcı ayrıldı')
 
 @socketio.on('chat_message')
@@ -444,38 +833,75 @@ def handle_chat_message(data):
             emit('error', {'message': 'Geçersiz figür ID\'si'})
             return
         
-            figure = HISTORICAL_FIGURES[figure_id]
-            
-            # OpenAI ile yanıt oluştur
-            response = openai.ChatCompletion.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {
-                        "role": "system", 
-                        "content": f"Sen {figure['name']}sın. {figure['personality']} Tarihi gerçeklere dayalı olarak yanıt ver. Türkçe konuş."
-                    },
-                    {
-                        "role": "user", 
-                        "content": message
-                    }
-                ],
-                max_tokens=500,
-                temperature=0.7
-            )
-            
-            ai_response = response.choices[0].message.content
-            
-            # Yanıtı istemciye gönder
-            emit('ai_response', {
-                'response': ai_response,
-                'figure_name': figure['name'],
-                'timestamp': datetime.now().isoformat()
-            })
+        figure = HISTORICAL_FIGURES[figure_id]
+        
+        engine = tts.resolve_engine(data.get('tts_engine'))
+        
+        # Sohbet hafızası bağlanırken doğrulanan kullanıcıya bağlıdır
+        owner = conversation_owner(socket_identities.get(request.sid), data.get('session_id'))
+        timer = PhaseTimer()
+        
+        # LLM yanıtını parça parça istemciye gönder,
+        # istenirse cümleleri üretimle paralel seslendir
+        answer = answer_deltas(figure_id, figure, message, conversations.history(owner, figure_id))
+        if data.get('audio'):
+            events = timed_speech(timer, answer, engine)
+        else:
+            events = (('chunk', {'delta': delta}) for delta in timer.stream('llm', answer, first='llm_first_chunk'))
+        
+        # Üretim işçi havuzunda çalışır; kuyrukta beklerken sıra bildirilir
+        job = generation_pool.submit(events, timer)
+        on_position = lambda position: emit('queue_position', {'position': position, 'figure_name': figure['name']})
+        
+        parts = []
+        engines = []
+        for event, payload in job.results(on_position):
+            if event == 'chunk':
+                parts.append(payload['delta'])
+                emit('ai_response_chunk', {
+                    'delta': payload['delta'],
+                    'figure_name': figure['name']
+                })
+            else:
+                engines.append(payload['engine'])
+                emit('audio_segment', dict(encode_segment(payload), figure_name=figure['name']))
+            socketio.sleep(0)
+        
+        ai_response = ''.join(parts)
+        conversations.record(owner, figure_id, figure['name'], message, ai_response)
+        
+        # Tam metni taşıyan son olay
+        emit('ai_response', {
+            'response': ai_response,
+            'figure_name': figure['name'],
+            'cached': answer.cached,
+            'tts_engine': tts.engines_label(engines),
+            'timings': timer.as_dict(),
+            'timestamp': datetime.now().isoformat()
+        })
             
+    except Overloaded as e:
+        emit('error', {'message': 'Sunucu yoğun, lütfen biraz sonra tekrar deneyin', 'retry_after': e.retry_after})
     except Exception as e:
         emit('error', {'message': str(e)})
 
+# Açılıştan sonra selamlama/quiz/zaman çizelgesi seslerini ve modeli düşük öncelikle ısıt
+warmup = Warmup.from_env(busy_fn=lambda: generation_pool.stats()['active'] > 0).add_figures(
+    HISTORICAL_FIGURES,
+    prime_fn=lambda figure_id, figure: prime_llm(llm_router.backends[0].stream, figure),
+    prime_local=llm_router.backends[0].local
+).start()
+
+@app.route('/ready', methods=['GET'])
+def ready():
+    """Warm-up tamamlandı mı; adım adım ilerlemesiyle"""
+    status = warmup.stats()
+    return jsonify(status), 200 if status['ready'] else 503
+
 if __name__ == '__main__':
     port = int(os.getenv('PORT', 5001))  # Farklı port kullan
+    # Geliştirmede şemayı açılışta güncelle; üretimde: flask --app app db upgrade
+    if os.getenv('DB_AUTO_UPGRADE', 'true').lower() == 'true':
+        upgrade_schema(app)
     print(f"🚀 Backend başlatılıyor: http://localhost:{port}")
     socketio.run(app, host='0.0.0.0', port=port, debug=True)
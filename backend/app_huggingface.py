@@ -4,59 +4,42 @@ from flask_socketio import SocketIO, emit
 import ollama
 import os
 from dotenv import load_dotenv
-from gtts import gTTS
-import io
-import base64
 import json
 from datetime import datetime
 import threading
 import time
+from streaming import wants_stream, wants_sse, stream_response, serialize_phase
+from tts_pipeline import SpeechPipeline, batch_events, batch_texts, encode_segment, speak, synthesize_segment
+import tts
+from tts_cache import get_cache
+from audio_files import audio_url, send_audio, transcode_pool
+from audio_formats import get_transcoder
+from answer_cache import AnswerCache
+from conversation import ConversationStore
+from admission import GenerationPool, Overloaded, overloaded_response
+from llm_backends import LLMRouter, OllamaBackend, OpenAIBackend, StubBackend, build_backends, ollama_options
+import metrics
+from metrics import metrics_response
+import timing
+from timing import PhaseTimer, request_timer
+from profiler import admin_authorized, profile_request
+from figures import FigureRegistry, catalog_response
+from warmup import Warmup, prime_llm
 
 # Environment variables yükle
 load_dotenv()
 
 app = Flask(__name__)
 CORS(app)
+# Her yanıtta aşama süreleri (Server-Timing)
+timing.init_app(app)
 socketio = SocketIO(app, cors_allowed_origins="*")
 
 # Ollama bağlantısı
 OLLAMA_BASE_URL = os.getenv('OLLAMA_BASE_URL', 'http://localhost:11434')
 
-# Tarihi figürler ve kişilikleri
-HISTORICAL_FIGURES = {
-    "fatih_sultan_mehmet": {
-        "name": "Fatih Sultan Mehmet",
-        "personality": "Ben Fatih Sultan Mehmet. 1453'te İstanbul'u fetheden Osmanlı padişahıyım. Bilim, sanat ve strateji konularında konuşmayı severim. Sert ama adil bir liderim. Tarihi gerçeklere dayalı olarak yanıt veririm.",
-        "era": "15. yüzyıl",
-        "location": "İstanbul, Osmanlı İmparatorluğu",
-        "avatar": "👑",
-        "image": None,
-        "color": "from-amber-400 to-orange-500",
-        "system_prompt": "Sen Fatih Sultan Mehmet'sin. 1453'te İstanbul'u fetheden Osmanlı padişahısın. Bilim, sanat ve strateji konularında uzmansın. Sert ama adil bir lider olarak konuş. Tarihi gerçeklere dayalı yanıtlar ver. MUTLAKA TÜRKÇE KONUŞ. Hiçbir zaman İngilizce konuşma. Sadece Türkçe yanıt ver."
-    },
-    "ataturk": {
-        "name": "Mustafa Kemal Atatürk",
-        "personality": "Ben Mustafa Kemal Atatürk. Türkiye Cumhuriyeti'nin kurucusu ve ilk cumhurbaşkanıyım. Modernleşme, eğitim ve bağımsızlık konularında tutkulu bir liderim. Bilim, sanat ve kadın hakları konularında öncüyüm.",
-        "era": "19-20. yüzyıl",
-        "location": "Ankara, Türkiye",
-        "avatar": "🎖️",
-        "image": None,
-        "color": "from-red-400 to-red-600",
-        "voice_characteristics": "Güçlü, kararlı ve ilham verici ses tonu",
-        "visual_description": "Modern kıyafetler, şapka, güçlü bakış",
-        "system_prompt": "Sen Mustafa Kemal Atatürk'sün. Türkiye Cumhuriyeti'nin kurucusu ve ilk cumhurbaşkanısın. Modernleşme, eğitim, bilim, sanat ve bağımsızlık konularında tutkulusun. Kadın hakları ve çağdaşlaşma konularında öncüsün. Tarihi gerçeklere dayalı yanıtlar ver. MUTLAKA TÜRKÇE KONUŞ. Hiçbir zaman İngilizce konuşma. Sadece Türkçe yanıt ver. Ses tonun güçlü ve ilham verici. Kısa ve net cevaplar ver. Tekrar etme."
-    },
-    "napoleon": {
-        "name": "Napolyon Bonaparte",
-        "personality": "Ben Napolyon Bonaparte. Fransız İmparatoru ve büyük bir askeri dehayım. Strateji, savaş ve yönetim konularında uzmanım.",
-        "era": "18-19. yüzyıl",
-        "location": "Paris, Fransa",
-        "avatar": "⚔️",
-        "image": None,
-        "color": "from-blue-400 to-blue-600",
-        "system_prompt": "Sen Napolyon Bonaparte'sın. Fransız İmparatoru ve büyük bir askeri dehasın. Strateji, savaş ve yönetim konularında uzmansın. Tarihi gerçeklere dayalı yanıtlar ver. MUTLAKA TÜRKÇE KONUŞ. Hiçbir zaman İngilizce konuşma. Sadece Türkçe yanıt ver."
-    }
-}
+# Tarihi figürler ve kişilikleri: data/figures.json, dosya değişince yeniden yüklenir
+HISTORICAL_FIGURES = FigureRegistry.from_env().start()
 
 # Model yapılandırması
 MODEL_CONFIG = {
@@ -66,6 +49,12 @@ MODEL_CONFIG = {
     "top_p": 0.9
 }
 
+# Aynı figüre sorulan aynı soruların yanıtları
+answer_cache = AnswerCache.from_env()
+
+# Kullanıcı + figür başına sohbet hafızası
+conversations = ConversationStore.from_env()
+
 @app.route('/')
 def home():
     return jsonify({
@@ -77,8 +66,113 @@ def home():
 
 @app.route('/api/figures', methods=['GET'])
 def get_figures():
-    """Mevcut tarihi figürleri listele"""
-    return jsonify(HISTORICAL_FIGURES)
+    """Mevcut tarihi figürleri listele (önceden hazırlanmış gövde, ETag ile 304)"""
+    return catalog_response(HISTORICAL_FIGURES, request)
+
+def build_messages(figure, message, history=()):
+    """LLM için sistem + önceki konuşma + kullanıcı mesajlarını hazırla"""
+    return [
+        {
+            "role": "system",
+            "content": figure["system_prompt"]
+        },
+        *history,
+        {
+            "role": "user",
+            "content": message
+        }
+    ]
+
+# LLM arka uçları (LLM_BACKENDS=ollama,openai gibi); istek en hızlı
+# sağlıklı arka uca gider, hata olursa sıradakine geçilir
+llm_router = LLMRouter.from_env(build_backends(os.getenv('LLM_BACKENDS') or 'ollama', {
+    'ollama': lambda: OllamaBackend.from_env(build_messages, MODEL_CONFIG),
+    'openai': lambda: OpenAIBackend(build_messages),
+    'stub': StubBackend
+}))
+
+# Engelleyici LLM/TTS çağrıları olay döngüsü dışında, sınırlı sayıda çalışır
+generation_pool = GenerationPool.from_env(sleep=socketio.sleep)
+# Ses biçimi dönüştürme (ffmpeg) LLM işleriyle aynı kuyruğu paylaşmaz
+audio_pool = transcode_pool(sleep=socketio.sleep)
+
+def answer_deltas(figure_id, figure, message, history=()):
+    """Yanıt parçalarını önce yanıt önbelleğinden, yoksa LLM arka uçlarından al"""
+    return answer_cache.stream(
+        figure_id, figure, message, llm_router.preferred_model(), ollama_options(MODEL_CONFIG),
+        lambda: llm_router.stream(figure, message, history, figure_id),
+        history
+    )
+
+def conversation_owner(data):
+    """Sohbet hafızasının sahibi: istemcinin session_id'si, yoksa socket bağlantısı"""
+    return data.get('session_id') or getattr(request, 'sid', None)
+
+def fallback_response(figure):
+    """Hiçbir LLM arka ucuna ulaşılamadığında dönen yedek metin"""
+    return f"Merhaba! Ben {figure['name']}. Şu anda teknik bir sorun yaşıyorum, lütfen daha sonra tekrar deneyin."
+
+def synthesize_audio_url(text, synthesize_fn=None):
+    """Metni sese çevir; (indirme yolu, sesi üreten motor), hata olursa (None, None)"""
+    try:
+        key, _, used = (synthesize_fn or tts.synthesize_with_key)(text)
+        return audio_url(key), used
+    except Exception as e:
+        print(f"TTS hatası: {e}")
+        return None, None
+
+def timed_speech(timer, answer, engine=None):
+    """Yanıt akışını seslendirme hattından geçir; llm ve tts sürelerini ölç"""
+    pipeline = SpeechPipeline(timer.wrap('tts', tts.synthesizer(engine)))
+    return pipeline.run(timer.stream('llm', answer, first='llm_first_chunk'))
+
+def stream_chat_events(figure_id, figure, message, owner=None, timer=None, engine=None):
+    """HTTP akışı için chunk ve ses parçası olaylarını, en sonda tam metni üret
+
+    Cümleler tamamlandıkça seslendirilir; istemci ilk ses parçasını model
+    yazmaya devam ederken çalabilir.
+    """
+    timer = timer or PhaseTimer()
+    parts = []
+    engines = []
+    error = None
+    answer = answer_deltas(figure_id, figure, message, conversations.history(owner, figure_id))
+    try:
+        for event, payload in timed_speech(timer, answer, engine):
+            if event == 'chunk':
+                parts.append(payload['delta'])
+            else:
+                engines.append(payload['engine'])
+                payload = encode_segment(payload)
+            yield event, payload
+        ai_response = ''.join(parts)
+        conversations.record(owner, figure_id, figure['name'], message, ai_response)
+    except Exception as e:
+        print(f"LLM hatası: {e}")
+        if parts:
+            # İstemci parçaları zaten gösterdi: yanıt akıtılan metinle, hata işaretiyle biter
+            ai_response = ''.join(parts)
+            error = str(e)
+        else:
+            # Fallback: Henüz metin gönderilmediyse basit yanıt
+            ai_response = fallback_response(figure)
+            segment = synthesize_segment(len(engines), ai_response, timer.wrap('tts', tts.synthesizer(engine)))
+            engines.append(segment['engine'])
+            yield 'audio', encode_segment(segment)
+    
+    done = {
+        "response": ai_response,
+        "figure_name": figure['name'],
+        "audio_segments": len(engines),
+        "tts_engine": tts.engines_label(engines),
+        "cached": answer.cached,
+        "timings": timer.as_dict(),
+        "timestamp": datetime.now().isoformat(),
+        "model": MODEL_CONFIG["model_name"]
+    }
+    if error is not None:
+        done["error"] = error
+    yield 'done', done
 
 @app.route('/api/chat', methods=['POST'])
 def chat():
@@ -96,53 +190,51 @@ def chat():
         
         figure = HISTORICAL_FIGURES[figure_id]
         
-        # Ollama ile yanıt oluştur
         try:
-            response = ollama.chat(
-                model=MODEL_CONFIG["model_name"],
-                messages=[
-                    {
-                        "role": "system",
-                        "content": figure["system_prompt"]
-                    },
-                    {
-                        "role": "user",
-                        "content": message
-                    }
-                ],
-                options={
-                    "temperature": MODEL_CONFIG["temperature"],
-                    "num_predict": MODEL_CONFIG["max_tokens"],
-                    "top_p": MODEL_CONFIG["top_p"]
-                }
-            )
-            
-            ai_response = response['message']['content']
-            
-        except Exception as e:
-            print(f"Ollama hatası: {e}")
-            # Fallback: Basit yanıt
-            ai_response = f"Merhaba! Ben {figure['name']}. Şu anda teknik bir sorun yaşıyorum, lütfen daha sonra tekrar deneyin."
+            engine = tts.resolve_engine(data.get('tts_engine'))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         
-        # TTS ile ses dosyası oluştur
-        try:
-            tts = gTTS(text=ai_response, lang='tr', slow=False)
-            audio_buffer = io.BytesIO()
-            tts.write_to_fp(audio_buffer)
-            audio_buffer.seek(0)
-            audio_base64 = base64.b64encode(audio_buffer.read()).decode()
-        except Exception as e:
-            print(f"TTS hatası: {e}")
-            audio_base64 = None
+        owner = conversation_owner(data)
+        timer = request_timer()
         
-        return jsonify({
-            "response": ai_response,
-            "figure_name": figure['name'],
-            "audio": audio_base64,
-            "timestamp": datetime.now().isoformat(),
-            "model": MODEL_CONFIG["model_name"]
-        })
+        # Akış modu: token'lar üretildikçe gönderilir
+        if wants_stream(request, data):
+            job = generation_pool.submit(stream_chat_events(figure_id, figure, message, owner, timer, engine), timer)
+            return stream_response(job.results(), sse=wants_sse(request))
         
+        # LLM ile yanıt oluştur; cümleler üretildikçe seslendirilir
+        answer = answer_deltas(figure_id, figure, message, conversations.history(owner, figure_id))
+        synthesize = timer.wrap('tts', tts.synthesizer(engine))
+        
+        def respond():
+            try:
+                ai_response, audio_key, used_engine = speak(timer.stream('llm', answer, first='llm_first_chunk'), synthesize)
+                conversations.record(owner, figure_id, figure['name'], message, ai_response)
+                return ai_response, audio_url(audio_key), used_engine
+                
+            except Exception as e:
+                print(f"LLM hatası: {e}")
+                # Fallback: Basit yanıt
+                ai_response = fallback_response(figure)
+                return (ai_response,) + synthesize_audio_url(ai_response, synthesize)
+        
+        ai_response, response_audio_url, used_engine = generation_pool.call(respond, timer=timer)
+        
+        with serialize_phase(timer):
+            response = jsonify({
+                "response": ai_response,
+                "figure_name": figure['name'],
+                "audio_url": response_audio_url,
+                "tts_engine": used_engine,
+                "cached": answer.cached,
+                "timestamp": datetime.now().isoformat(),
+                "model": MODEL_CONFIG["model_name"]
+            })
+        return response
+        
+    except Overloaded as e:
+        return overloaded_response(e)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -156,20 +248,153 @@ def text_to_speech():
         if not text:
             return jsonify({"error": "text gerekli"}), 400
         
-        tts = gTTS(text=text, lang='tr', slow=False)
-        audio_buffer = io.BytesIO()
-        tts.write_to_fp(audio_buffer)
-        audio_buffer.seek(0)
-        audio_base64 = base64.b64encode(audio_buffer.read()).decode()
+        try:
+            engine = tts.resolve_engine(data.get('engine'))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         
-        return jsonify({
-            "audio": audio_base64,
-            "timestamp": datetime.now().isoformat()
-        })
+        timer = request_timer()
+        key, _, used_engine = generation_pool.call(timer.wrap('tts', lambda: tts.synthesize_with_key(text, engine=engine)), timer=timer)
+        
+        with serialize_phase(timer):
+            response = jsonify({
+                "audio_url": audio_url(key),
+                "tts_engine": used_engine,
+                "timestamp": datetime.now().isoformat()
+            })
+        return response
         
+    except Overloaded as e:
+        return overloaded_response(e)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/tts/batch', methods=['POST'])
+def text_to_speech_batch():
+    """Metin listesini tek istekte seslendir; aynı metinler bir kez seslendirilir
+
+    Sonuçlar girdi sırasıyla döner: akış modunda (stream veya Accept: NDJSON/SSE)
+    her öğe hazır olunca, aksi halde hepsi tek JSON yanıtta.
+    """
+    try:
+        data = request.get_json() or {}
+        
+        try:
+            texts = batch_texts(data.get('texts'))
+            engine = tts.resolve_engine(data.get('engine'))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        timer = request_timer()
+        events = batch_events(texts, timer.wrap('tts', tts.synthesizer(engine)))
+        
+        if wants_stream(request, data):
+            job = generation_pool.submit(events, timer)
+            return stream_response(job.results(), sse=wants_sse(request))
+        
+        results = generation_pool.call(lambda: list(events), timer=timer)
+        
+        with serialize_phase(timer):
+            response = jsonify(dict(
+                results[-1][1],
+                items=[payload for event, payload in results if event == 'item'],
+                timestamp=datetime.now().isoformat()
+            ))
+        return response
+        
+    except Overloaded as e:
+        return overloaded_response(e)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/tts/engines', methods=['GET'])
+def tts_engines():
+    """Kullanılabilir TTS motorları, varsayılan ve yedek motor"""
+    return jsonify(tts.engines_info())
+
+@app.route('/api/audio/<audio_hash>', methods=['GET'])
+def get_audio(audio_hash):
+    """Seslendirilmiş sesi ikili olarak gönder (ETag, Range, önbellek başlıkları)
+
+    ?format=ogg|webm|mp3&bitrate=24k veya Accept başlığıyla daha küçük biçim istenebilir.
+    """
+    return send_audio(audio_hash, request, audio_pool)
+
+@app.route('/api/audio/formats', methods=['GET'])
+def audio_format_stats():
+    """Biçim başına konuşma saniyesi başına bayt ve dönüştürme önbelleği"""
+    return jsonify(dict(get_transcoder().stats(), pool=audio_pool.stats()))
+
+@app.route('/api/tts/stats', methods=['GET'])
+def tts_stats():
+    """TTS önbellek isabet/ıskalama istatistikleri"""
+    return jsonify(get_cache().stats())
+
+@app.route('/api/chat/stats', methods=['GET'])
+def chat_stats():
+    """Yanıt önbelleği isabet/ıskalama istatistikleri"""
+    return jsonify(answer_cache.stats())
+
+@app.route('/api/conversation/<figure_id>', methods=['DELETE'])
+def clear_conversation(figure_id):
+    """Figürle olan sohbet hafızasını sil (yeni sohbet)"""
+    session_id = request.args.get('session_id')
+    if not session_id:
+        return jsonify({"error": "session_id gerekli"}), 400
+    conversations.clear(session_id, figure_id)
+    return jsonify({"message": "Sohbet geçmişi silindi"})
+
+@app.route('/api/conversation/stats', methods=['GET'])
+def conversation_stats():
+    """Sohbet hafızası oturum ve tahliye sayaçları"""
+    return jsonify(conversations.stats())
+
+@app.route('/api/generation/stats', methods=['GET'])
+def generation_stats():
+    """Üretim havuzunun doluluk ve kuyruk durumu"""
+    return jsonify(generation_pool.stats())
+
+@app.route('/api/llm/backends', methods=['GET'])
+def get_llm_backends():
+    """LLM arka uçlarının gecikme, hata oranı ve sağlık durumu"""
+    return jsonify(llm_router.stats())
+
+# /metrics: anlık değerler kazıma (scrape) sırasında okunur
+metrics.gauge('generation_active', 'Çalışan üretim işleri', fn=lambda: generation_pool.stats()['active'])
+metrics.gauge('generation_queue_depth', 'Kuyrukta bekleyen üretim işleri', fn=lambda: generation_pool.stats()['waiting'])
+metrics.counter('cache_lookups_total', 'Önbellek aramaları', ['cache', 'result'], fn=lambda: {
+    ('answer', 'hit'): answer_cache.hits,
+    ('answer', 'miss'): answer_cache.misses,
+    ('tts', 'memory_hit'): get_cache().memory_hits,
+    ('tts', 'disk_hit'): get_cache().disk_hits,
+    ('tts', 'miss'): get_cache().misses
+})
+metrics.gauge('cache_hit_ratio', 'Önbellek isabet oranı', ['cache'], fn=lambda: {
+    ('answer',): answer_cache.stats()['hit_ratio'],
+    ('tts',): get_cache().stats()['hit_ratio']
+})
+metrics.gauge('conversation_sessions', 'Bellekteki sohbet oturumları', fn=lambda: conversations.stats()['sessions'])
+SOCKET_CONNECTIONS = metrics.gauge('socket_connections', 'Açık socket bağlantıları')
+SOCKET_CONNECTS = metrics.counter('socket_connects_total', 'Kabul edilen socket bağlantıları')
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus metin biçiminde metrikler"""
+    return metrics_response()
+
+@app.route('/api/admin/profile', methods=['POST'])
+def admin_profile():
+    """Canlı süreçte örnekleyici profil (X-Admin-Token gerekli); flamegraph için collapsed yığınlar"""
+    return profile_request(request, sleep=socketio.sleep)
+
+@app.route('/api/admin/figures/reload', methods=['POST'])
+def admin_reload_figures():
+    """Figür dosyasını beklemeden yeniden yükle (X-Admin-Token gerekli)"""
+    if not admin_authorized(request):
+        return jsonify({"error": "Yetkisiz"}), 403
+    changed = HISTORICAL_FIGURES.reload()
+    return jsonify(dict(HISTORICAL_FIGURES.stats(), changed=changed))
+
 @app.route('/api/models', methods=['GET'])
 def get_models():
     """Mevcut modelleri listele"""
@@ -212,6 +437,8 @@ def switch_model():
 @socketio.on('connect')
 def handle_connect():
     print('Kullanıcı bağlandı')
+    SOCKET_CONNECTIONS.inc()
+    SOCKET_CONNECTS.inc()
     emit('connected', {
         'message': 'Sunucuya başarıyla bağlandınız',
         'model': MODEL_CONFIG["model_name"]
@@ -219,6 +446,7 @@ def handle_connect():
 
 @socketio.on('disconnect')
 def handle_disconnect():
+    SOCKET_CONNECTIONS.dec()
     print('Kullanıcı ayrıldı')
 
 @socketio.on('chat_message')
@@ -231,44 +459,82 @@ def handle_chat_message(data):
         if figure_id in HISTORICAL_FIGURES:
             figure = HISTORICAL_FIGURES[figure_id]
             
-            # Ollama ile yanıt oluştur
+            # LLM yanıtını parça parça istemciye gönder,
+            # istenirse cümleleri üretimle paralel seslendir
+            engine = tts.resolve_engine(data.get('tts_engine'))
+            owner = conversation_owner(data)
+            timer = PhaseTimer()
+            answer = answer_deltas(figure_id, figure, message, conversations.history(owner, figure_id))
+            if data.get('audio'):
+                events = timed_speech(timer, answer, engine)
+            else:
+                events = (('chunk', {'delta': delta}) for delta in timer.stream('llm', answer, first='llm_first_chunk'))
+            
+            # Üretim işçi havuzunda çalışır; kuyrukta beklerken sıra bildirilir
+            job = generation_pool.submit(events, timer)
+            on_position = lambda position: emit('queue_position', {'position': position, 'figure_name': figure['name']})
+            
+            parts = []
+            engines = []
+            error = None
             try:
-                response = ollama.chat(
-                    model=MODEL_CONFIG["model_name"],
-                    messages=[
-                        {
-                            "role": "system",
-                            "content": figure["system_prompt"]
-                        },
-                        {
-                            "role": "user",
-                            "content": message
-                        }
-                    ],
-                    options={
-                        "temperature": MODEL_CONFIG["temperature"],
-                        "num_predict": MODEL_CONFIG["max_tokens"],
-                        "top_p": MODEL_CONFIG["top_p"]
-                    }
-                )
+                for event, payload in job.results(on_position):
+                    if event == 'chunk':
+                        parts.append(payload['delta'])
+                        emit('ai_response_chunk', {
+                            'delta': payload['delta'],
+                            'figure_name': figure['name']
+                        })
+                    else:
+                        engines.append(payload['engine'])
+                        emit('audio_segment', dict(encode_segment(payload), figure_name=figure['name']))
+                    socketio.sleep(0)
                 
-                ai_response = response['message']['content']
+                ai_response = ''.join(parts)
+                conversations.record(owner, figure_id, figure['name'], message, ai_response)
                 
             except Exception as e:
-                print(f"Ollama hatası: {e}")
-                ai_response = f"Merhaba! Ben {figure['name']}. Şu anda teknik bir sorun yaşıyorum."
+                print(f"LLM hatası: {e}")
+                if parts:
+                    # Gösterilen parçalarla çelişmemek için akıtılan metin hata işaretiyle döner
+                    ai_response = ''.join(parts)
+                    error = str(e)
+                else:
+                    ai_response = fallback_response(figure)
             
-            # Yanıtı istemciye gönder
-            emit('ai_response', {
+            # Tam metni taşıyan son olay
+            final = {
                 'response': ai_response,
                 'figure_name': figure['name'],
+                'cached': answer.cached,
+                'tts_engine': tts.engines_label(engines),
+                'timings': timer.as_dict(),
                 'timestamp': datetime.now().isoformat(),
                 'model': MODEL_CONFIG["model_name"]
-            })
+            }
+            if error is not None:
+                final['error'] = error
+            emit('ai_response', final)
             
+    except Overloaded as e:
+        emit('error', {'message': 'Sunucu yoğun, lütfen biraz sonra tekrar deneyin', 'retry_after': e.retry_after})
     except Exception as e:
         emit('error', {'message': str(e)})
 
+# Açılıştan sonra selamlama/quiz/zaman çizelgesi ve yedek yanıt seslerini, modeli düşük öncelikle ısıt
+warmup = Warmup.from_env(busy_fn=lambda: generation_pool.stats()['active'] > 0).add_figures(
+    HISTORICAL_FIGURES,
+    fallback_fn=fallback_response,
+    prime_fn=lambda figure_id, figure: prime_llm(llm_router.backends[0].stream, figure),
+    prime_local=llm_router.backends[0].local
+).start()
+
+@app.route('/ready', methods=['GET'])
+def ready():
+    """Warm-up tamamlandı mı; adım adım ilerlemesiyle"""
+    status = warmup.stats()
+    return jsonify(status), 200 if status['ready'] else 503
+
 if __name__ == '__main__':
     port = int(os.getenv('PORT', 5000))
     print(f"🚀 Tarih-i Sima Backend başlatılıyor...")
@@ -2,22 +2,42 @@ from flask import Flask, request, jsonify
 from flask_cors import CORS
 from flask_socketio import SocketIO, emit
 import torch
-from transformers import AutoTokenizer, AutoModelForCausalLM, pipeline
+from transformers import AutoTokenizer, AutoModelForCausalLM, TextIteratorStreamer, pipeline
 import os
 from dotenv import load_dotenv
-from gtts import gTTS
-import io
-import base64
 import json
 from datetime import datetime
 import threading
 import time
+import gc
+from batching import BatchScheduler
+from model_manager import ModelManager, ModelNotReady
+from cpu_profile import profile_from_env, apply_thread_settings, quantize_model
+from streaming import wants_stream, wants_sse, stream_response, serialize_phase
+from tts_pipeline import SpeechPipeline, batch_events, batch_texts, encode_segment, speak
+import tts
+from tts_cache import get_cache
+from audio_files import audio_url, send_audio, transcode_pool
+from audio_formats import get_transcoder
+from answer_cache import AnswerCache
+from conversation import ConversationStore, approximate_tokens
+from admission import GenerationPool, Overloaded, overloaded_response
+from llm_backends import LLMRouter, TransformersBackend, OllamaBackend, OpenAIBackend, StubBackend, build_backends
+import metrics
+from metrics import metrics_response
+import timing
+from timing import PhaseTimer, request_timer
+from profiler import admin_authorized, profile_request
+from figures import FigureRegistry, catalog_response
+from warmup import Warmup, prime_llm
 
 # Environment variables yükle
 load_dotenv()
 
 app = Flask(__name__)
 CORS(app)
+# Her yanıtta aşama süreleri (Server-Timing)
+timing.init_app(app)
 socketio = SocketIO(app, cors_allowed_origins="*")
 
 # Model yapılandırması
@@ -29,100 +49,496 @@ MODEL_CONFIG = {
     "pad_token_id": None
 }
 
-# Global model değişkenleri
-tokenizer = None
-model = None
-generator = None
-
-# Tarihi figürler ve kişilikleri
-HISTORICAL_FIGURES = {
-    "fatih_sultan_mehmet": {
-        "name": "Fatih Sultan Mehmet",
-        "personality": "Ben Fatih Sultan Mehmet. 1453'te İstanbul'u fetheden Osmanlı padişahıyım. Bilim, sanat ve strateji konularında konuşmayı severim. Sert ama adil bir liderim.",
-        "era": "15. yüzyıl",
-        "location": "İstanbul, Osmanlı İmparatorluğu",
-        "system_prompt": "Sen Fatih Sultan Mehmet'sin. 1453'te İstanbul'u fetheden Osmanlı padişahısın. Bilim, sanat ve strateji konularında uzmansın. Sert ama adil bir lider olarak konuş. Tarihi gerçeklere dayalı yanıtlar ver. Türkçe konuş."
-    },
-    "ataturk": {
-        "name": "Mustafa Kemal Atatürk",
-        "personality": "Ben Mustafa Kemal Atatürk. Türkiye Cumhuriyeti'nin kurucusu ve ilk cumhurbaşkanıyım. Modernleşme, eğitim ve bağımsızlık konularında tutkulu bir liderim.",
-        "era": "19-20. yüzyıl",
-        "location": "Ankara, Türkiye",
-        "system_prompt": "Sen Mustafa Kemal Atatürk'sün. Türkiye Cumhuriyeti'nin kurucusu ve ilk cumhurbaşkanısın. Modernleşme, eğitim ve bağımsızlık konularında tutkulusun. Tarihi gerçeklere dayalı yanıtlar ver. Türkçe konuş."
-    },
-    "napoleon": {
-        "name": "Napolyon Bonaparte",
-        "personality": "Ben Napolyon Bonaparte. Fransız İmparatoru ve büyük bir askeri dehayım. Strateji, savaş ve yönetim konularında uzmanım.",
-        "era": "18-19. yüzyıl",
-        "location": "Paris, Fransa",
-        "system_prompt": "Sen Napolyon Bonaparte'sın. Fransız İmparatoru ve büyük bir askeri dehasın. Strateji, savaş ve yönetim konularında uzmansın. Tarihi gerçeklere dayalı yanıtlar ver. Türkçe konuş."
-    }
-}
+# Aynı figüre sorulan aynı soruların yanıtları
+answer_cache = AnswerCache.from_env()
+
+# Model yüklenene kadar isteklerin en fazla bekleyeceği süre (saniye)
+MODEL_WAIT_TIMEOUT = float(os.getenv('MODEL_WAIT_TIMEOUT', 30))
+
+# CPU performans profili (CPU_PROFILE=True ile açılır): int8 quantization,
+# düşük bellekli yükleme ve işçi başına sabit thread sayısı
+CPU_PROFILE = profile_from_env()
+if CPU_PROFILE["enabled"] and not torch.cuda.is_available():
+    apply_thread_settings(CPU_PROFILE)
+
+AVAILABLE_MODELS = [
+    "microsoft/DialoGPT-medium",
+    "microsoft/DialoGPT-small",
+    "microsoft/DialoGPT-large",
+    "facebook/blenderbot-400M-distill",
+    "facebook/blenderbot-1B-distill",
+    "EleutherAI/gpt-neo-2.7B",
+    "EleutherAI/gpt-neo-1.3B",
+    "gpt2",
+    "gpt2-medium",
+    "gpt2-large"
+]
+
+# Tarihi figürler ve kişilikleri: data/figures.json, dosya değişince yeniden yüklenir
+HISTORICAL_FIGURES = FigureRegistry.from_env().start()
+
+class ModelBundle:
+    """Birlikte yüklenip birlikte devreden çıkan tokenizer, model ve önbellekler"""
+    
+    def __init__(self, name, tokenizer, model, generator):
+        self.name = name
+        self.tokenizer = tokenizer
+        self.model = model
+        self.generator = generator
+        # Sistem prompt'u -> (prefix token'ları, past_key_values)
+        self.prefix_cache = {}
+        # Model önbellekten devam etmeyi desteklemiyorsa False olur
+        self.prefix_supported = True
+
+def load_model(model_name, cpu_profile=None):
+    """Modeli yükle ve kullanıma hazır bir ModelBundle döndür"""
+    if cpu_profile is None:
+        cpu_profile = CPU_PROFILE["enabled"]
+    cpu_profile = cpu_profile and not torch.cuda.is_available()
+    
+    print(f"🔄 Model yükleniyor: {model_name}{' (CPU profili)' if cpu_profile else ''}")
+    
+    # Tokenizer ve model yükle
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModelForCausalLM.from_pretrained(
+        model_name,
+        torch_dtype=torch.float16 if torch.cuda.is_available() else torch.float32,
+        device_map="auto" if torch.cuda.is_available() else None,
+        low_cpu_mem_usage=cpu_profile
+    )
+    
+    if cpu_profile and CPU_PROFILE["quantize"]:
+        model = quantize_model(model)
+    model.eval()
+    
+    # Pad token ayarla
+    if tokenizer.pad_token is None:
+        tokenizer.pad_token = tokenizer.eos_token
+    
+    # Generator pipeline oluştur
+    generator = pipeline(
+        "text-generation",
+        model=model,
+        tokenizer=tokenizer,
+        device=0 if torch.cuda.is_available() else -1
+    )
+    
+    bundle = ModelBundle(model_name, tokenizer, model, generator)
+    
+    # Figürlerin sabit sistem prompt'larını bir kez encode et. Önbellek
+    # pakete ait olduğu için model değişince kendiliğinden geçersiz olur.
+    build_prefix_cache(bundle)
+    
+    print("✅ Model başarıyla yüklendi!")
+    return bundle
+
+def release_model(bundle):
+    """Devreden çıkan ve son isteği biten modelin belleğini serbest bırak"""
+    bundle.prefix_cache = {}
+    bundle.generator = None
+    bundle.model = None
+    gc.collect()
+    if torch.cuda.is_available():
+        torch.cuda.empty_cache()
+    print(f"🧹 Eski model bellekten kaldırıldı: {bundle.name}")
 
-def load_model():
-    """Modeli yükle"""
-    global tokenizer, model, generator
+# Tek seferde tek yükleme; yeni model hazır olunca atomik olarak devreye girer
+model_manager = ModelManager(
+    load_model,
+    default_name=MODEL_CONFIG['model_name'],
+    fallback_name="gpt2",
+    release=release_model,
+    on_swap=lambda bundle: MODEL_CONFIG.update(model_name=bundle.name)
+)
+
+def prefix_text(system_prompt):
+    """Tüm sohbetlerde aynı kalan prompt başlangıcı"""
+    return f"{system_prompt}\n\n"
+
+def history_text(figure, history):
+    """Önceki konuşmayı prompt satırlarına çevir"""
+    lines = []
+    for item in history:
+        if item['role'] == 'user':
+            lines.append(f"Kullanıcı: {item['content']}")
+        elif item['role'] == 'assistant':
+            lines.append(f"{figure['name']}: {item['content']}")
+        else:
+            lines.append(item['content'])
+    return ''.join(f"{line}\n" for line in lines)
+
+def suffix_text(figure, user_message, history=()):
+    """Prompt'un isteğe göre değişen kısmı
+
+    Sohbet geçmişi de burada yer alır; sistem prompt'u önekte aynı kaldığı
+    için figür başına prefix önbelleği geçerliliğini korur.
+    """
+    return history_text(figure, history) + f"Kullanıcı: {user_message}\n{figure['name']}:"
+
+def build_prompt(figure, user_message, history=()):
+    """Sistem prompt + önceki konuşma + kullanıcı mesajı"""
+    return prefix_text(figure['system_prompt']) + suffix_text(figure, user_message, history)
+
+def build_messages(figure, message, history=()):
+    """Sohbet API'li arka uçlar (OpenAI, Ollama) için sistem + önceki konuşma + kullanıcı mesajları"""
+    return [
+        {
+            "role": "system",
+            "content": figure["system_prompt"]
+        },
+        *history,
+        {
+            "role": "user",
+            "content": message
+        }
+    ]
+
+def fallback_response(figure):
+    """Boş veya çok kısa yanıtlar için yedek metin"""
+    return f"Merhaba! Ben {figure['name']}. {figure['personality']} Sorunuzu daha detaylı sorabilir misiniz?"
+
+# Modelin önbellekten devam etmeyi desteklemediğini gösteren (kalıcı) hatalar;
+# bellek yetersizliği gibi geçici hatalar (RuntimeError) önbelleği kapatmaz
+PREFIX_UNSUPPORTED_ERRORS = (TypeError, AttributeError, ValueError, NotImplementedError)
+
+def build_prefix_cache(bundle):
+    """Her figürün sistem prompt'u için attention key/value durumunu bir kez hesapla
+
+    Uzun Türkçe sistem prompt'ları her istekte yeniden encode edilmez; üretim
+    bu durumdan devam eder ve yalnızca kullanıcı mesajı modelden geçer.
+    Yalnızca decoder-only ve (katman, (key, value)) biçiminde önbellek
+    döndüren modeller desteklenir, diğerlerinde tam prompt kullanılır.
+    Sonradan eklenen (yeniden yüklenen) figürlerin kaydı ilk istekte kurulur.
+    """
+    if bundle.model.config.is_encoder_decoder:
+        bundle.prefix_supported = False
+        return {}
+    
+    for figure in HISTORICAL_FIGURES.values():
+        try:
+            prefix_entry(bundle, figure['system_prompt'])
+        except Exception as e:
+            print(f"⚠️ Prefix önbelleği oluşturulamadı, ilk istekte yeniden denenecek: {e}")
+            break
+    
+    if bundle.prefix_supported:
+        print(f"🧠 {len(bundle.prefix_cache)} figür için prefix önbelleği hazır")
+    return bundle.prefix_cache
+
+def prefix_entry(bundle, system_prompt):
+    """Sistem prompt'unun (prefix token'ları, past_key_values) kaydı; yoksa kurar
+
+    Model önbellekten devam etmeyi desteklemiyorsa None döner. Yeni kayıt
+    kurulurken katalogdan çıkmış figürlerin kayıtları silinir.
+    """
+    if not bundle.prefix_supported:
+        return None
+    cached = bundle.prefix_cache.get(system_prompt)
+    if cached is not None:
+        return cached
+    
+    ids = bundle.tokenizer(prefix_text(system_prompt), return_tensors='pt').input_ids.to(bundle.model.device)
+    try:
+        with torch.inference_mode():
+            outputs = bundle.model(ids, use_cache=True)
+    except PREFIX_UNSUPPORTED_ERRORS as e:
+        disable_prefix_cache(bundle, e)
+        return None
     
+    prompts = {figure['system_prompt'] for figure in HISTORICAL_FIGURES.values()}
+    for stale in [prompt for prompt in bundle.prefix_cache if prompt not in prompts]:
+        bundle.prefix_cache.pop(stale, None)
+    cached = bundle.prefix_cache[system_prompt] = (ids, outputs.past_key_values)
+    return cached
+
+def disable_prefix_cache(bundle, error):
+    """Bu model için prefix önbelleğini kapat; tam prompt kullanılır"""
+    if bundle.prefix_supported:
+        print(f"⚠️ Model prefix önbelleğini desteklemiyor, tam prompt kullanılacak: {error}")
+    bundle.prefix_supported = False
+    bundle.prefix_cache = {}
+
+def generation_inputs(bundle, system_prompt, suffixes):
+    """Aynı figüre ait istekler için model.generate girdilerini hazırla
+
+    Prefix önbelleği varsa yalnızca sonekler encode edilir; önbellekteki
+    key/value tensörleri batch boyutuna kopyalanmadan genişletilir. Sola
+    yapılan padding prefix ile sonek arasında kalır ve attention mask ile
+    gizlenir.
+    """
+    tokenizer, model = bundle.tokenizer, bundle.model
+    tokenizer.padding_side = 'left'
     try:
-        print(f"🔄 Model yükleniyor: {MODEL_CONFIG['model_name']}")
-        
-        # Tokenizer ve model yükle
-        tokenizer = AutoTokenizer.from_pretrained(MODEL_CONFIG['model_name'])
-        model = AutoModelForCausalLM.from_pretrained(
-            MODEL_CONFIG['model_name'],
-            torch_dtype=torch.float16 if torch.cuda.is_available() else torch.float32,
-            device_map="auto" if torch.cuda.is_available() else None
+        cached = prefix_entry(bundle, system_prompt)
+    except Exception as e:
+        # Geçici hata (ör. bellek); kayıt sonraki istekte yeniden denenir
+        print(f"⚠️ Prefix önbelleği kaydı kurulamadı, tam prompt kullanılıyor: {e}")
+        cached = None
+    
+    if cached is None:
+        prompts = [prefix_text(system_prompt) + suffix for suffix in suffixes]
+        return dict(tokenizer(prompts, return_tensors='pt', padding=True).to(model.device))
+    
+    prefix_ids, past_key_values = cached
+    batch_size = len(suffixes)
+    encoded = tokenizer(suffixes, return_tensors='pt', padding=True, add_special_tokens=False).to(model.device)
+    prefix_mask = torch.ones(
+        (batch_size, prefix_ids.shape[1]),
+        dtype=encoded['attention_mask'].dtype,
+        device=model.device
+    )
+    
+    return {
+        'input_ids': torch.cat([prefix_ids.expand(batch_size, -1), encoded['input_ids']], dim=1),
+        'attention_mask': torch.cat([prefix_mask, encoded['attention_mask']], dim=1),
+        'past_key_values': tuple(
+            tuple(tensor.expand(batch_size, *tensor.shape[1:]) for tensor in layer)
+            for layer in past_key_values
         )
+    }
+
+def generation_kwargs(bundle):
+    """Tüm üretim yollarında ortak örnekleme ayarları"""
+    return {
+        'max_length': MODEL_CONFIG['max_length'],
+        'temperature': MODEL_CONFIG['temperature'],
+        'do_sample': MODEL_CONFIG['do_sample'],
+        'pad_token_id': bundle.tokenizer.pad_token_id,
+        'num_return_sequences': 1
+    }
+
+def sampling_options():
+    """Yanıtı belirleyen örnekleme ayarları (yanıt önbelleği anahtarı için)"""
+    return {
+        'max_length': MODEL_CONFIG['max_length'],
+        'temperature': MODEL_CONFIG['temperature'],
+        'do_sample': MODEL_CONFIG['do_sample']
+    }
+
+def answer_deltas(figure_id, figure, message, produce, history=()):
+    """Yanıt parçalarını önce yanıt önbelleğinden, yoksa produce() ile modelden al"""
+    return answer_cache.stream(
+        figure_id, figure, message, llm_router.preferred_model(), sampling_options(), produce, history
+    )
+
+def generate_batch(items):
+    """Aynı figüre ait (sistem prompt'u, sonek) çiftlerini tek bir padded batch olarak modelden geçir
+
+    Decoder-only modellerde üretim sağdan devam ettiği için padding sola
+    yapılır. Yalnızca yeni üretilen token'lar çözülüp döndürülür.
+    """
+    system_prompt = items[0][0]
+    suffixes = [suffix for _, suffix in items]
+    
+    with model_manager.acquire(MODEL_WAIT_TIMEOUT) as bundle:
+        try:
+            inputs = generation_inputs(bundle, system_prompt, suffixes)
+            with torch.inference_mode():
+                outputs = bundle.model.generate(**inputs, **generation_kwargs(bundle))
+        except PREFIX_UNSUPPORTED_ERRORS as e:
+            if system_prompt not in bundle.prefix_cache:
+                raise
+            # Model önbellekten devam etmeyi desteklemiyorsa tam prompt'a dön;
+            # diğer hatalar (ör. bellek yetersizliği) önbelleğe dokunmadan iletilir
+            disable_prefix_cache(bundle, e)
+            inputs = generation_inputs(bundle, system_prompt, suffixes)
+            with torch.inference_mode():
+                outputs = bundle.model.generate(**inputs, **generation_kwargs(bundle))
         
-        # Pad token ayarla
-        if tokenizer.pad_token is None:
-            tokenizer.pad_token = tokenizer.eos_token
+        new_tokens = outputs[:, inputs['input_ids'].shape[1]:]
+        return bundle.tokenizer.batch_decode(new_tokens, skip_special_tokens=True)
+
+# Eş zamanlı istekler kısa bir pencerede toplanıp tek batch'te çalıştırılır
+batch_scheduler = BatchScheduler(
+    generate_batch,
+    max_batch_size=int(os.getenv('BATCH_MAX_SIZE', 8)),
+    max_wait=int(os.getenv('BATCH_MAX_WAIT_MS', 20)) / 1000
+)
+
+def generate_answer(figure, user_message, history=()):
+    """Modelden ham yanıtı al (aynı figüre gelen diğer isteklerle aynı batch'te)"""
+    generated_text = batch_scheduler.run(
+        (figure['system_prompt'], suffix_text(figure, user_message, history)),
+        group=figure['system_prompt']
+    )
+    
+    # Yanıtı temizle
+    return generated_text.split(f"{figure['name']}:")[-1].strip()
+
+def generate_response(figure_id, figure, user_message, history=()):
+    """AI yanıtı oluştur; (yanıt, önbellekten mi) döndürür
+
+    Yedek metinler önbelleğe girmez, yalnızca modelin ürettiği yanıt saklanır.
+    """
+    answer = answer_deltas(
+        figure_id, figure, user_message,
+        lambda: llm_router.completion(figure, user_message, history, figure_id),
+        history
+    )
+    try:
+        ai_response = ''.join(answer)
         
-        # Generator pipeline oluştur
-        generator = pipeline(
-            "text-generation",
-            model=model,
-            tokenizer=tokenizer,
-            device=0 if torch.cuda.is_available() else -1
-        )
+        # Eğer yanıt çok kısa veya boşsa, fallback yanıt
+        if len(ai_response) < 10:
+            ai_response = fallback_response(figure)
         
-        print("✅ Model başarıyla yüklendi!")
+        return ai_response, answer.cached
         
     except Exception as e:
-        print(f"❌ Model yükleme hatası: {e}")
-        # Fallback model
-        MODEL_CONFIG["model_name"] = "gpt2"
-        load_model()
+        print(f"❌ Yanıt oluşturma hatası: {e}")
+        return f"Merhaba! Ben {figure['name']}. Şu anda teknik bir sorun yaşıyorum, lütfen daha sonra tekrar deneyin.", False
 
-def generate_response(figure, user_message):
-    """AI yanıtı oluştur"""
-    try:
-        # Sistem prompt + kullanıcı mesajı
-        prompt = f"{figure['system_prompt']}\n\nKullanıcı: {user_message}\n{figure['name']}:"
-        
-        # Yanıt oluştur
-        response = generator(
-            prompt,
-            max_length=MODEL_CONFIG['max_length'],
-            temperature=MODEL_CONFIG['temperature'],
-            do_sample=MODEL_CONFIG['do_sample'],
-            pad_token_id=tokenizer.pad_token_id,
-            num_return_sequences=1
-        )
+def stream_generate(figure, user_message, history=()):
+    """AI yanıtını token token üret
+
+    generate() ayrı bir thread'de çalışır, TextIteratorStreamer üretilen
+    parçaları bu generator'a aktarır. Model akış bitene kadar ödünç alınır,
+    böylece bu sırada yapılan bir model değişikliği akışı kesmez. Üretim
+    hatası akış bittikten sonra yeniden fırlatılır.
+    """
+    with model_manager.acquire(MODEL_WAIT_TIMEOUT) as bundle:
+        streamer = TextIteratorStreamer(bundle.tokenizer, skip_prompt=True, skip_special_tokens=True)
+        errors = []
         
-        # Yanıtı temizle
-        generated_text = response[0]['generated_text']
-        ai_response = generated_text.split(f"{figure['name']}:")[-1].strip()
+        def run():
+            try:
+                inputs = generation_inputs(bundle, figure['system_prompt'], [suffix_text(figure, user_message, history)])
+                with torch.inference_mode():
+                    bundle.model.generate(**inputs, **generation_kwargs(bundle), streamer=streamer)
+            except Exception as e:
+                errors.append(e)
+                # Okuyan tarafın sonsuza kadar beklememesi için akışı kapat
+                streamer.end()
         
-        # Eğer yanıt çok kısa veya boşsa, fallback yanıt
-        if len(ai_response) < 10:
-            ai_response = f"Merhaba! Ben {figure['name']}. {figure['personality']} Sorunuzu daha detaylı sorabilir misiniz?"
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
         
-        return ai_response
+        for delta in streamer:
+            if delta:
+                yield delta
         
+        thread.join()
+        if errors:
+            raise errors[0]
+
+def stream_with_fallback(figure, deltas):
+    """Akışı ilk 10 karakter birikene kadar tutar, yanıt çok kısa kalırsa yedek metni akıtır"""
+    buffered = ''
+    started = False
+    try:
+        for delta in deltas:
+            if started:
+                yield delta
+                continue
+            buffered += delta
+            if len(buffered.strip()) >= 10:
+                started = True
+                yield buffered.lstrip()
     except Exception as e:
         print(f"❌ Yanıt oluşturma hatası: {e}")
-        return f"Merhaba! Ben {figure['name']}. Şu anda teknik bir sorun yaşıyorum, lütfen daha sonra tekrar deneyin."
+    
+    if not started:
+        yield fallback_response(figure)
+
+# LLM arka uçları (LLM_BACKENDS=transformers,ollama gibi); istek en hızlı
+# sağlıklı arka uca gider, hata olursa sıradakine geçilir
+llm_router = LLMRouter.from_env(build_backends(os.getenv('LLM_BACKENDS') or 'transformers', {
+    'transformers': lambda: TransformersBackend(
+        stream_generate, generate_answer, MODEL_CONFIG,
+        ready_fn=lambda: model_manager.wait_ready(0)
+    ),
+    'ollama': lambda: OllamaBackend.from_env(build_messages),
+    'openai': lambda: OpenAIBackend(build_messages),
+    'stub': StubBackend
+}))
+
+# Engelleyici üretim/TTS çağrıları olay döngüsü dışında, sınırlı sayıda çalışır
+generation_pool = GenerationPool.from_env(sleep=socketio.sleep)
+# Ses biçimi dönüştürme (ffmpeg) LLM işleriyle aynı kuyruğu paylaşmaz
+audio_pool = transcode_pool(sleep=socketio.sleep)
+
+def count_tokens(text):
+    """Sohbet hafızası bütçesi için yüklü modelin tokenizer'ıyla token say"""
+    # Model yüklü değilse yüklemeyi tetikleme (ör. yalnızca ollama kullanılıyorsa)
+    if model_manager.state not in ('ready', 'swapping'):
+        return approximate_tokens(text)
+    try:
+        with model_manager.acquire(0) as bundle:
+            return len(bundle.tokenizer.encode(text))
+    except ModelNotReady:
+        return approximate_tokens(text)
+
+# Kullanıcı + figür başına sohbet hafızası
+conversations = ConversationStore.from_env(count_tokens=count_tokens)
+
+def conversation_owner(data):
+    """Sohbet hafızasının sahibi: istemcinin session_id'si, yoksa socket bağlantısı"""
+    return data.get('session_id') or getattr(request, 'sid', None)
+
+def model_required():
+    """Yalnızca yerel model varsa istekler modelin yüklenmesini beklemeli"""
+    return llm_router.names == ['transformers']
+
+def wait_for_model(timeout=MODEL_WAIT_TIMEOUT, poll_interval=0.1):
+    """Model hazır olana kadar olay döngüsünü bırakarak bekle; süre dolarsa False
+
+    Bekleme havuz işçisi tutmaz; model yüklenirken bekleyen istekler havuzu
+    doldurup diğer isteklere Overloaded döndürtmez.
+    """
+    deadline = time.monotonic() + timeout
+    while not model_manager.wait_ready(0):
+        if time.monotonic() >= deadline:
+            return False
+        socketio.sleep(poll_interval)
+    return True
+
+def timed_speech(timer, deltas, engine=None):
+    """Yanıt akışını seslendirme hattından geçir; llm ve tts sürelerini ölç"""
+    pipeline = SpeechPipeline(timer.wrap('tts', tts.synthesizer(engine)))
+    return pipeline.run(timer.stream('llm', deltas, first='llm_first_chunk'))
+
+def stream_chat_events(figure_id, figure, message, owner=None, timer=None, engine=None):
+    """HTTP akışı için chunk ve ses parçası olaylarını, en sonda tam metni üret
+
+    Cümleler tamamlandıkça seslendirilir; istemci ilk ses parçasını model
+    yazmaya devam ederken çalabilir.
+    """
+    timer = timer or PhaseTimer()
+    parts = []
+    engines = []
+    history = conversations.history(owner, figure_id)
+    answer = answer_deltas(figure_id, figure, message, lambda: llm_router.stream(figure, message, history, figure_id), history)
+    for event, payload in timed_speech(timer, stream_with_fallback(figure, answer), engine):
+        if event == 'chunk':
+            parts.append(payload['delta'])
+        else:
+            engines.append(payload['engine'])
+            payload = encode_segment(payload)
+        yield event, payload
+    
+    ai_response = ''.join(parts).strip()
+    conversations.record(owner, figure_id, figure['name'], message, ai_response)
+    
+    yield 'done', {
+        "response": ai_response,
+        "figure_name": figure['name'],
+        "audio_segments": len(engines),
+        "tts_engine": tts.engines_label(engines),
+        "cached": answer.cached,
+        "timings": timer.as_dict(),
+        "timestamp": datetime.now().isoformat(),
+        "model": MODEL_CONFIG["model_name"]
+    }
+
+def model_loading_response():
+    """Model hazır değilken dönen 503 yanıtı"""
+    response = jsonify({
+        "error": "Model yükleniyor, lütfen biraz sonra tekrar deneyin",
+        "state": model_manager.state
+    })
+    response.status_code = 503
+    response.headers['Retry-After'] = '10'
+    return response
 
 @app.route('/')
 def home():
@@ -131,13 +547,14 @@ def home():
         "version": "3.0.0",
         "model": MODEL_CONFIG["model_name"],
         "device": "cuda" if torch.cuda.is_available() else "cpu",
+        "cpu_profile": CPU_PROFILE["enabled"],
         "available_figures": list(HISTORICAL_FIGURES.keys())
     })
 
 @app.route('/api/figures', methods=['GET'])
 def get_figures():
-    """Mevcut tarihi figürleri listele"""
-    return jsonify(HISTORICAL_FIGURES)
+    """Mevcut tarihi figürleri listele (önceden hazırlanmış gövde, ETag ile 304)"""
+    return catalog_response(HISTORICAL_FIGURES, request)
 
 @app.route('/api/chat', methods=['POST'])
 def chat():
@@ -155,32 +572,50 @@ def chat():
         
         figure = HISTORICAL_FIGURES[figure_id]
         
-        # Model yüklü değilse yükle
-        if generator is None:
-            load_model()
+        try:
+            engine = tts.resolve_engine(data.get('tts_engine'))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        timer = request_timer()
         
-        # AI yanıtı oluştur
-        ai_response = generate_response(figure, message)
+        # Tek arka uç yerel modelse ve model yükleniyorsa bekle
+        if model_required() and not timer.wrap('model_wait', wait_for_model)():
+            return model_loading_response()
         
-        # TTS ile ses dosyası oluştur
-        try:
-            tts = gTTS(text=ai_response, lang='tr', slow=False)
-            audio_buffer = io.BytesIO()
-            tts.write_to_fp(audio_buffer)
-            audio_buffer.seek(0)
-            audio_base64 = base64.b64encode(audio_buffer.read()).decode()
-        except Exception as e:
-            print(f"TTS hatası: {e}")
-            audio_base64 = None
+        owner = conversation_owner(data)
         
-        return jsonify({
-            "response": ai_response,
-            "figure_name": figure['name'],
-            "audio": audio_base64,
-            "timestamp": datetime.now().isoformat(),
-            "model": MODEL_CONFIG["model_name"]
-        })
+        # Akış modu: token'lar üretildikçe gönderilir
+        if wants_stream(request, data):
+            job = generation_pool.submit(stream_chat_events(figure_id, figure, message, owner, timer, engine), timer)
+            return stream_response(job.results(), sse=wants_sse(request))
+        
+        def respond():
+            # AI yanıtı oluştur
+            with timer.phase('llm'):
+                ai_response, cached = generate_response(figure_id, figure, message, conversations.history(owner, figure_id))
+            conversations.record(owner, figure_id, figure['name'], message, ai_response)
+            
+            # TTS ile ses dosyası oluştur; cümleler paralel seslendirilir
+            _, audio_key, used_engine = speak([ai_response], timer.wrap('tts', tts.synthesizer(engine)))
+            return ai_response, cached, audio_key, used_engine
+        
+        ai_response, cached, audio_key, used_engine = generation_pool.call(respond, timer=timer)
+        
+        with serialize_phase(timer):
+            response = jsonify({
+                "response": ai_response,
+                "figure_name": figure['name'],
+                "audio_url": audio_url(audio_key),
+                "tts_engine": used_engine,
+                "cached": cached,
+                "timestamp": datetime.now().isoformat(),
+                "model": MODEL_CONFIG["model_name"]
+            })
+        return response
         
+    except Overloaded as e:
+        return overloaded_response(e)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -194,23 +629,161 @@ def text_to_speech():
         if not text:
             return jsonify({"error": "text gerekli"}), 400
         
-        tts = gTTS(text=text, lang='tr', slow=False)
-        audio_buffer = io.BytesIO()
-        tts.write_to_fp(audio_buffer)
-        audio_buffer.seek(0)
-        audio_base64 = base64.b64encode(audio_buffer.read()).decode()
+        try:
+            engine = tts.resolve_engine(data.get('engine'))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         
-        return jsonify({
-            "audio": audio_base64,
-            "timestamp": datetime.now().isoformat()
-        })
+        timer = request_timer()
+        key, _, used_engine = generation_pool.call(timer.wrap('tts', lambda: tts.synthesize_with_key(text, engine=engine)), timer=timer)
+        
+        with serialize_phase(timer):
+            response = jsonify({
+                "audio_url": audio_url(key),
+                "tts_engine": used_engine,
+                "timestamp": datetime.now().isoformat()
+            })
+        return response
         
+    except Overloaded as e:
+        return overloaded_response(e)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/tts/batch', methods=['POST'])
+def text_to_speech_batch():
+    """Metin listesini tek istekte seslendir; aynı metinler bir kez seslendirilir
+
+    Sonuçlar girdi sırasıyla döner: akış modunda (stream veya Accept: NDJSON/SSE)
+    her öğe hazır olunca, aksi halde hepsi tek JSON yanıtta.
+    """
+    try:
+        data = request.get_json() or {}
+        
+        try:
+            texts = batch_texts(data.get('texts'))
+            engine = tts.resolve_engine(data.get('engine'))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        timer = request_timer()
+        events = batch_events(texts, timer.wrap('tts', tts.synthesizer(engine)))
+        
+        if wants_stream(request, data):
+            job = generation_pool.submit(events, timer)
+            return stream_response(job.results(), sse=wants_sse(request))
+        
+        results = generation_pool.call(lambda: list(events), timer=timer)
+        
+        with serialize_phase(timer):
+            response = jsonify(dict(
+                results[-1][1],
+                items=[payload for event, payload in results if event == 'item'],
+                timestamp=datetime.now().isoformat()
+            ))
+        return response
+        
+    except Overloaded as e:
+        return overloaded_response(e)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/tts/engines', methods=['GET'])
+def tts_engines():
+    """Kullanılabilir TTS motorları, varsayılan ve yedek motor"""
+    return jsonify(tts.engines_info())
+
+@app.route('/api/audio/<audio_hash>', methods=['GET'])
+def get_audio(audio_hash):
+    """Seslendirilmiş sesi ikili olarak gönder (ETag, Range, önbellek başlıkları)
+
+    ?format=ogg|webm|mp3&bitrate=24k veya Accept başlığıyla daha küçük biçim istenebilir.
+    """
+    return send_audio(audio_hash, request, audio_pool)
+
+@app.route('/api/audio/formats', methods=['GET'])
+def audio_format_stats():
+    """Biçim başına konuşma saniyesi başına bayt ve dönüştürme önbelleği"""
+    return jsonify(dict(get_transcoder().stats(), pool=audio_pool.stats()))
+
+@app.route('/api/tts/stats', methods=['GET'])
+def tts_stats():
+    """TTS önbellek isabet/ıskalama istatistikleri"""
+    return jsonify(get_cache().stats())
+
+@app.route('/api/chat/stats', methods=['GET'])
+def chat_stats():
+    """Yanıt önbelleği isabet/ıskalama istatistikleri"""
+    return jsonify(answer_cache.stats())
+
+@app.route('/api/conversation/<figure_id>', methods=['DELETE'])
+def clear_conversation(figure_id):
+    """Figürle olan sohbet hafızasını sil (yeni sohbet)"""
+    session_id = request.args.get('session_id')
+    if not session_id:
+        return jsonify({"error": "session_id gerekli"}), 400
+    conversations.clear(session_id, figure_id)
+    return jsonify({"message": "Sohbet geçmişi silindi"})
+
+@app.route('/api/conversation/stats', methods=['GET'])
+def conversation_stats():
+    """Sohbet hafızası oturum ve tahliye sayaçları"""
+    return jsonify(conversations.stats())
+
+@app.route('/api/generation/stats', methods=['GET'])
+def generation_stats():
+    """Üretim havuzunun doluluk ve kuyruk durumu"""
+    return jsonify(generation_pool.stats())
+
+@app.route('/api/llm/backends', methods=['GET'])
+def get_llm_backends():
+    """LLM arka uçlarının gecikme, hata oranı ve sağlık durumu"""
+    return jsonify(llm_router.stats())
+
+# /metrics: anlık değerler kazıma (scrape) sırasında okunur
+metrics.gauge('generation_active', 'Çalışan üretim işleri', fn=lambda: generation_pool.stats()['active'])
+metrics.gauge('generation_queue_depth', 'Kuyrukta bekleyen üretim işleri', fn=lambda: generation_pool.stats()['waiting'])
+metrics.counter('cache_lookups_total', 'Önbellek aramaları', ['cache', 'result'], fn=lambda: {
+    ('answer', 'hit'): answer_cache.hits,
+    ('answer', 'miss'): answer_cache.misses,
+    ('tts', 'memory_hit'): get_cache().memory_hits,
+    ('tts', 'disk_hit'): get_cache().disk_hits,
+    ('tts', 'miss'): get_cache().misses
+})
+metrics.gauge('cache_hit_ratio', 'Önbellek isabet oranı', ['cache'], fn=lambda: {
+    ('answer',): answer_cache.stats()['hit_ratio'],
+    ('tts',): get_cache().stats()['hit_ratio']
+})
+metrics.gauge('conversation_sessions', 'Bellekteki sohbet oturumları', fn=lambda: conversations.stats()['sessions'])
+metrics.gauge('model_ready', 'Yerel model hizmette mi (1/0)', fn=lambda: 1 if model_manager.state in ('ready', 'swapping') else 0)
+SOCKET_CONNECTIONS = metrics.gauge('socket_connections', 'Açık socket bağlantıları')
+SOCKET_CONNECTS = metrics.counter('socket_connects_total', 'Kabul edilen socket bağlantıları')
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus metin biçiminde metrikler"""
+    return metrics_response()
+
+@app.route('/api/admin/profile', methods=['POST'])
+def admin_profile():
+    """Canlı süreçte örnekleyici profil (X-Admin-Token gerekli); flamegraph için collapsed yığınlar"""
+    return profile_request(request, sleep=socketio.sleep)
+
+@app.route('/api/admin/figures/reload', methods=['POST'])
+def admin_reload_figures():
+    """Figür dosyasını beklemeden yeniden yükle (X-Admin-Token gerekli)"""
+    if not admin_authorized(request):
+        return jsonify({"error": "Yetkisiz"}), 403
+    changed = HISTORICAL_FIGURES.reload()
+    return jsonify(dict(HISTORICAL_FIGURES.stats(), changed=changed))
+
 @app.route('/api/models/switch', methods=['POST'])
 def switch_model():
-    """Model değiştir"""
+    """Model değiştir
+
+    Yeni model arka planda yüklenir; mevcut model yükleme bitene kadar
+    yanıt vermeye devam eder. Durum /health üzerinden izlenebilir.
+    """
     try:
         data = request.get_json()
         new_model = data.get('model_name')
@@ -218,37 +791,55 @@ def switch_model():
         if not new_model:
             return jsonify({"error": "model_name gerekli"}), 400
         
-        MODEL_CONFIG["model_name"] = new_model
-        
-        # Yeni modeli yükle
-        load_model()
+        if not model_manager.start_loading(new_model):
+            return jsonify({
+                "error": f"Şu anda başka bir model yükleniyor: {model_manager.loading}",
+                "current_model": MODEL_CONFIG["model_name"]
+            }), 409
         
         return jsonify({
-            "message": f"Model {new_model} olarak değiştirildi",
-            "current_model": MODEL_CONFIG["model_name"]
-        })
+            "message": f"Model {new_model} arka planda yükleniyor",
+            "current_model": MODEL_CONFIG["model_name"],
+            "loading_model": new_model
+        }), 202
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/health', methods=['GET'])
+def health():
+    """Süreç ayakta mı; model yükleme durumu ve bellek kullanımı"""
+    return jsonify(model_manager.health())
+
+# Warm-up yalnızca süreç içindeki modeli ısıtır
+local_backend = next((backend for backend in llm_router.backends if backend.local), None)
+
+def prime_model(figure_id, figure):
+    """Yerel model yüklendiyse figür için kısa bir üretim yap; zamanında yüklenmediyse atla"""
+    if not model_manager.wait_ready(MODEL_WAIT_TIMEOUT):
+        return False
+    prime_llm(local_backend.stream, figure)
+
+# Açılıştan sonra selamlama/quiz/zaman çizelgesi ve yedek yanıt seslerini, modeli düşük öncelikle ısıt
+warmup = Warmup.from_env(busy_fn=lambda: generation_pool.stats()['active'] > 0).add_figures(
+    HISTORICAL_FIGURES,
+    fallback_fn=fallback_response,
+    prime_fn=prime_model if local_backend is not None else None,
+    prime_local=True
+).start()
+
+@app.route('/ready', methods=['GET'])
+def ready():
+    """Model istek karşılamaya hazır ve warm-up tamamlandı mı"""
+    status = dict(model_manager.health(), warmup=warmup.stats())
+    status['ready'] = status['ready'] and status['warmup']['ready']
+    return jsonify(status), 200 if status['ready'] else 503
+
 @app.route('/api/models/available', methods=['GET'])
 def get_available_models():
     """Mevcut modelleri listele"""
-    available_models = [
-        "microsoft/DialoGPT-medium",
-        "microsoft/DialoGPT-small",
-        "microsoft/DialoGPT-large",
-        "facebook/blenderbot-400M-distill",
-        "facebook/blenderbot-1B-distill",
-        "EleutherAI/gpt-neo-2.7B",
-        "EleutherAI/gpt-neo-1.3B",
-        "gpt2",
-        "gpt2-medium",
-        "gpt2-large"
-    ]
-    
     return jsonify({
-        "models": available_models,
+        "models": AVAILABLE_MODELS,
         "current_model": MODEL_CONFIG["model_name"],
         "recommended": "microsoft/DialoGPT-medium"
     })
@@ -256,6 +847,8 @@ def get_available_models():
 @socketio.on('connect')
 def handle_connect():
     print('Kullanıcı bağlandı')
+    SOCKET_CONNECTIONS.inc()
+    SOCKET_CONNECTS.inc()
     emit('connected', {
         'message': 'Sunucuya başarıyla bağlandınız',
         'model': MODEL_CONFIG["model_name"]
@@ -263,6 +856,7 @@ def handle_connect():
 
 @socketio.on('disconnect')
 def handle_disconnect():
+    SOCKET_CONNECTIONS.dec()
     print('Kullanıcı ayrıldı')
 
 @socketio.on('chat_message')
@@ -274,22 +868,59 @@ def handle_chat_message(data):
         
         if figure_id in HISTORICAL_FIGURES:
             figure = HISTORICAL_FIGURES[figure_id]
+            engine = tts.resolve_engine(data.get('tts_engine'))
+            timer = PhaseTimer()
             
-            # Model yüklü değilse yükle
-            if generator is None:
-                load_model()
+            # Tek arka uç yerel modelse ve model yükleniyorsa bekle
+            if model_required() and not timer.wrap('model_wait', wait_for_model)():
+                emit('error', {'message': 'Model yükleniyor, lütfen biraz sonra tekrar deneyin'})
+                return
             
-            # AI yanıtı oluştur
-            ai_response = generate_response(figure, message)
+            # AI yanıtını parça parça istemciye gönder,
+            # istenirse cümleleri üretimle paralel seslendir
+            owner = conversation_owner(data)
+            history = conversations.history(owner, figure_id)
+            answer = answer_deltas(figure_id, figure, message, lambda: llm_router.stream(figure, message, history, figure_id), history)
+            deltas = stream_with_fallback(figure, answer)
+            if data.get('audio'):
+                events = timed_speech(timer, deltas, engine)
+            else:
+                events = (('chunk', {'delta': delta}) for delta in timer.stream('llm', deltas, first='llm_first_chunk'))
+            
+            # Üretim işçi havuzunda çalışır; kuyrukta beklerken sıra bildirilir
+            job = generation_pool.submit(events, timer)
+            on_position = lambda position: emit('queue_position', {'position': position, 'figure_name': figure['name']})
+            
+            parts = []
+            engines = []
+            for event, payload in job.results(on_position):
+                if event == 'chunk':
+                    parts.append(payload['delta'])
+                    emit('ai_response_chunk', {
+                        'delta': payload['delta'],
+                        'figure_name': figure['name']
+                    })
+                else:
+                    engines.append(payload['engine'])
+                    emit('audio_segment', dict(encode_segment(payload), figure_name=figure['name']))
+                socketio.sleep(0)
+            
+            ai_response = ''.join(parts).strip()
+            conversations.record(owner, figure_id, figure['name'], message, ai_response)
             
-            # Yanıtı istemciye gönder
+            # Tam metni taşıyan son olay
             emit('ai_response', {
                 'response': ai_response,
                 'figure_name': figure['name'],
+                'cached': answer.cached,
+                'tts_engine': tts.engines_label(engines),
+                'timings': timer.as_dict(),
                 'timestamp': datetime.now().isoformat(),
                 'model': MODEL_CONFIG["model_name"]
             })
             
+    except Overloaded as e:
+        emit('error', {'message': 'Sunucu yoğun, lütfen biraz sonra tekrar deneyin', 'retry_after': e.retry_after})
     except Exception as e:
         emit('error', {'message': str(e)})
 
@@ -301,6 +932,6 @@ if __name__ == '__main__':
     print(f"🖥️ Device: {'cuda' if torch.cuda.is_available() else 'cpu'}")
     
     # Modeli arka planda yükle
-    threading.Thread(target=load_model, daemon=True).start()
+    model_manager.start_loading(MODEL_CONFIG['model_name'])
     
     socketio.run(app, host='0.0.0.0', port=port, debug=True)
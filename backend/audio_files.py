@@ -0,0 +1,89 @@
+"""Önbellekteki sesleri JSON içine gömmek yerine ikili kaynak olarak sun"""
+import os
+import re
+import time
+
+from flask import jsonify, send_file
+
+from admission import GenerationPool, Overloaded, overloaded_response
+from audio_formats import get_transcoder, negotiate, variant_key
+from tts_cache import get_cache
+
+AUDIO_HASH_RE = re.compile(r'^[0-9a-f]{64}$')
+# İçerik adresli olduğundan aynı URL'nin içeriği hiç değişmez
+AUDIO_MAX_AGE = 365 * 24 * 3600
+
+
+def audio_url(key):
+    """Ses kaydının istemcinin indireceği yolu"""
+    return f"/api/audio/{key}" if key else None
+
+
+def transcode_pool(sleep=time.sleep):
+    """Biçim dönüştürme (ffmpeg) işleri için ayrı, sınırlı havuz"""
+    return GenerationPool(
+        max_concurrent=int(os.getenv('AUDIO_TRANSCODE_WORKERS', 0)) or os.cpu_count() or 2,
+        max_queue=int(os.getenv('AUDIO_TRANSCODE_QUEUE', 32)),
+        sleep=sleep,
+        name='transcode'
+    )
+
+
+def send_audio(audio_hash, request=None, pool=None):
+    """Sesi ETag, If-None-Match ve Range desteğiyle gönder
+
+    request verilirse istenen biçim (?format=, ?bitrate= veya Accept)
+    belirlenir; asıl MP3 dışındaki biçimler önbellekte yoksa pool'da
+    dönüştürülür.
+    """
+    if not AUDIO_HASH_RE.match(audio_hash):
+        return jsonify({"error": "Geçersiz ses kimliği"}), 404
+
+    audio_format, bitrate = None, None
+    if request is not None:
+        try:
+            audio_format, bitrate = negotiate(request.args, request.accept_mimetypes)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+    cache = get_cache()
+    if audio_format is None:
+        path, mimetype, etag = cache.file_path(audio_hash), 'audio/mpeg', audio_hash
+    else:
+        transcoder = get_transcoder()
+        etag = variant_key(audio_hash, audio_format, bitrate)
+        path = transcoder.file_path(etag)
+        if path is None:
+            try:
+                if pool.call(lambda: _variant(cache, transcoder, audio_hash, audio_format, bitrate)):
+                    path = transcoder.file_path(etag)
+            except Overloaded as e:
+                return overloaded_response(e)
+            except Exception as e:
+                return jsonify({"error": f"Ses dönüştürülemedi: {e}"}), 500
+        mimetype = audio_format.mimetype
+
+    if path is None:
+        return jsonify({"error": "Ses bulunamadı"}), 404
+
+    # send_file dosya yolundan boyutu bildiği için Range ve 304 yanıtlarını
+    # kendisi üretir
+    response = send_file(
+        path,
+        mimetype=mimetype,
+        conditional=True,
+        etag=etag,
+        max_age=AUDIO_MAX_AGE
+    )
+    response.headers['Cache-Control'] = f"public, max-age={AUDIO_MAX_AGE}, immutable"
+    if request is not None and 'format' not in request.args:
+        response.vary.add('Accept')
+    return response
+
+
+def _variant(cache, transcoder, audio_hash, audio_format, bitrate):
+    """Varyantın anahtarı; asıl ses önbellekte yoksa None (havuzda çalışır)"""
+    source = cache.get(audio_hash)
+    if source is None:
+        return None
+    return transcoder.ensure(audio_hash, source, audio_format, bitrate)
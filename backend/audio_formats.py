@@ -0,0 +1,193 @@
+"""Sıkıştırılmış ses biçimleri: Opus (Ogg/WebM) ve düşük bit hızlı mono MP3
+
+TTS motorları MP3 üretir ve önbellek MP3 saklar. İstemci /api/audio/<hash>
+isteğinde ?format=ogg&bitrate=24k parametreleriyle veya Accept başlığıyla
+daha küçük bir biçim isteyebilir. Dönüştürme pydub (ffmpeg) ile istek
+thread'i dışında yapılır ve sonuç ayrı bir içerik adresli önbellekte
+(TTS_VARIANT_CACHE_DIR) saklanır; aynı varyant aynı anda bir kez üretilir.
+Her biçim için konuşmanın saniyesi başına bayt (bytes/s) ölçülür.
+"""
+import hashlib
+import io
+import os
+import re
+import threading
+from collections import namedtuple
+
+import metrics
+from tts_cache import TTSCache
+
+AUDIO_BYTES_PER_SECOND = metrics.histogram(
+    'audio_bytes_per_second', 'Konuşmanın saniyesi başına ses baytı', ['format'],
+    buckets=(1000, 2000, 3000, 4000, 6000, 8000, 12000, 16000, 24000, 32000)
+)
+TRANSCODE_SECONDS = metrics.histogram('audio_transcode_seconds', 'Ses biçimi dönüştürme süresi', ['format'])
+
+AudioFormat = namedtuple('AudioFormat', 'name mimetype container codec default_bitrate parameters')
+
+FORMATS = {
+    'mp3': AudioFormat('mp3', 'audio/mpeg', 'mp3', None, None, ()),
+    'ogg': AudioFormat('ogg', 'audio/ogg; codecs=opus', 'ogg', 'libopus', '24k', ('-application', 'voip')),
+    'webm': AudioFormat('webm', 'audio/webm; codecs=opus', 'webm', 'libopus', '24k', ('-application', 'voip')),
+}
+# ?format=opus, Ogg kabında Opus demektir
+ALIASES = {'opus': 'ogg'}
+MIMETYPES = {'audio/mpeg': 'mp3', 'audio/mp3': 'mp3', 'audio/ogg': 'ogg', 'audio/webm': 'webm'}
+
+BITRATE_RE = re.compile(r'^(\d{1,3})k$')
+MIN_BITRATE_KBPS = 8
+MAX_BITRATE_KBPS = 128
+
+DEFAULT_VARIANT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'tts-variants')
+
+
+def negotiate(args, accept_mimetypes):
+    """İstenen (biçim, bit hızı); asıl MP3 isteniyorsa (None, None)
+
+    Öncelik ?format= parametresindedir; yoksa Accept başlığında en yüksek
+    kaliteli desteklenen tür seçilir (*/* asıl MP3'ü seçer). Hatalı
+    değerlerde ValueError.
+    """
+    name = (args.get('format') or '').lower()
+    bitrate = args.get('bitrate')
+    if not name:
+        mimetype = accept_mimetypes.best_match(list(MIMETYPES), default='audio/mpeg')
+        name = MIMETYPES[mimetype]
+    name = ALIASES.get(name, name)
+    if name not in FORMATS:
+        raise ValueError(f"Desteklenmeyen ses biçimi: {name} (seçenekler: {', '.join(FORMATS)}, opus)")
+    audio_format = FORMATS[name]
+
+    if bitrate:
+        match = BITRATE_RE.match(bitrate.lower())
+        if not match or not MIN_BITRATE_KBPS <= int(match.group(1)) <= MAX_BITRATE_KBPS:
+            raise ValueError(f"bitrate {MIN_BITRATE_KBPS}k-{MAX_BITRATE_KBPS}k arasında olmalı (ör. 24k)")
+        bitrate = f"{int(match.group(1))}k"
+    else:
+        bitrate = audio_format.default_bitrate
+
+    if audio_format.name == 'mp3' and bitrate is None:
+        return None, None
+    return audio_format, bitrate
+
+
+def variant_key(source_key, audio_format, bitrate):
+    """Varyantın içerik adresli anahtarı"""
+    raw = f"{source_key}|{audio_format.name}|{bitrate}"
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def transcode(mp3, audio_format, bitrate):
+    """MP3'ü mono olarak istenen biçime çevir; (baytlar, konuşma süresi sn) döndür"""
+    from pydub import AudioSegment
+
+    segment = AudioSegment.from_file(io.BytesIO(mp3), format='mp3').set_channels(1)
+    out = io.BytesIO()
+    segment.export(
+        out,
+        format=audio_format.container,
+        codec=audio_format.codec,
+        bitrate=bitrate,
+        parameters=list(audio_format.parameters)
+    )
+    return out.getvalue(), len(segment) / 1000
+
+
+class Transcoder:
+    """Varyantları üretip önbellekte tutar; biçim başına bytes/s istatistiği"""
+
+    def __init__(self, cache):
+        self.cache = cache
+        self._lock = threading.Lock()
+        self._inflight = {}
+        # biçim -> [bayt, saniye, dönüşüm sayısı]
+        self._totals = {}
+
+        self.transcodes = 0
+        self.errors = 0
+
+    @classmethod
+    def from_env(cls):
+        """Ayarları ortam değişkenlerinden oku"""
+        return cls(TTSCache(
+            directory=os.getenv('TTS_VARIANT_CACHE_DIR', DEFAULT_VARIANT_CACHE_DIR),
+            memory_items=int(os.getenv('TTS_VARIANT_CACHE_MEMORY_ITEMS', 256)),
+            memory_bytes=int(os.getenv('TTS_VARIANT_CACHE_MEMORY_MB', 16)) * 1024 * 1024,
+            disk_bytes=int(os.getenv('TTS_VARIANT_CACHE_DISK_MB', 256)) * 1024 * 1024,
+            # Farklı biçimler aynı dizinde; tür yanıtta biçimden belirlenir
+            extension='audio'
+        ))
+
+    def file_path(self, key):
+        return self.cache.file_path(key)
+
+    def ensure(self, source_key, source, audio_format, bitrate):
+        """Varyant önbellekte yoksa üret; anahtarını döndür
+
+        Aynı varyantı isteyen eş zamanlı çağrılar ilk dönüşümü bekler.
+        """
+        key = variant_key(source_key, audio_format, bitrate)
+        with self._lock:
+            lock = self._inflight.setdefault(key, threading.Lock())
+        try:
+            with lock:
+                if self.cache.file_path(key) is not None:
+                    return key
+                with TRANSCODE_SECONDS.time(format=audio_format.name):
+                    try:
+                        data, seconds = transcode(source, audio_format, bitrate)
+                    except Exception:
+                        with self._lock:
+                            self.errors += 1
+                        raise
+                self.cache.put(key, data)
+                self._record(audio_format.name, len(data), seconds)
+                self._record('source_mp3', len(source), seconds)
+                return key
+        finally:
+            with self._lock:
+                if self._inflight.get(key) is lock and not lock.locked():
+                    del self._inflight[key]
+
+    def _record(self, name, size, seconds):
+        if seconds <= 0:
+            return
+        AUDIO_BYTES_PER_SECOND.observe(size / seconds, format=name)
+        with self._lock:
+            totals = self._totals.setdefault(name, [0, 0.0, 0])
+            totals[0] += size
+            totals[1] += seconds
+            totals[2] += 1
+            if name != 'source_mp3':
+                self.transcodes += 1
+
+    def stats(self):
+        with self._lock:
+            formats = {
+                name: {
+                    "bytes_per_second": size / seconds if seconds else None,
+                    "speech_seconds": seconds,
+                    "count": count
+                }
+                for name, (size, seconds, count) in self._totals.items()
+            }
+            return {
+                "formats": formats,
+                "transcodes": self.transcodes,
+                "errors": self.errors,
+                "cache": self.cache.stats()
+            }
+
+
+_transcoder = None
+_transcoder_lock = threading.Lock()
+
+
+def get_transcoder():
+    """Süreç genelindeki dönüştürücü (ilk kullanımda kurulur)"""
+    global _transcoder
+    if _transcoder is None:
+        with _transcoder_lock:
+            if _transcoder is None:
+                _transcoder = Transcoder.from_env()
+    return _transcoder
@@ -0,0 +1,126 @@
+"""Giriş yolu yardımcıları: parola özetleme havuzu ve JWT doğrulama önbelleği
+
+Parola özetleme (pbkdf2/scrypt) bilerek yavaştır; olay döngüsünde
+çalışırsa ders zili çaldığında aynı anda giriş yapan yüzlerce öğrenci tüm
+işçiyi kilitler. PasswordHasher bu işi sınırlı bir işçi havuzunda yapar
+(hashlib GIL'i bıraktığı için thread'ler gerçekten paralel çalışır) ve özet
+maliyeti PASSWORD_HASH_METHOD ile ayarlanır. TokenCache ise socket
+bağlantılarında aynı token'ın imzasını her seferinde yeniden doğrulamaz.
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from admission import GenerationPool
+
+DEFAULT_HASH_METHOD = 'pbkdf2:sha256:600000'
+
+
+class PasswordHasher:
+    """Parola özetleme ve doğrulamayı sınırlı işçi havuzunda çalıştırır
+
+    - method: werkzeug biçiminde özet yöntemi ve maliyeti, ör.
+      pbkdf2:sha256:600000 veya scrypt:32768:8:1
+    - Doğrulama her zaman kayıtlı özetin kendi yöntemiyle yapılır; yöntemi
+      farklı olan özetler needs_rehash ile girişte yenilenebilir.
+    """
+
+    def __init__(self, pool, method=DEFAULT_HASH_METHOD):
+        self.pool = pool
+        self.method = method
+        # Kısa yazımlar (ör. pbkdf2:sha256, scrypt) özete werkzeug'un tam
+        # biçimiyle yazılır; karşılaştırma o biçimle yapılır
+        self.prefix = generate_password_hash('x', method=method).split('$', 1)[0]
+
+    @classmethod
+    def from_env(cls, sleep=time.sleep):
+        """Ayarları ortam değişkenlerinden oku"""
+        pool = GenerationPool(
+            max_concurrent=int(os.getenv('AUTH_HASH_WORKERS', os.cpu_count() or 2)),
+            max_queue=int(os.getenv('AUTH_HASH_QUEUE', 512)),
+            sleep=sleep,
+            name='auth'
+        )
+        return cls(pool, os.getenv('PASSWORD_HASH_METHOD') or DEFAULT_HASH_METHOD)
+
+    def hash(self, password):
+        """Parolanın özetini havuzda üret"""
+        return self.pool.call(lambda: generate_password_hash(password, method=self.method))
+
+    def verify(self, password_hash, password):
+        """Parolayı kayıtlı özetle havuzda karşılaştır"""
+        return self.pool.call(lambda: check_password_hash(password_hash, password))
+
+    def needs_rehash(self, password_hash):
+        """Özet, ayarlı yöntem ve maliyetten farklı bir yöntemle mi üretilmiş?"""
+        return password_hash.split('$', 1)[0] != self.prefix
+
+    def stats(self):
+        return dict(self.pool.stats(), method=self.method)
+
+
+class TokenCache:
+    """Doğrulanmış JWT'lerin kimliğini süresi dolana kadar saklar
+
+    decode(token) imzayı ve süreyi doğrulayıp claim sözlüğünü döndürmeli,
+    geçersiz token'da hata fırlatmalıdır (ör. flask_jwt_extended.decode_token).
+    Başarısız doğrulamalar saklanmaz. Anahtar token'ın kendisi değil SHA-256
+    özetidir.
+    """
+
+    def __init__(self, decode, max_entries=10000, identity_claim='sub'):
+        self.decode = decode
+        self.max_entries = max_entries
+        self.identity_claim = identity_claim
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls, decode):
+        """Ayarları ortam değişkenlerinden oku"""
+        return cls(decode, max_entries=int(os.getenv('AUTH_TOKEN_CACHE_SIZE', 10000)))
+
+    def verify(self, token):
+        """Token'daki kimliği döndür; geçersizse decode'un hatası fırlatılır"""
+        key = hashlib.sha256(token.encode('utf-8')).digest()
+        now = time.time()
+        with self._lock:
+            item = self._entries.get(key)
+            if item is not None:
+                if item[1] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return item[0]
+                del self._entries[key]
+            self.misses += 1
+
+        claims = self.decode(token)
+        identity = claims[self.identity_claim]
+        # Süresi olmayan token'lar en fazla 5 dakika saklanır
+        expires = claims.get('exp') or now + 300
+
+        with self._lock:
+            self._entries[key] = (identity, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return identity
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries
+            }
@@ -0,0 +1,93 @@
+"""Eş zamanlı üretim isteklerini kısa bir pencerede toplayıp tek batch'te çalıştıran zamanlayıcı"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class BatchScheduler:
+    """Dinamik batch zamanlayıcısı
+
+    İlk istek geldiğinde en fazla max_wait saniye boyunca (veya max_batch_size
+    dolana kadar) diğer istekler beklenir, ardından hepsi run_batch'e tek
+    liste olarak verilir. Aynı batch'e yalnızca aynı gruptaki (ör. aynı
+    örnekleme ayarları) istekler girer; farklı gruplar ayrı çalıştırılır.
+    run_batch girdilerle aynı sırada sonuç listesi döndürmelidir.
+    """
+
+    def __init__(self, run_batch, max_batch_size=8, max_wait=0.02):
+        self.run_batch = run_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+
+        self._queue = queue.Queue()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+
+        self.batches = 0
+        self.items = 0
+
+    def submit(self, item, group=None):
+        """İsteği kuyruğa ekle; sonucu taşıyacak Future döndür"""
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((group, item, future))
+        return future
+
+    def run(self, item, group=None, timeout=None):
+        """İsteği kuyruğa ekle ve sonucunu bekle"""
+        return self.submit(item, group).result(timeout)
+
+    def stats(self):
+        """Toplam batch sayısı ve ortalama batch boyutu"""
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": self.items / self.batches if self.batches else 0.0,
+            "queued": self._queue.qsize()
+        }
+
+    def _ensure_worker(self):
+        if self._worker is not None:
+            return
+        with self._worker_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._loop, name='batch-scheduler', daemon=True)
+                self._worker.start()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self):
+        while True:
+            groups = {}
+            for group, item, future in self._collect():
+                # İptal edilmiş istekleri modele göndermeye gerek yok
+                if future.set_running_or_notify_cancel():
+                    groups.setdefault(group, []).append((item, future))
+
+            for entries in groups.values():
+                self._run_group(entries)
+
+    def _run_group(self, entries):
+        try:
+            results = self.run_batch([item for item, _ in entries])
+        except Exception as e:
+            for _, future in entries:
+                future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.items += len(entries)
+        for (_, future), result in zip(entries, results):
+            future.set_result(result)
@@ -0,0 +1,128 @@
+"""Dinamik batch zamanlayıcısını istek başına üretimle karşılaştırır
+
+Kullanım (backend klasöründen):
+    python benchmarks/bench_batching.py --model gpt2 --users 1 8 32
+
+Her eş zamanlı kullanıcı sayısı için iki yol ölçülür:
+  - direct:  her istek generator(...) ile tek başına çalışır (eski yol)
+  - batched: istekler BatchScheduler üzerinden toplanıp batch'lenir
+Sonuçlar (istek/sn, p50/p95 gecikme) JSON olarak yazdırılır.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Warm-up thread'i ölçümlerle yarışmasın ve karşılaştırılan önbellekleri doldurmasın
+os.environ.setdefault('WARMUP_ENABLED', 'false')
+
+import app_huggingface_transformers as backend  # noqa: E402
+from batching import BatchScheduler  # noqa: E402
+
+QUESTIONS = [
+    "İstanbul'u nasıl fethettin?",
+    "En büyük zaferin hangisiydi?",
+    "Gençlere ne tavsiye edersin?",
+    "Bilime neden önem verdin?"
+]
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run_load(call, users, requests_per_user):
+    """users kadar thread ile call(figure, question) çağır, gecikmeleri topla"""
+    figure = backend.HISTORICAL_FIGURES['fatih_sultan_mehmet']
+    latencies = []
+    lock = threading.Lock()
+
+    def worker(worker_id):
+        for i in range(requests_per_user):
+            question = QUESTIONS[(worker_id + i) % len(QUESTIONS)]
+            started = time.perf_counter()
+            call(figure, question)
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(users)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    return {
+        "requests": len(latencies),
+        "throughput_rps": len(latencies) / wall,
+        "p50_s": statistics.median(latencies),
+        "p95_s": percentile(latencies, 95),
+        "wall_s": wall
+    }
+
+
+def direct_call(figure, question):
+    with backend.model_manager.acquire() as bundle:
+        return bundle.generator(
+            backend.build_prompt(figure, question),
+            max_length=backend.MODEL_CONFIG['max_length'],
+            temperature=backend.MODEL_CONFIG['temperature'],
+            do_sample=backend.MODEL_CONFIG['do_sample'],
+            pad_token_id=bundle.tokenizer.pad_token_id,
+            num_return_sequences=1
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', default=backend.MODEL_CONFIG['model_name'])
+    parser.add_argument('--users', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--requests-per-user', type=int, default=2)
+    parser.add_argument('--max-length', type=int, default=128)
+    parser.add_argument('--max-batch-size', type=int, default=8)
+    parser.add_argument('--max-wait-ms', type=int, default=20)
+    args = parser.parse_args()
+
+    backend.MODEL_CONFIG['max_length'] = args.max_length
+    backend.model_manager.start_loading(args.model)
+    backend.model_manager.wait_ready()
+
+    scheduler = BatchScheduler(
+        backend.generate_batch,
+        max_batch_size=args.max_batch_size,
+        max_wait=args.max_wait_ms / 1000
+    )
+
+    def batched_call(figure, question):
+        return scheduler.run(
+            (figure['system_prompt'], backend.suffix_text(figure, question)),
+            group=figure['system_prompt']
+        )
+
+    results = []
+    for users in args.users:
+        for mode, call in (('direct', direct_call), ('batched', batched_call)):
+            print(f"⏱️ {mode}: {users} eş zamanlı kullanıcı", file=sys.stderr)
+            result = run_load(call, users, args.requests_per_user)
+            results.append(dict(result, mode=mode, users=users))
+
+    print(json.dumps({
+        "model": args.model,
+        "max_length": args.max_length,
+        "max_batch_size": args.max_batch_size,
+        "max_wait_ms": args.max_wait_ms,
+        "scheduler": scheduler.stats(),
+        "results": results
+    }, indent=2, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""CPU performans profilinin etkisini /api/models/available modellerinde ölçer
+
+Kullanım (backend klasöründen):
+    python benchmarks/bench_cpu_profile.py
+    python benchmarks/bench_cpu_profile.py --models gpt2 microsoft/DialoGPT-small
+
+Her (model, profil) çifti ayrı bir süreçte ölçülür; böylece tepe bellek
+(peak RSS) ve thread ayarları birbirini etkilemez. Yükleme süresi, saniyedeki
+token sayısı ve peak RSS JSON olarak yazdırılır.
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROMPT_QUESTION = "İstanbul'u nasıl fethettin?"
+
+
+def measure(model_name, profile, new_tokens, repeats):
+    """Tek bir (model, profil) çiftini bu süreçte ölç"""
+    os.environ['CPU_PROFILE'] = 'True' if profile else 'False'
+    os.environ.setdefault('WARMUP_ENABLED', 'false')
+    sys.path.insert(0, BACKEND_DIR)
+
+    import torch
+    import app_huggingface_transformers as backend
+
+    started = time.perf_counter()
+    bundle = backend.load_model(model_name, cpu_profile=profile)
+    load_seconds = time.perf_counter() - started
+
+    figure = backend.HISTORICAL_FIGURES['fatih_sultan_mehmet']
+    generated = 0
+    elapsed = 0.0
+    for _ in range(repeats):
+        inputs = backend.generation_inputs(bundle, figure['system_prompt'], [backend.suffix_text(figure, PROMPT_QUESTION)])
+        started = time.perf_counter()
+        with torch.inference_mode():
+            outputs = bundle.model.generate(
+                **inputs,
+                max_new_tokens=new_tokens,
+                min_new_tokens=new_tokens,
+                do_sample=False,
+                pad_token_id=bundle.tokenizer.pad_token_id
+            )
+        elapsed += time.perf_counter() - started
+        generated += outputs.shape[1] - inputs['input_ids'].shape[1]
+
+    return {
+        "model": model_name,
+        "cpu_profile": profile,
+        "load_seconds": load_seconds,
+        "tokens_per_second": generated / elapsed if elapsed else None,
+        # Linux'ta ru_maxrss KB cinsindendir
+        "peak_rss_bytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+        "threads": torch.get_num_threads()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--models', nargs='+')
+    parser.add_argument('--new-tokens', type=int, default=64)
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--single', help=argparse.SUPPRESS)
+    parser.add_argument('--profile', choices=['on', 'off'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        print(json.dumps(measure(args.single, args.profile == 'on', args.new_tokens, args.repeats)))
+        return
+
+    models = args.models
+    if not models:
+        sys.path.insert(0, BACKEND_DIR)
+        from app_huggingface_transformers import AVAILABLE_MODELS
+        models = AVAILABLE_MODELS
+
+    results = []
+    for model_name in models:
+        for profile in ('off', 'on'):
+            print(f"⏱️ {model_name} (CPU profili: {profile})", file=sys.stderr)
+            completed = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--single', model_name, '--profile', profile,
+                 '--new-tokens', str(args.new_tokens), '--repeats', str(args.repeats)],
+                capture_output=True, text=True, cwd=BACKEND_DIR
+            )
+            if completed.returncode != 0:
+                results.append({"model": model_name, "cpu_profile": profile == 'on',
+                                "error": completed.stderr.strip().splitlines()[-1:]})
+                continue
+            results.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+
+    print(json.dumps({"new_tokens": args.new_tokens, "repeats": args.repeats, "results": results},
+                     indent=2, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
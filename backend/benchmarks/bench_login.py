@@ -0,0 +1,98 @@
+"""Ders zili senaryosu: aynı anda giriş yapan öğrencilerin parola doğrulama gecikmesi
+
+Kullanım (backend klasöründen):
+    python benchmarks/bench_login.py --users 300 --methods pbkdf2:sha256:600000 pbkdf2:sha256:100000 scrypt:32768:8:1
+
+Her özet yöntemi için users kadar eş zamanlı giriş denemesi PasswordHasher
+havuzu (AUTH_HASH_WORKERS işçi) üzerinden doğrulanır; istek/sn ve
+p50/p95/p99 gecikme JSON olarak yazdırılır. Tüm HTTP yolunu (JSON, JWT,
+socket) ölçmek için:
+    python loadtest/run.py --app openai --scenarios login --concurrency 300 --requests 1
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from werkzeug.security import generate_password_hash  # noqa: E402
+
+from admission import GenerationPool  # noqa: E402
+from auth import PasswordHasher  # noqa: E402
+from resilience import percentile  # noqa: E402
+
+PASSWORD = "ogrenci-parolasi-123"
+
+
+def burst(hasher, password_hash, users):
+    """users thread'i aynı anda bırakıp her birinin doğrulama süresini ölç"""
+    latencies = []
+    failures = []
+    lock = threading.Lock()
+    barrier = threading.Barrier(users)
+
+    def worker():
+        barrier.wait()
+        started = time.perf_counter()
+        try:
+            ok = hasher.verify(password_hash, PASSWORD)
+        except Exception as e:
+            ok = False
+            with lock:
+                failures.append(type(e).__name__)
+        elapsed = time.perf_counter() - started
+        with lock:
+            if ok:
+                latencies.append(elapsed)
+
+    threads = [threading.Thread(target=worker) for _ in range(users)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    return {
+        "requests": users,
+        "errors": users - len(latencies),
+        "error_types": sorted(set(failures)),
+        "throughput_rps": len(latencies) / wall,
+        "p50_s": percentile(latencies, 50),
+        "p95_s": percentile(latencies, 95),
+        "p99_s": percentile(latencies, 99),
+        "wall_s": wall
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=300)
+    parser.add_argument('--methods', nargs='+', default=['pbkdf2:sha256:600000', 'pbkdf2:sha256:100000'])
+    parser.add_argument('--workers', type=int, default=int(os.getenv('AUTH_HASH_WORKERS', os.cpu_count() or 2)))
+    parser.add_argument('--queue', type=int, default=int(os.getenv('AUTH_HASH_QUEUE', 512)))
+    args = parser.parse_args()
+
+    results = []
+    for method in args.methods:
+        print(f"⏱️ {method}: {args.users} eş zamanlı giriş", file=sys.stderr)
+        single = time.perf_counter()
+        password_hash = generate_password_hash(PASSWORD, method=method)
+        single = time.perf_counter() - single
+
+        hasher = PasswordHasher(GenerationPool(args.workers, args.queue, name='auth'), method)
+        results.append(dict(burst(hasher, password_hash, args.users), method=method, single_hash_s=single))
+
+    print(json.dumps({
+        "users": args.users,
+        "workers": args.workers,
+        "queue": args.queue,
+        "results": results
+    }, indent=2, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
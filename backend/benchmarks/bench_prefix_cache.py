@@ -0,0 +1,79 @@
+"""Sistem prompt'u prefix KV önbelleğinin prefill süresine etkisini ölçer
+
+Kullanım (backend klasöründen):
+    python benchmarks/bench_prefix_cache.py --model gpt2 --repeats 10
+
+Her figür için tek token üretme süresi (yaklaşık prefill süresi) önbellekli
+ve önbelleksiz ölçülür, sonuçlar JSON olarak yazdırılır.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Warm-up thread'i ölçümlerle yarışmasın ve karşılaştırılan önbellekleri doldurmasın
+os.environ.setdefault('WARMUP_ENABLED', 'false')
+
+import torch  # noqa: E402
+
+import app_huggingface_transformers as backend  # noqa: E402
+
+
+def fresh_inputs(inputs):
+    """Önbellekteki key/value tensörlerinin kopyası; bir ölçüm diğerinin önbelleğini değiştiremez"""
+    if 'past_key_values' in inputs:
+        inputs = dict(inputs, past_key_values=tuple(
+            tuple(tensor.clone() for tensor in layer) for layer in inputs['past_key_values']
+        ))
+    return inputs
+
+
+def time_prefill(bundle, figure, repeats, use_cache=True):
+    """use_cache=False iken prefix önbelleği kapatılır ve tam prompt encode edilir"""
+    suffix = backend.suffix_text(figure, "İstanbul'u nasıl fethettin?")
+    supported = bundle.prefix_supported
+    bundle.prefix_supported = supported and use_cache
+    timings = []
+    try:
+        for _ in range(repeats):
+            inputs = fresh_inputs(backend.generation_inputs(bundle, figure['system_prompt'], [suffix]))
+            started = time.perf_counter()
+            with torch.no_grad():
+                bundle.model.generate(**inputs, max_new_tokens=1, pad_token_id=bundle.tokenizer.pad_token_id)
+            timings.append(time.perf_counter() - started)
+    finally:
+        bundle.prefix_supported = supported
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', default=backend.MODEL_CONFIG['model_name'])
+    parser.add_argument('--repeats', type=int, default=10)
+    args = parser.parse_args()
+
+    bundle = backend.load_model(args.model)
+
+    results = []
+    for figure_id, figure in backend.HISTORICAL_FIGURES.items():
+        prefix_tokens = len(bundle.tokenizer(backend.prefix_text(figure['system_prompt'])).input_ids)
+
+        with_cache = time_prefill(bundle, figure, args.repeats)
+        without_cache = time_prefill(bundle, figure, args.repeats, use_cache=False)
+
+        results.append({
+            "figure_id": figure_id,
+            "prefix_tokens": prefix_tokens,
+            "prefill_cached_s": with_cache,
+            "prefill_uncached_s": without_cache,
+            "speedup": without_cache / with_cache if with_cache else None
+        })
+
+    print(json.dumps({"model": args.model, "results": results}, indent=2, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
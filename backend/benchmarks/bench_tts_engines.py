@@ -0,0 +1,105 @@
+"""TTS motorlarının verimini karşılaştırır (önbellek devre dışı)
+
+Kullanım (backend klasöründen):
+    python benchmarks/bench_tts_engines.py --engines gtts espeak --concurrency 1 4 16 --sentences 48
+
+Her motor ve eş zamanlılık için aynı cümle listesi motorun synthesize()
+yöntemiyle doğrudan seslendirilir; cümle/sn, karakter/sn, p50/p95 gecikme ve
+ortalama MP3 boyutu JSON olarak yazdırılır. Kurulu olmayan motorlar
+atlanır.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tts  # noqa: E402
+from resilience import percentile  # noqa: E402
+
+SENTENCES = [
+    "İstanbul 1453 yılında fethedildi.",
+    "Cumhuriyet 29 Ekim 1923'te ilan edildi.",
+    "Bilim ve sanat bir milletin en büyük gücüdür.",
+    "Strateji, sabır ve cesaret ister.",
+    "Tarih, geçmişten ders almamızı sağlar.",
+    "Eğitim, geleceği kuran en önemli yatırımdır."
+]
+
+
+def bench(engine, concurrency, sentences, lang, slow):
+    """sentences listesini concurrency işçiyle seslendir"""
+    latencies = []
+    sizes = []
+    errors = []
+    lock = threading.Lock()
+
+    def synthesize(text):
+        started = time.perf_counter()
+        try:
+            audio = engine.synthesize(text, lang, slow)
+        except Exception as e:
+            with lock:
+                errors.append(type(e).__name__)
+            return
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+            sizes.append(len(audio))
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(synthesize, sentences))
+    wall = time.perf_counter() - started
+
+    chars = sum(len(text) for text in sentences)
+    return {
+        "engine": engine.name,
+        "concurrency": concurrency,
+        "sentences": len(sentences),
+        "errors": len(errors),
+        "error_types": sorted(set(errors)),
+        "sentences_per_s": len(latencies) / wall,
+        "chars_per_s": chars / wall if latencies else 0.0,
+        "p50_s": percentile(latencies, 50),
+        "p95_s": percentile(latencies, 95),
+        "mean_bytes": sum(sizes) / len(sizes) if sizes else 0,
+        "wall_s": wall
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--engines', nargs='+', default=list(tts.ENGINES))
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--sentences', type=int, default=48)
+    parser.add_argument('--lang', default=tts.default_lang())
+    parser.add_argument('--slow', action='store_true')
+    args = parser.parse_args()
+
+    # Her çağrı farklı metin olsun; motorun kendi önbelleği varsa ölçümü bozmasın
+    sentences = [f"{SENTENCES[i % len(SENTENCES)]} ({i + 1})" for i in range(args.sentences)]
+
+    results = []
+    for name in args.engines:
+        engine = tts.ENGINES[name]
+        if not engine.available():
+            print(f"⏭️ {name} kurulu değil, atlandı", file=sys.stderr)
+            continue
+        for concurrency in args.concurrency:
+            print(f"⏱️ {name}: {concurrency} eş zamanlı seslendirme", file=sys.stderr)
+            results.append(bench(engine, concurrency, sentences, args.lang, args.slow))
+
+    print(json.dumps({
+        "cpu_count": os.cpu_count(),
+        "lang": args.lang,
+        "results": results
+    }, indent=2, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,227 @@
+"""Kullanıcı ve figür başına sunucu tarafı sohbet hafızası
+
+Her oturum son turları (kullanıcı sorusu + figür yanıtı) tutan küçük bir
+halka tampondur. Turların toplam token sayısı bütçeyi veya tur sınırını
+aşınca en eski turlar kısa bir özete katlanır; böylece prompt'a giden
+geçmiş hem sınırlı kalır hem de eski konuşma tamamen unutulmaz. Uzun süre
+kullanılmayan oturumlar silinir, toplam oturum sayısı da sınırlıdır.
+"""
+import os
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+
+from turkish_text import SentenceSplitter
+
+TOKEN_RE = re.compile(r'\w+|[^\w\s]')
+
+
+def approximate_tokens(text):
+    """Tokenizer yokken kaba token sayısı (kelime ve noktalama başına ~1.3 token)"""
+    return int(len(TOKEN_RE.findall(text)) * 1.3) + 1
+
+
+def token_counter():
+    """tiktoken kuruluysa onunla, değilse yaklaşık token sayan fonksiyon"""
+    try:
+        import tiktoken
+    except ImportError:
+        return approximate_tokens
+    encoding = tiktoken.get_encoding('cl100k_base')
+    return lambda text: len(encoding.encode(text))
+
+
+def first_sentence(text, max_chars=160):
+    """Metnin ilk cümlesi, gerekirse kısaltılmış"""
+    splitter = SentenceSplitter(min_chars=0)
+    sentences = splitter.feed(text) + splitter.flush()
+    sentence = sentences[0].strip() if sentences else ''
+    if len(sentence) > max_chars:
+        sentence = sentence[:max_chars].rsplit(' ', 1)[0] + '…'
+    return sentence
+
+
+def extractive_summary(summary, turns, figure_name):
+    """Pencereden düşen turları önceki özete ekle (LLM çağrısı gerektirmez)"""
+    lines = [summary] if summary else []
+    for turn in turns:
+        lines.append(
+            f"Kullanıcı \"{first_sentence(turn.user)}\" diye sordu; "
+            f"{figure_name} \"{first_sentence(turn.assistant)}\" diye yanıtladı."
+        )
+    return '\n'.join(lines)
+
+
+class Turn:
+    __slots__ = ('user', 'assistant', 'tokens')
+
+    def __init__(self, user, assistant, tokens):
+        self.user = user
+        self.assistant = assistant
+        self.tokens = tokens
+
+
+class Session:
+    __slots__ = ('turns', 'summary', 'summary_tokens', 'last_used')
+
+    def __init__(self, max_turns):
+        self.turns = deque(maxlen=max_turns)
+        self.summary = ''
+        self.summary_tokens = 0
+        self.last_used = time.monotonic()
+
+
+class ConversationStore:
+    """(kullanıcı, figür) başına oturum deposu
+
+    - max_turns: oturumda tutulan en fazla tur
+    - token_budget: prompt'a giden geçmişin (özet dahil) token bütçesi
+    - summary_budget: özetin en fazla token sayısı; aşılırsa en eski
+      satırlar atılır
+    - idle_ttl: bu kadar saniye kullanılmayan oturum silinir
+    - max_sessions: en fazla oturum; aşılırsa en uzun süredir
+      kullanılmayan silinir
+    - summarize(summary, turns, figure_name): düşen turları özete katlayan
+      fonksiyon (varsayılan: LLM'siz, cümle seçen özet)
+    """
+
+    def __init__(self, max_turns=10, token_budget=1200, summary_budget=200, idle_ttl=1800,
+                 max_sessions=10000, count_tokens=None, summarize=None):
+        self.max_turns = max_turns
+        self.token_budget = token_budget
+        self.summary_budget = summary_budget
+        self.idle_ttl = idle_ttl
+        self.max_sessions = max_sessions
+        self.count_tokens = count_tokens or token_counter()
+        self.summarize = summarize or extractive_summary
+
+        self._lock = threading.Lock()
+        self._sessions = OrderedDict()
+
+        self.summarized_turns = 0
+        self.evicted_idle = 0
+        self.evicted_capacity = 0
+
+    @classmethod
+    def from_env(cls, count_tokens=None):
+        """Ayarları ortam değişkenlerinden oku"""
+        return cls(
+            max_turns=int(os.getenv('CONVERSATION_MAX_TURNS', 10)),
+            token_budget=int(os.getenv('CONVERSATION_TOKEN_BUDGET', 1200)),
+            summary_budget=int(os.getenv('CONVERSATION_SUMMARY_TOKENS', 200)),
+            idle_ttl=int(os.getenv('CONVERSATION_IDLE_TTL', 1800)),
+            max_sessions=int(os.getenv('CONVERSATION_MAX_SESSIONS', 10000)),
+            count_tokens=count_tokens
+        )
+
+    def history(self, owner, figure_id):
+        """Prompt'a eklenecek geçmiş mesajları (özet + son turlar)"""
+        if owner is None:
+            return []
+        with self._lock:
+            self._evict_idle(time.monotonic())
+            session = self._sessions.get((owner, figure_id))
+            if session is None:
+                return []
+            session.last_used = time.monotonic()
+            self._sessions.move_to_end((owner, figure_id))
+
+            messages = []
+            if session.summary:
+                messages.append({"role": "system", "content": f"Önceki konuşmanın özeti: {session.summary}"})
+            for turn in session.turns:
+                messages.append({"role": "user", "content": turn.user})
+                messages.append({"role": "assistant", "content": turn.assistant})
+            return messages
+
+    def record(self, owner, figure_id, figure_name, user_message, response):
+        """Tamamlanan turu oturuma ekle; bütçeyi aşan eski turları özete katla"""
+        if owner is None or not response:
+            return
+        tokens = self.count_tokens(user_message) + self.count_tokens(response)
+        turn = Turn(user_message, response, tokens)
+
+        with self._lock:
+            now = time.monotonic()
+            key = (owner, figure_id)
+            session = self._sessions.get(key)
+            if session is None:
+                session = self._sessions[key] = Session(self.max_turns)
+            self._sessions.move_to_end(key)
+            session.last_used = now
+
+            dropped = []
+            if len(session.turns) == session.turns.maxlen:
+                dropped.append(session.turns[0])
+            session.turns.append(turn)
+            dropped += self._fit_budget(session)
+            base = session.summary
+
+            self._evict_capacity()
+
+        while dropped:
+            # Özetleme kilit dışında yapılır; summarize yavaş olabilir
+            summary = self._trim_summary(self.summarize(base, dropped, figure_name))
+            with self._lock:
+                if session.summary != base:
+                    # Bu arada başka bir kayıt özeti değiştirdi: düşen turları
+                    # güncel özete yeniden katla, onunkini ezme
+                    base = session.summary
+                    continue
+                session.summary = summary
+                session.summary_tokens = self.count_tokens(summary) if summary else 0
+                self.summarized_turns += len(dropped)
+                # Yeni özet bütçeye dahildir; aşılırsa turlar tekrar düşer
+                dropped = self._fit_budget(session)
+                base = session.summary
+
+    def clear(self, owner, figure_id):
+        """Oturumu sil (yeni sohbet)"""
+        with self._lock:
+            self._sessions.pop((owner, figure_id), None)
+
+    def stats(self):
+        """Oturum sayısı ve tahliye sayaçları"""
+        with self._lock:
+            self._evict_idle(time.monotonic())
+            return {
+                "sessions": len(self._sessions),
+                "max_sessions": self.max_sessions,
+                "turns": sum(len(session.turns) for session in self._sessions.values()),
+                "summarized_turns": self.summarized_turns,
+                "evicted_idle": self.evicted_idle,
+                "evicted_capacity": self.evicted_capacity,
+                "token_budget": self.token_budget
+            }
+
+    def _fit_budget(self, session):
+        # En yeni tur her zaman kalır, eskiler bütçeye sığana kadar düşer
+        dropped = []
+        while len(session.turns) > 1 and self._session_tokens(session) > self.token_budget:
+            dropped.append(session.turns.popleft())
+        return dropped
+
+    def _session_tokens(self, session):
+        return session.summary_tokens + sum(turn.tokens for turn in session.turns)
+
+    def _trim_summary(self, summary):
+        # Özet bütçeyi aşarsa en eski satırları at
+        lines = summary.split('\n')
+        while len(lines) > 1 and self.count_tokens('\n'.join(lines)) > self.summary_budget:
+            lines.pop(0)
+        return '\n'.join(lines)
+
+    def _evict_idle(self, now):
+        # OrderedDict son kullanım sırasında tutulduğu için baştan bakmak yeterli
+        while self._sessions:
+            key, session = next(iter(self._sessions.items()))
+            if now - session.last_used < self.idle_ttl:
+                break
+            del self._sessions[key]
+            self.evicted_idle += 1
+
+    def _evict_capacity(self):
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+            self.evicted_capacity += 1
@@ -0,0 +1,59 @@
+"""Yalnızca CPU olan sunucular için isteğe bağlı çıkarım performans profili"""
+import os
+
+import torch
+
+
+def profile_from_env():
+    """CPU_PROFILE ve ilgili ortam değişkenlerinden profil ayarlarını oku
+
+    Thread sayısı verilmezse çekirdekler aynı makinedeki işçi süreçleri
+    (WEB_CONCURRENCY) arasında paylaştırılır.
+    """
+    workers = max(1, int(os.getenv('WEB_CONCURRENCY', 1)))
+    return {
+        "enabled": os.getenv('CPU_PROFILE', 'False').lower() == 'true',
+        "quantize": os.getenv('CPU_QUANTIZE', 'True').lower() == 'true',
+        "intra_op_threads": int(os.getenv('TORCH_INTRA_OP_THREADS') or 0) or max(1, (os.cpu_count() or 1) // workers),
+        "inter_op_threads": int(os.getenv('TORCH_INTER_OP_THREADS') or 1)
+    }
+
+
+def apply_thread_settings(profile):
+    """torch intra-op/inter-op thread sayılarını ayarla
+
+    inter-op ayarı yalnızca ilk paralel işten önce yapılabildiği için süreç
+    başlarken bir kez çağrılmalıdır.
+    """
+    torch.set_num_threads(profile["intra_op_threads"])
+    try:
+        torch.set_num_interop_threads(profile["inter_op_threads"])
+    except RuntimeError as e:
+        print(f"⚠️ inter-op thread sayısı ayarlanamadı: {e}")
+
+
+def conv1d_to_linear(model):
+    """GPT-2 ailesinin Conv1D katmanlarını eşdeğer nn.Linear katmanlarına çevir
+
+    Dinamik quantization yalnızca nn.Linear katmanlarını tanır; GPT-2 ve
+    DialoGPT ise projeksiyonlarda transformers'ın Conv1D sınıfını kullanır
+    (ağırlık matrisi devrik tutulur).
+    """
+    for parent in list(model.modules()):
+        for name, child in list(parent.named_children()):
+            if type(child).__name__ != 'Conv1D':
+                continue
+            in_features, out_features = child.weight.shape
+            linear = torch.nn.Linear(in_features, out_features, bias=child.bias is not None)
+            with torch.no_grad():
+                linear.weight.copy_(child.weight.t())
+                if child.bias is not None:
+                    linear.bias.copy_(child.bias)
+            setattr(parent, name, linear)
+    return model
+
+
+def quantize_model(model):
+    """Linear katmanlarını int8 dinamik quantization ile küçült"""
+    model = conv1d_to_linear(model)
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
@@ -0,0 +1,84 @@
+"""Veritabanı bağlantısı: SQLAlchemy nesnesi, bağlantı havuzu ve migration
+
+DATABASE_URL'e göre motor ayarlanır:
+- MSSQL (mssql+pyodbc): sabit boyutlu bağlantı havuzu; pre-ping ile
+  kopmuş bağlantılar kullanılmadan önce yenilenir, pool_recycle ile sunucu
+  veya ağ cihazı boşta bağlantıyı kesmeden önce bağlantı değiştirilir.
+- SQLite (geliştirme): WAL kipi; okuyucular yazarı beklemez, kilitli
+  veritabanında hemen hata yerine busy_timeout kadar beklenir.
+"""
+import os
+import sqlite3
+
+from flask_migrate import Migrate
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+DEFAULT_DATABASE_URL = 'sqlite:///pupilica.db'
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+
+db = SQLAlchemy()
+migrate = Migrate()
+
+
+def database_url():
+    return os.getenv('DATABASE_URL') or DEFAULT_DATABASE_URL
+
+
+def engine_options(url):
+    """DATABASE_URL'e uygun create_engine ayarları"""
+    if url.startswith('sqlite'):
+        # Thread'ler arası bağlantı paylaşımı (eventlet + işçi havuzları) ve kilit bekleme
+        return {
+            'connect_args': {
+                'check_same_thread': False,
+                'timeout': float(os.getenv('SQLITE_BUSY_TIMEOUT', 30))
+            }
+        }
+
+    options = {
+        'pool_size': int(os.getenv('DB_POOL_SIZE', 10)),
+        'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', 20)),
+        'pool_timeout': float(os.getenv('DB_POOL_TIMEOUT', 30)),
+        'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': os.getenv('DB_POOL_PRE_PING', 'true').lower() == 'true'
+    }
+    if url.startswith('mssql+pyodbc'):
+        # Toplu INSERT/UPDATE'leri tek çağrıda gönder
+        options['fast_executemany'] = True
+    return options
+
+
+@event.listens_for(Engine, 'connect')
+def configure_sqlite(dbapi_connection, connection_record):
+    """Yeni SQLite bağlantılarında WAL kipini aç"""
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    busy_timeout_ms = int(float(os.getenv('SQLITE_BUSY_TIMEOUT', 30)) * 1000)
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    # WAL ile NORMAL güvenli ve her commit'te fsync yapmaz
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.execute(f'PRAGMA busy_timeout={busy_timeout_ms}')
+    cursor.execute('PRAGMA foreign_keys=ON')
+    cursor.close()
+
+
+def init_db(app):
+    """Uygulamayı veritabanına bağla; döndürülen URL /'de raporlanır"""
+    url = database_url()
+    app.config['SQLALCHEMY_DATABASE_URI'] = url
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(url)
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    migrate.init_app(app, db, directory=MIGRATIONS_DIR)
+    return url
+
+
+def upgrade_schema(app):
+    """Bekleyen migration'ları uygula (geliştirme sunucusu açılışında)"""
+    from flask_migrate import upgrade
+
+    with app.app_context():
+        upgrade(directory=MIGRATIONS_DIR)
@@ -0,0 +1,214 @@
+"""Tarihi figür kataloğu: veri dosyasından yüklenen, değişmez ve önceden hazırlanmış
+
+Figürler data/figures.json'dan (FIGURES_FILE) okunur. Her yüklemede
+değişmez bir FigureCatalog kurulur: /api/figures'ın JSON gövdesi, gzip ve
+(brotli kuruluysa) br sıkıştırılmış halleri ve güçlü ETag'ler bir kez
+hazırlanır; istek yalnızca hazır baytları döndürür ya da 304 yanıtlar.
+
+Dosya değiştiğinde FigureRegistry yeni kataloğu kurup tek atamayla
+değiştirir; istekler ya eski ya yeni kataloğu bütün olarak görür. Hatalı
+dosyada eski katalog kullanılmaya devam eder.
+"""
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from collections.abc import Mapping
+from types import MappingProxyType
+
+from flask import Response
+
+import metrics
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+FIGURE_RELOADS = metrics.counter('figures_reloads_total', 'Figür kataloğu yeniden yüklemeleri', ['result'])
+
+DEFAULT_FIGURES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'figures.json')
+REQUIRED_FIELDS = ('name', 'personality', 'system_prompt')
+
+
+def validate_figures(data):
+    """Dosya içeriğini doğrula; hatalıysa ValueError"""
+    if not isinstance(data, dict) or not data:
+        raise ValueError("Figür dosyası boş olmayan bir nesne olmalı")
+    for figure_id, figure in data.items():
+        if not isinstance(figure, dict):
+            raise ValueError(f"{figure_id}: figür bir nesne olmalı")
+        for field in REQUIRED_FIELDS:
+            if not isinstance(figure.get(field), str) or not figure[field].strip():
+                raise ValueError(f"{figure_id}: '{field}' alanı gerekli")
+
+
+class FigureCatalog(Mapping):
+    """Bir yüklemenin değişmez görüntüsü: figür kimliği -> salt okunur figür"""
+
+    def __init__(self, data, version=0):
+        self._figures = MappingProxyType({
+            figure_id: MappingProxyType(dict(figure)) for figure_id, figure in data.items()
+        })
+        self.version = version
+        self.loaded_at = time.time()
+
+        self.body = json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        digest = hashlib.sha256(self.body).hexdigest()[:32]
+        self.etag = digest
+        # Farklı kodlamalar farklı temsillerdir; her birinin kendi güçlü ETag'i olur
+        self.variants = {None: (self.body, digest)}
+        self.variants['gzip'] = (gzip.compress(self.body, compresslevel=9, mtime=0), f"{digest}-gz")
+        if brotli is not None:
+            self.variants['br'] = (brotli.compress(self.body, quality=11), f"{digest}-br")
+
+    def __getitem__(self, figure_id):
+        return self._figures[figure_id]
+
+    def __iter__(self):
+        return iter(self._figures)
+
+    def __len__(self):
+        return len(self._figures)
+
+    def variant(self, accept_encodings):
+        """İstemcinin kabul ettiği en küçük gövde: (kodlama, gövde, etag)"""
+        best = None
+        for encoding, (body, etag) in self.variants.items():
+            if encoding is not None and not accept_encodings[encoding]:
+                continue
+            if best is None or len(body) < len(best[1]):
+                best = (encoding, body, etag)
+        return best
+
+    def etags(self):
+        return [etag for _, etag in self.variants.values()]
+
+
+class FigureRegistry(Mapping):
+    """Güncel FigureCatalog'a yönlendiren, dosya değişince kendini yenileyen kayıt
+
+    Mapping arayüzü güncel kataloğa yönlendirir; bir istek boyunca tutarlı
+    görüntü gerekiyorsa catalog bir kez okunup kullanılmalıdır.
+    """
+
+    def __init__(self, path=DEFAULT_FIGURES_FILE, check_interval=2.0):
+        self.path = path
+        self.check_interval = check_interval
+
+        self._lock = threading.Lock()
+        self._stat = None
+        self._thread = None
+
+        self.reloads = 0
+        self.errors = 0
+        self.last_error = None
+
+        self.catalog = None
+        self.reload()
+        if self.catalog is None:
+            raise ValueError(f"Figür kataloğu yüklenemedi: {self.last_error}")
+
+    @classmethod
+    def from_env(cls):
+        """Ayarları ortam değişkenlerinden oku"""
+        return cls(
+            path=os.getenv('FIGURES_FILE') or DEFAULT_FIGURES_FILE,
+            check_interval=float(os.getenv('FIGURES_RELOAD_SECONDS', 2))
+        )
+
+    def __getitem__(self, figure_id):
+        return self.catalog[figure_id]
+
+    def __iter__(self):
+        return iter(self.catalog)
+
+    def __len__(self):
+        return len(self.catalog)
+
+    def _file_stat(self):
+        stat = os.stat(self.path)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def reload(self):
+        """Dosyayı oku ve içerik değiştiyse kataloğu değiştir; değişti mi?"""
+        with self._lock:
+            try:
+                self._stat = self._file_stat()
+                with open(self.path, encoding='utf-8') as f:
+                    data = json.load(f)
+                validate_figures(data)
+            except (OSError, ValueError) as e:
+                self.errors += 1
+                self.last_error = str(e)
+                FIGURE_RELOADS.inc(result='error')
+                print(f"❌ Figür kataloğu yüklenemedi ({self.path}): {e}")
+                return False
+
+            current = self.catalog
+            catalog = FigureCatalog(data, version=current.version + 1 if current else 1)
+            if current is not None and catalog.etag == current.etag:
+                FIGURE_RELOADS.inc(result='unchanged')
+                return False
+            self.catalog = catalog
+            self.reloads += 1
+            self.last_error = None
+            FIGURE_RELOADS.inc(result='reloaded')
+            if current is not None:
+                print(f"🔄 Figür kataloğu yenilendi: {len(catalog)} figür (sürüm {catalog.version})")
+            return True
+
+    def check(self):
+        """Dosyanın değiştirilme zamanı veya boyutu değiştiyse yeniden yükle"""
+        try:
+            stat = self._file_stat()
+        except OSError:
+            return False
+        if stat == self._stat:
+            return False
+        return self.reload()
+
+    def start(self):
+        """Dosyayı check_interval saniyede bir kontrol eden thread'i başlat"""
+        if self._thread is None and self.check_interval > 0:
+            self._thread = threading.Thread(target=self._run, name='figure-reloader', daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        while True:
+            time.sleep(self.check_interval)
+            self.check()
+
+    def stats(self):
+        catalog = self.catalog
+        return {
+            "path": self.path,
+            "figures": len(catalog),
+            "version": catalog.version,
+            "etag": catalog.etag,
+            "loaded_at": catalog.loaded_at,
+            "bytes": {encoding or 'identity': len(body) for encoding, (body, _) in catalog.variants.items()},
+            "reloads": self.reloads,
+            "errors": self.errors,
+            "last_error": self.last_error
+        }
+
+
+def catalog_response(registry, request):
+    """/api/figures: hazır gövdeyi döndür, istemcideki sürüm güncelse 304"""
+    catalog = registry.catalog
+    encoding, body, etag = catalog.variant(request.accept_encodings)
+    headers = {
+        'ETag': f'"{etag}"',
+        'Vary': 'Accept-Encoding',
+        # Her kullanımda doğrula; değişmediyse 304 ile gövde gönderilmez
+        'Cache-Control': 'no-cache'
+    }
+    if any(request.if_none_match.contains_weak(tag) for tag in catalog.etags()):
+        return Response(status=304, headers=headers)
+    if encoding is not None:
+        headers['Content-Encoding'] = encoding
+    return Response(body, mimetype='application/json', headers=headers)
@@ -0,0 +1,374 @@
+"""Sıralama tabloları: artımlı güncellenen, indekslenebilir skip list
+
+Her sayfa görüntülemede tüm kullanıcıları ORDER BY ile sıralamak yerine
+sıralama bellekte tutulur. IndexableSkipList her bağlantının kaç eleman
+atladığını (genişlik) saklar; ekleme, silme, "sıram kaç?" ve "k'ıncı eleman"
+O(log n), ilk k eleman O(log n + k) sürer.
+
+Tablolar: genel (global), sınıf (class:<kod>) ve figür (figure:<id>).
+Genel ve sınıf tabloları kullanıcının deneyim puanına, figür tabloları o
+figürdeki ilerleme deneyimine göre sıralanır. LeaderboardIndex periyodik
+olarak veritabanından yeniden kurulur (reconcile); kurulum sırasında gelen
+güncellemeler yeni tablolara yeniden uygulanır.
+"""
+import os
+import random
+import threading
+import time
+
+from sqlalchemy import select
+
+import metrics
+from database import db
+from models import Progress, User
+
+RECONCILE_SECONDS = metrics.histogram('leaderboard_reconcile_seconds', 'Sıralama tablolarının veritabanından yeniden kurulma süresi')
+RECONCILE_DRIFT = metrics.counter('leaderboard_reconcile_drift_total', 'Yeniden kurulumda puanı bellekteki değerden farklı çıkan üyeler')
+
+MAX_LEVEL = 16
+# Her seviyede bir üst seviyeye çıkma olasılığı; 1/4 bellek ve hız arasında iyi bir denge
+LEVEL_PROBABILITY = 0.25
+
+
+class _Tail:
+    """Her anahtardan büyük bitiş işaretçisi"""
+
+    def __lt__(self, other):
+        return False
+
+
+TAIL_KEY = _Tail()
+
+
+class _Node:
+    __slots__ = ('key', 'next', 'width')
+
+    def __init__(self, key, level):
+        self.key = key
+        self.next = [None] * level
+        self.width = [1] * level
+
+
+class IndexableSkipList:
+    """Sıralı, benzersiz anahtarlar; konuma göre erişim O(log n)"""
+
+    def __init__(self, seed=None):
+        self._random = random.Random(seed)
+        self._tail = _Node(TAIL_KEY, MAX_LEVEL)
+        self._head = _Node(None, MAX_LEVEL)
+        self._head.next = [self._tail] * MAX_LEVEL
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def _random_level(self):
+        level = 1
+        while level < MAX_LEVEL and self._random.random() < LEVEL_PROBABILITY:
+            level += 1
+        return level
+
+    def _path(self, key):
+        """Her seviyede key'den küçük son düğüm ve o düğümün konumu (baş = 0)"""
+        update = [None] * MAX_LEVEL
+        positions = [0] * MAX_LEVEL
+        node = self._head
+        position = 0
+        for level in reversed(range(MAX_LEVEL)):
+            while node.next[level].key < key:
+                position += node.width[level]
+                node = node.next[level]
+            update[level] = node
+            positions[level] = position
+        return update, positions, position
+
+    def insert(self, key):
+        update, positions, position = self._path(key)
+        node = _Node(key, self._random_level())
+        for level in range(len(node.next)):
+            previous = update[level]
+            node.next[level] = previous.next[level]
+            previous.next[level] = node
+            node.width[level] = positions[level] + previous.width[level] - position
+            previous.width[level] = position + 1 - positions[level]
+        for level in range(len(node.next), MAX_LEVEL):
+            update[level].width[level] += 1
+        self.size += 1
+
+    def remove(self, key):
+        """key'i sil; yoksa KeyError"""
+        update, _, _ = self._path(key)
+        node = update[0].next[0]
+        if node is self._tail or node.key != key:
+            raise KeyError(key)
+        for level in range(len(node.next)):
+            previous = update[level]
+            previous.width[level] += node.width[level] - 1
+            previous.next[level] = node.next[level]
+        for level in range(len(node.next), MAX_LEVEL):
+            update[level].width[level] -= 1
+        self.size -= 1
+
+    def rank(self, key):
+        """key'in 0 tabanlı sırası; yoksa None"""
+        update, _, position = self._path(key)
+        node = update[0].next[0]
+        if node is self._tail or node.key != key:
+            return None
+        return position
+
+    def slice(self, start, count):
+        """start'tan başlayarak en fazla count anahtar"""
+        if start >= self.size or count <= 0:
+            return []
+        node = self._head
+        remaining = start + 1
+        for level in reversed(range(MAX_LEVEL)):
+            while node.width[level] <= remaining:
+                remaining -= node.width[level]
+                node = node.next[level]
+        keys = []
+        while node is not self._tail and len(keys) < count:
+            keys.append(node.key)
+            node = node.next[0]
+        return keys
+
+
+class Leaderboard:
+    """Üye -> puan; yüksek puan önde, eşitlikte üye kimliğine göre"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._list = IndexableSkipList()
+        self._keys = {}
+
+    def __len__(self):
+        return len(self._keys)
+
+    @staticmethod
+    def _key(member, score):
+        # Kimlikler int (veritabanı) veya str (demo) olabilir; karşılaştırma str üzerinden
+        return (-score, str(member))
+
+    def update(self, member, score):
+        key = self._key(member, score)
+        with self._lock:
+            old = self._keys.get(member)
+            if old == key:
+                return
+            if old is not None:
+                self._list.remove(old)
+            self._list.insert(key)
+            self._keys[member] = key
+
+    def remove(self, member):
+        with self._lock:
+            old = self._keys.pop(member, None)
+            if old is not None:
+                self._list.remove(old)
+
+    def score(self, member):
+        key = self._keys.get(member)
+        return None if key is None else -key[0]
+
+    def rank(self, member):
+        """(1 tabanlı sıra, puan) veya üye yoksa None"""
+        with self._lock:
+            key = self._keys.get(member)
+            if key is None:
+                return None
+            return self._list.rank(key) + 1, -key[0]
+
+    def top(self, limit, offset=0):
+        """[(1 tabanlı sıra, üye anahtarı, puan)]"""
+        with self._lock:
+            keys = self._list.slice(offset, limit)
+        return [(offset + i + 1, key[1], -key[0]) for i, key in enumerate(keys)]
+
+
+class LeaderboardIndex:
+    """Genel, sınıf ve figür tabloları ile üyelerin görünen bilgileri"""
+
+    def __init__(self, reconcile_interval=300):
+        self.reconcile_interval = reconcile_interval
+
+        self._lock = threading.Lock()
+        self._boards = {'global': Leaderboard()}
+        self._members = {}
+        self._classes = {}
+        # Yeniden kurulum sürerken gelen güncellemeler (sonra yeni tablolara uygulanır)
+        self._journal = None
+        self._thread = None
+
+        self.reconciles = 0
+        self.last_reconcile = None
+        self.last_drift = 0
+
+    @classmethod
+    def from_env(cls):
+        """Ayarları ortam değişkenlerinden oku"""
+        return cls(reconcile_interval=int(os.getenv('LEADERBOARD_RECONCILE_SECONDS', 300)))
+
+    def update_user(self, user_id, experience, class_code=None, profile=None):
+        """Genel ve sınıf tablolarını güncelle; sınıf değiştiyse eskisinden çıkar"""
+        with self._lock:
+            if self._journal is not None:
+                self._journal.append(('update_user', (user_id, experience, class_code, profile)))
+            self._apply_user(self._boards, self._members, self._classes, user_id, experience, class_code, profile)
+
+    def update_figure(self, user_id, figure_id, experience):
+        """Kullanıcının figürdeki ilerleme puanını güncelle"""
+        with self._lock:
+            if self._journal is not None:
+                self._journal.append(('update_figure', (user_id, figure_id, experience)))
+            board = self._boards.get(f"figure:{figure_id}")
+            if board is None:
+                board = self._boards[f"figure:{figure_id}"] = Leaderboard()
+        board.update(str(user_id), experience)
+
+    @staticmethod
+    def _apply_user(boards, members, classes, user_id, experience, class_code, profile):
+        member = str(user_id)
+        if profile is not None:
+            members[member] = {"username": profile.get('username'), "fullName": profile.get('fullName')}
+        boards['global'].update(member, experience)
+        old_class = classes.get(member)
+        if old_class and old_class != class_code:
+            boards[f"class:{old_class}"].remove(member)
+        if class_code:
+            board = boards.get(f"class:{class_code}")
+            if board is None:
+                board = boards[f"class:{class_code}"] = Leaderboard()
+            board.update(member, experience)
+            classes[member] = class_code
+        else:
+            classes.pop(member, None)
+
+    def standings(self, scope, limit=50, offset=0, member=None):
+        """scope: 'global', 'class:<kod>' veya 'figure:<id>'"""
+        with self._lock:
+            board = self._boards.get(scope)
+            members = self._members
+        if board is None:
+            board = Leaderboard()
+
+        entries = []
+        for rank, key, score in board.top(limit, offset):
+            profile = members.get(key, {})
+            entries.append({
+                "rank": rank,
+                "userId": key,
+                "username": profile.get('username'),
+                "fullName": profile.get('fullName'),
+                "score": score
+            })
+
+        me = None
+        if member is not None:
+            found = board.rank(str(member))
+            if found is not None:
+                me = {"rank": found[0], "score": found[1]}
+        return {"scope": scope, "total": len(board), "entries": entries, "me": me}
+
+    def reconcile(self, load):
+        """load() -> (users, figures) ile tabloları sıfırdan kur ve değiştir
+
+        users: (user_id, experience, class_code, profile) satırları
+        figures: (user_id, figure_id, experience) satırları
+        """
+        started = time.perf_counter()
+        with self._lock:
+            self._journal = []
+            current = self._boards
+        try:
+            users, figures = load()
+            boards = {'global': Leaderboard()}
+            members = {}
+            classes = {}
+            for user_id, experience, class_code, profile in users:
+                self._apply_user(boards, members, classes, user_id, experience, class_code, profile)
+            for user_id, figure_id, experience in figures:
+                board = boards.get(f"figure:{figure_id}")
+                if board is None:
+                    board = boards[f"figure:{figure_id}"] = Leaderboard()
+                board.update(str(user_id), experience)
+        except Exception:
+            with self._lock:
+                self._journal = None
+            raise
+
+        # Bellekteki puanı veritabanından farklı olan üyeler (kaçırılmış güncellemeler)
+        drift = sum(
+            1 for member in members
+            if current['global'].score(member) != boards['global'].score(member)
+        )
+
+        with self._lock:
+            for name, args in self._journal:
+                if name == 'update_user':
+                    self._apply_user(boards, members, classes, *args)
+                else:
+                    user_id, figure_id, experience = args
+                    board = boards.get(f"figure:{figure_id}")
+                    if board is None:
+                        board = boards[f"figure:{figure_id}"] = Leaderboard()
+                    board.update(str(user_id), experience)
+            self._journal = None
+            self._boards = boards
+            self._members = members
+            self._classes = classes
+            self.reconciles += 1
+            self.last_reconcile = time.time()
+            self.last_drift = drift
+
+        RECONCILE_SECONDS.observe(time.perf_counter() - started)
+        RECONCILE_DRIFT.inc(drift)
+        return drift
+
+    def start(self, load):
+        """Açılışta ve reconcile_interval saniyede bir yeniden kur"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, args=(load,), name='leaderboard-reconcile', daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self, load):
+        while True:
+            delay = self.reconcile_interval
+            try:
+                drift = self.reconcile(load)
+                if drift:
+                    print(f"🏆 Sıralama tabloları yeniden kuruldu: {drift} üyenin puanı düzeltildi")
+            except Exception as e:
+                # Açılışta tablolar henüz oluşturulmamış olabilir; kısa süre sonra yeniden dene
+                print(f"❌ Sıralama tabloları kurulamadı: {e}")
+                delay = min(delay, 10)
+            time.sleep(delay)
+
+    def stats(self):
+        with self._lock:
+            boards = {name: len(board) for name, board in self._boards.items()}
+        return {
+            "boards": boards,
+            "reconciles": self.reconciles,
+            "last_reconcile": self.last_reconcile,
+            "last_drift": self.last_drift,
+            "reconcile_interval": self.reconcile_interval
+        }
+
+
+def load_standings():
+    """Veritabanındaki tüm puanlar (uygulama bağlamında çağrılmalı)"""
+    users = [
+        (user_id, experience or 0, class_code, {"username": username, "fullName": full_name})
+        for user_id, username, full_name, experience, class_code in db.session.execute(
+            select(User.id, User.username, User.full_name, User.experience, User.class_code)
+        )
+    ]
+    figures = [
+        (user_id, figure_id, experience or 0)
+        for user_id, figure_id, experience in db.session.execute(
+            select(Progress.user_id, Progress.figure_id, Progress.experience)
+        )
+    ]
+    return users, figures
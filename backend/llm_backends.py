@@ -0,0 +1,531 @@
+"""Takılabilir LLM arka uçları ve gecikmeye duyarlı yönlendirici
+
+Her arka uç stream(figure, message, history) ile yanıtı parça parça üretir;
+history, conversation.ConversationStore'un döndürdüğü önceki mesajlardır.
+LLMRouter her arka ucun son çağrılarındaki gecikme ve hata oranını izler,
+isteği en hızlı sağlıklı arka uca gönderir ve hata olursa sıradakine geçer.
+"""
+import os
+import threading
+import time
+from collections import deque
+
+import metrics
+from resilience import CircuitBreaker, DeadlineExceeded, LatencyTracker, percentile, race_streams
+
+LLM_LABELS = ['backend', 'model', 'figure_id']
+LLM_RESPONSE_SECONDS = metrics.histogram('llm_response_seconds', 'LLM yanıtının tamamlanma süresi', LLM_LABELS)
+LLM_FIRST_TOKEN_SECONDS = metrics.histogram('llm_first_token_seconds', 'LLM ilk parça süresi', LLM_LABELS)
+LLM_TOKENS_PER_SECOND = metrics.histogram(
+    'llm_tokens_per_second', 'İlk parçadan sonra saniyede üretilen parça (yaklaşık token)', LLM_LABELS,
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500)
+)
+LLM_ERRORS = metrics.counter('llm_errors_total', 'Başarısız LLM çağrıları', LLM_LABELS)
+
+
+class NoBackendAvailable(Exception):
+    """Hiçbir arka uç yanıt üretemedi"""
+
+
+def ollama_options(config):
+    """Ollama örnekleme ayarları"""
+    return {
+        "temperature": config["temperature"],
+        "num_predict": config["max_tokens"],
+        "top_p": config["top_p"]
+    }
+
+
+class LLMBackend:
+    """Arka uç arayüzü"""
+
+    name = None
+    # Yanıtları yanıt önbelleğine girebilir mi? (deterministik test arka uçları girmez)
+    cacheable = True
+    # Model bu süreçte mi çalışıyor? Uzak arka uçlar (ücretli API, ayrı sunucu) warm-up'ta ısıtılmaz
+    local = False
+
+    @property
+    def model(self):
+        return None
+
+    def ready(self):
+        """Arka uç istek almaya hazır mı? (ör. model hâlâ yükleniyor olabilir)"""
+        return True
+
+    def stream(self, figure, message, history=()):
+        """Yanıtı parça parça üret; hata olursa istisna fırlat"""
+        raise NotImplementedError
+
+    def complete(self, figure, message, history=()):
+        """Yanıtın tamamını tek seferde üret"""
+        return ''.join(self.stream(figure, message, history))
+
+    def stats(self):
+        """Arka uca özgü ek durum bilgisi"""
+        return {}
+
+
+class OpenAIBackend(LLMBackend):
+    """OpenAI Chat Completions (openai>=1.0 istemcisi)
+
+    API anahtarı ve adres OPENAI_API_KEY / OPENAI_BASE_URL ortam
+    değişkenlerinden okunur.
+    """
+
+    name = 'openai'
+
+    def __init__(self, build_messages, config=None):
+        self.build_messages = build_messages
+        self.config = config or {
+            "model_name": os.getenv('OPENAI_MODEL', 'gpt-3.5-turbo'),
+            "max_tokens": 500,
+            "temperature": 0.7
+        }
+        self._lock = threading.Lock()
+        self._client = None
+
+    @property
+    def model(self):
+        return self.config["model_name"]
+
+    def client(self):
+        """Tek HTTP istemcisi (bağlantılar yeniden kullanılır)"""
+        with self._lock:
+            if self._client is None:
+                from openai import OpenAI
+                self._client = OpenAI()
+            return self._client
+
+    def stream(self, figure, message, history=()):
+        response = self.client().chat.completions.create(
+            model=self.config["model_name"],
+            messages=self.build_messages(figure, message, history),
+            max_tokens=self.config["max_tokens"],
+            temperature=self.config["temperature"],
+            stream=True
+        )
+        for chunk in response:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                yield delta
+
+
+class OllamaBackend(LLMBackend):
+    """Ollama sunucusu; süre sınırı, devre kesici ve isteğe bağlı yedek istek ile
+
+    - timeout: tek bir okuma (ör. ilk token) için HTTP zaman aşımı.
+    - deadline: tüm yanıt için üst sınır; dolunca istek bırakılır.
+    - Her sunucunun kendi devre kesicisi vardır; açıkken çağrı yapılmaz.
+    - hedge_host verilirse ve birincil sunucu ilk parçayı son çağrıların
+      p95'inden (yeterli ölçüm yoksa hedge_after'dan) geç verirse aynı istek
+      ikinci sunucuya da gönderilir, önce yanıt veren kullanılır.
+    """
+
+    name = 'ollama'
+
+    def __init__(self, build_messages, config=None, host=None, hedge_host=None,
+                 timeout=None, deadline=None, hedge_after=2.0, breaker_settings=None):
+        self.build_messages = build_messages
+        self.config = config or {
+            "model_name": os.getenv('OLLAMA_MODEL', 'gemma2:2b'),
+            "temperature": 0.7,
+            "max_tokens": 400,
+            "top_p": 0.9
+        }
+        self.hosts = [host or 'http://localhost:11434'] + ([hedge_host] if hedge_host else [])
+        self.timeout = timeout
+        self.deadline = deadline
+        self.hedge_after = hedge_after
+
+        self.breakers = {
+            host: CircuitBreaker(f"ollama@{host}", **(breaker_settings or {}))
+            for host in self.hosts
+        }
+        self.first_chunk = LatencyTracker()
+        self._clients = {}
+        self._lock = threading.Lock()
+
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.deadline_exceeded = 0
+
+    @classmethod
+    def from_env(cls, build_messages, config=None):
+        """Sunucu adresleri ve süre ayarlarını ortam değişkenlerinden oku"""
+        return cls(
+            build_messages,
+            config,
+            host=os.getenv('OLLAMA_BASE_URL', 'http://localhost:11434'),
+            hedge_host=os.getenv('OLLAMA_HEDGE_URL') or None,
+            timeout=float(os.getenv('OLLAMA_TIMEOUT', 30)),
+            deadline=float(os.getenv('OLLAMA_DEADLINE', 60)),
+            hedge_after=int(os.getenv('OLLAMA_HEDGE_AFTER_MS', 2000)) / 1000,
+            breaker_settings={
+                "failure_rate": float(os.getenv('OLLAMA_BREAKER_FAILURE_RATE', 0.5)),
+                "min_calls": int(os.getenv('OLLAMA_BREAKER_MIN_CALLS', 5)),
+                "reset_timeout": float(os.getenv('OLLAMA_BREAKER_RESET', 30))
+            }
+        )
+
+    @property
+    def model(self):
+        return self.config["model_name"]
+
+    def client(self, host):
+        """Sunucu başına tek HTTP istemcisi (bağlantılar yeniden kullanılır)"""
+        with self._lock:
+            if host not in self._clients:
+                import ollama
+                self._clients[host] = ollama.Client(host=host, timeout=self.timeout)
+            return self._clients[host]
+
+    def hedge_delay(self):
+        """Yedek isteğin gönderileceği gecikme: ilk parça süresinin p95'i"""
+        if len(self.first_chunk) >= 20:
+            return self.first_chunk.percentile(95)
+        return self.hedge_after
+
+    def _attempt(self, host, messages, expires):
+        """Tek sunucuya istek; sonuç o sunucunun devre kesicisine yazılır"""
+        breaker = self.breakers[host]
+        breaker.allow()
+        outcome = None
+        try:
+            stream = self.client(host).chat(
+                model=self.config["model_name"],
+                messages=messages,
+                options=ollama_options(self.config),
+                stream=True
+            )
+            for chunk in stream:
+                if expires is not None and time.monotonic() > expires:
+                    raise DeadlineExceeded(f"ollama@{host} süre sınırını aştı")
+                delta = chunk['message']['content']
+                if delta:
+                    yield delta
+            outcome = True
+        except Exception:
+            outcome = False
+            raise
+        finally:
+            if outcome is True:
+                breaker.record_success()
+            elif outcome is False:
+                breaker.record_failure()
+            else:
+                # Yarış kaybedildi veya istemci ayrıldı: sonuç sayılmaz
+                breaker.abandon()
+
+    def stream(self, figure, message, history=()):
+        messages = self.build_messages(figure, message, history)
+        expires = time.monotonic() + self.deadline if self.deadline else None
+        primary = lambda: self._attempt(self.hosts[0], messages, expires)
+        hedge = None
+        if len(self.hosts) > 1:
+            hedge = lambda: self._attempt(self.hosts[1], messages, expires)
+
+        def on_first(index, seconds):
+            self.first_chunk.record(seconds)
+            if index == 1:
+                self.hedge_wins += 1
+
+        def on_hedge():
+            self.hedged += 1
+
+        try:
+            yield from race_streams(
+                primary, hedge, hedge_after=self.hedge_delay(), deadline=self.deadline,
+                on_first=on_first, on_hedge=on_hedge
+            )
+        except DeadlineExceeded:
+            self.deadline_exceeded += 1
+            raise
+
+    def stats(self):
+        return {
+            "hosts": {host: breaker.stats() for host, breaker in self.breakers.items()},
+            "first_chunk_p95_seconds": self.first_chunk.percentile(95),
+            "hedge_after_seconds": self.hedge_delay() if len(self.hosts) > 1 else None,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "deadline_exceeded": self.deadline_exceeded
+        }
+
+
+class TransformersBackend(LLMBackend):
+    """Süreç içinde çalışan transformers modeli
+
+    Model yükleme ve batch'leme uygulamada kaldığı için üretim ve hazır olma
+    fonksiyonları dışarıdan verilir.
+    """
+
+    name = 'transformers'
+    local = True
+
+    def __init__(self, stream_fn, complete_fn, config, ready_fn=None):
+        self.stream_fn = stream_fn
+        self.complete_fn = complete_fn
+        self.config = config
+        self.ready_fn = ready_fn
+
+    def ready(self):
+        return self.ready_fn() if self.ready_fn else True
+
+    @property
+    def model(self):
+        return self.config["model_name"]
+
+    def stream(self, figure, message, history=()):
+        return self.stream_fn(figure, message, history)
+
+    def complete(self, figure, message, history=()):
+        return self.complete_fn(figure, message, history)
+
+
+class StubBackend(LLMBackend):
+    """Testler ve yük testleri için deterministik yerel arka uç"""
+
+    name = 'stub'
+    cacheable = False
+
+    def __init__(self, delay=None):
+        self.delay = float(os.getenv('LLM_STUB_DELAY_MS', 0)) / 1000 if delay is None else delay
+
+    @property
+    def model(self):
+        return 'stub'
+
+    def stream(self, figure, message, history=()):
+        text = f"Merhaba! Ben {figure['name']}. \"{message}\" sorunuz için teşekkür ederim."
+        for index, word in enumerate(text.split(' ')):
+            if self.delay:
+                time.sleep(self.delay)
+            yield word if index == 0 else ' ' + word
+
+
+def build_backends(spec, factories):
+    """Virgülle ayrılmış arka uç adlarını (ör. "ollama,openai") nesnelere çevir"""
+    backends = []
+    for name in spec.split(','):
+        name = name.strip()
+        if not name:
+            continue
+        if name not in factories:
+            raise ValueError(f"Bilinmeyen LLM arka ucu: {name} (seçenekler: {', '.join(factories)})")
+        backends.append(factories[name]())
+    if not backends:
+        raise ValueError("En az bir LLM arka ucu gerekli")
+    return backends
+
+
+class BackendStats:
+    """Bir arka ucun son çağrılarına ait gecikme ve sonuç penceresi"""
+
+    def __init__(self, window):
+        self.latencies = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)
+        self.requests = 0
+        self.errors = 0
+        self.last_error = None
+        self.last_failure_at = None
+
+    def error_rate(self):
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+
+class RoutedAnswer:
+    """Yönlendiricinin ürettiği yanıt; hangi arka ucun verdiği yineleme bitince belli olur
+
+    backend: yanıtı veren arka uç; failover: ondan önce başarısız olan bir
+    arka uç var mıydı. Yanıt önbelleği yalnızca cacheable yanıtları saklar.
+    """
+
+    def __init__(self, produce):
+        self._produce = produce
+        self.backend = None
+        self.failover = False
+
+    def __iter__(self):
+        return self._produce(self)
+
+    @property
+    def model(self):
+        return self.backend.model if self.backend is not None else None
+
+    @property
+    def cacheable(self):
+        """Yük devri olmadan, önbelleğe alınabilir bir arka uçtan gelen yanıt mı?"""
+        return self.backend is not None and not self.failover and self.backend.cacheable
+
+
+class LLMRouter:
+    """Gecikmeye duyarlı arka uç seçimi ve otomatik yük devri
+
+    - Sağlıklı arka uçlar son çağrıların medyan (p50) gecikmesine göre
+      sıralanır; henüz ölçülmemiş arka uç bir kez denenip ölçülür.
+    - Son çağrılardaki hata oranı max_error_rate'i aşan arka uç sağlıksız
+      sayılır ve retry_after saniye boyunca yalnızca son çare olarak denenir.
+      Henüz hazır olmayan (ör. modeli yüklenen) arka uçlar da sona bırakılır.
+    - İlk parça gelmeden hata veren arka uçtan sıradakine geçilir. Parça
+      gönderildikten sonraki hatalar yanıt karışmasın diye çağırana iletilir.
+    """
+
+    def __init__(self, backends, window=100, max_error_rate=0.5, min_samples=5, retry_after=30):
+        self.backends = list(backends)
+        self.max_error_rate = max_error_rate
+        self.min_samples = min_samples
+        self.retry_after = retry_after
+
+        self._lock = threading.Lock()
+        self._stats = {backend.name: BackendStats(window) for backend in self.backends}
+
+    @classmethod
+    def from_env(cls, backends):
+        """Eşik ayarlarını ortam değişkenlerinden oku"""
+        return cls(
+            backends,
+            window=int(os.getenv('LLM_ROUTER_WINDOW', 100)),
+            max_error_rate=float(os.getenv('LLM_MAX_ERROR_RATE', 0.5)),
+            min_samples=int(os.getenv('LLM_MIN_SAMPLES', 5)),
+            retry_after=float(os.getenv('LLM_RETRY_AFTER', 30))
+        )
+
+    @property
+    def names(self):
+        return [backend.name for backend in self.backends]
+
+    def healthy(self, name):
+        """Arka uç son çağrılarda hata eşiğinin altında mı?"""
+        with self._lock:
+            return self._healthy(self._stats[name], time.monotonic())
+
+    def _healthy(self, stats, now):
+        if len(stats.outcomes) < self.min_samples or stats.error_rate() <= self.max_error_rate:
+            return True
+        # Bekleme süresi dolunca tekrar denenebilir
+        return now - stats.last_failure_at >= self.retry_after
+
+    def route(self):
+        """Denenecek arka uçlar: önce sağlıklılar en hızlıdan yavaşa, sonra diğerleri"""
+        now = time.monotonic()
+        ready = {backend.name: backend.ready() for backend in self.backends}
+        with self._lock:
+            healthy, unhealthy = [], []
+            for backend in self.backends:
+                stats = self._stats[backend.name]
+                p50 = percentile(stats.latencies, 50) or 0.0
+                if ready[backend.name] and self._healthy(stats, now):
+                    healthy.append((p50, backend))
+                else:
+                    unhealthy.append((stats.error_rate(), backend))
+        # sorted kararlı olduğu için eşitlikte yapılandırma sırası korunur
+        return [backend for _, backend in sorted(healthy, key=lambda item: item[0])] + \
+            [backend for _, backend in sorted(unhealthy, key=lambda item: item[0])]
+
+    def preferred_model(self):
+        """Şu anda ilk denenecek arka ucun modeli (yanıt önbelleği anahtarı için)"""
+        return self.route()[0].model
+
+    def stream(self, figure, message, history=(), figure_id=None):
+        """Yanıtı parça parça üret; ilk parçadan önce hata olursa sıradaki arka uca geç"""
+        return RoutedAnswer(lambda answer: self._stream(answer, figure, message, history, figure_id))
+
+    def _stream(self, answer, figure, message, history, figure_id):
+        errors = []
+        for backend in self.route():
+            labels = {"backend": backend.name, "model": backend.model, "figure_id": figure_id}
+            started = time.perf_counter()
+            first_at = None
+            chunks = 0
+            try:
+                for delta in backend.stream(figure, message, history):
+                    if first_at is None:
+                        first_at = time.perf_counter()
+                        LLM_FIRST_TOKEN_SECONDS.observe(first_at - started, **labels)
+                    chunks += 1
+                    yield delta
+            except Exception as e:
+                self._record_failure(backend.name, e)
+                LLM_ERRORS.inc(**labels)
+                if first_at is not None:
+                    raise
+                print(f"⚠️ {backend.name} arka ucu başarısız, sıradakine geçiliyor: {e}")
+                errors.append(f"{backend.name}: {e}")
+                continue
+            finished = time.perf_counter()
+            answer.backend, answer.failover = backend, bool(errors)
+            self._record_success(backend.name, finished - started)
+            LLM_RESPONSE_SECONDS.observe(finished - started, **labels)
+            if chunks > 1 and finished > first_at:
+                LLM_TOKENS_PER_SECOND.observe((chunks - 1) / (finished - first_at), **labels)
+            return
+        raise NoBackendAvailable('; '.join(errors))
+
+    def complete(self, figure, message, history=(), figure_id=None):
+        """Yanıtın tamamını üret; hata olursa sıradaki arka uca geç"""
+        return ''.join(self.completion(figure, message, history, figure_id))
+
+    def completion(self, figure, message, history=(), figure_id=None):
+        """complete() ile aynı, yanıtı tek parça olarak veren RoutedAnswer"""
+        return RoutedAnswer(lambda answer: self._complete(answer, figure, message, history, figure_id))
+
+    def _complete(self, answer, figure, message, history, figure_id):
+        errors = []
+        for backend in self.route():
+            labels = {"backend": backend.name, "model": backend.model, "figure_id": figure_id}
+            started = time.perf_counter()
+            try:
+                response = backend.complete(figure, message, history)
+            except Exception as e:
+                self._record_failure(backend.name, e)
+                LLM_ERRORS.inc(**labels)
+                print(f"⚠️ {backend.name} arka ucu başarısız, sıradakine geçiliyor: {e}")
+                errors.append(f"{backend.name}: {e}")
+                continue
+            elapsed = time.perf_counter() - started
+            answer.backend, answer.failover = backend, bool(errors)
+            self._record_success(backend.name, elapsed)
+            LLM_RESPONSE_SECONDS.observe(elapsed, **labels)
+            yield response
+            return
+        raise NoBackendAvailable('; '.join(errors))
+
+    def stats(self):
+        """Arka uç başına p50/p95 gecikme, hata oranı ve sağlık durumu"""
+        now = time.monotonic()
+        with self._lock:
+            return {
+                backend.name: {
+                    "model": backend.model,
+                    "healthy": self._healthy(stats, now),
+                    "ready": backend.ready(),
+                    "requests": stats.requests,
+                    "errors": stats.errors,
+                    "error_rate": stats.error_rate(),
+                    "p50_seconds": percentile(stats.latencies, 50),
+                    "p95_seconds": percentile(stats.latencies, 95),
+                    "last_error": stats.last_error,
+                    "details": backend.stats()
+                }
+                for backend in self.backends
+                for stats in (self._stats[backend.name],)
+            }
+
+    def _record_success(self, name, seconds):
+        with self._lock:
+            stats = self._stats[name]
+            stats.requests += 1
+            stats.latencies.append(seconds)
+            stats.outcomes.append(True)
+
+    def _record_failure(self, name, error):
+        with self._lock:
+            stats = self._stats[name]
+            stats.requests += 1
+            stats.errors += 1
+            stats.outcomes.append(False)
+            stats.last_error = str(error)
+            stats.last_failure_at = time.monotonic()
@@ -0,0 +1,174 @@
+"""Yük testi için sahte LLM sunucusu (OpenAI ve Ollama uyumlu)
+
+Gerçek model yerine sabit gecikmeli, deterministik token akışı üretir;
+böylece ölçülen süre modelin değil backend'in kendi maliyetidir.
+
+    POST /v1/chat/completions  OpenAI ChatCompletion (stream=True ise SSE)
+    POST /api/chat             Ollama sohbet (stream=True ise NDJSON)
+    GET  /api/tags             Ollama model listesi
+
+Tek başına çalıştırmak için (backend klasöründen):
+    python loadtest/fake_llm.py --port 11435 --first-token-ms 200 --token-latency-ms 30
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SENTENCE = "Bu cevap yük testi için sahte model tarafından üretildi."
+
+
+def response_tokens(count):
+    """count kelimelik, cümlelere bölünebilen deterministik yanıt"""
+    words = SENTENCE.split()
+    return [
+        (' ' if i else '') + words[i % len(words)]
+        for i in range(count)
+    ]
+
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    # HTTP/1.0: akış bitince bağlantı kapanır, Content-Length gerekmez
+    protocol_version = 'HTTP/1.0'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.rstrip('/') == '/api/tags':
+            self._json({"models": [{"name": self.server.model_name}]})
+        else:
+            self._json({"error": "not found"}, status=404)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = json.loads(self.rfile.read(length) or b'{}')
+        self.server.count_request()
+
+        if self.path.rstrip('/').endswith('/chat/completions'):
+            self._openai(body)
+        elif self.path.rstrip('/') == '/api/chat':
+            self._ollama(body)
+        else:
+            self._json({"error": "not found"}, status=404)
+
+    def _tokens(self):
+        # İlk token gecikmesi, sonra token başına sabit gecikme
+        settings = self.server
+        time.sleep(settings.first_token)
+        for index, token in enumerate(response_tokens(settings.tokens)):
+            if index:
+                time.sleep(settings.token_latency)
+            yield token
+
+    def _openai(self, body):
+        model = body.get('model', self.server.model_name)
+        created = int(time.time())
+        if not body.get('stream'):
+            text = ''.join(self._tokens())
+            self._json({
+                "id": "chatcmpl-loadtest",
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": text},
+                    "finish_reason": "stop"
+                }]
+            })
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.end_headers()
+        for token in self._tokens():
+            chunk = {
+                "id": "chatcmpl-loadtest",
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}]
+            }
+            self._write(f"data: {json.dumps(chunk)}\n\n")
+        self._write("data: [DONE]\n\n")
+
+    def _ollama(self, body):
+        model = body.get('model', self.server.model_name)
+        if not body.get('stream', True):
+            text = ''.join(self._tokens())
+            self._json({
+                "model": model,
+                "message": {"role": "assistant", "content": text},
+                "done": True
+            })
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.end_headers()
+        for token in self._tokens():
+            part = {"model": model, "message": {"role": "assistant", "content": token}, "done": False}
+            self._write(json.dumps(part, ensure_ascii=False) + '\n')
+        self._write(json.dumps({"model": model, "message": {"role": "assistant", "content": ""}, "done": True}) + '\n')
+
+    def _write(self, text):
+        self.wfile.write(text.encode('utf-8'))
+        self.wfile.flush()
+
+    def _json(self, payload, status=200):
+        data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class FakeLLMServer(ThreadingHTTPServer):
+    """Ayarlanabilir gecikmeli sahte model sunucusu"""
+
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=0, first_token_ms=200, token_latency_ms=30,
+                 tokens=60, model_name='loadtest'):
+        super().__init__((host, port), FakeLLMHandler)
+        self.first_token = first_token_ms / 1000
+        self.token_latency = token_latency_ms / 1000
+        self.tokens = tokens
+        self.model_name = model_name
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def start(self):
+        """Sunucuyu arka plan thread'inde başlat"""
+        threading.Thread(target=self.serve_forever, name='fake-llm', daemon=True).start()
+        return self
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=11435)
+    parser.add_argument('--first-token-ms', type=int, default=200)
+    parser.add_argument('--token-latency-ms', type=int, default=30)
+    parser.add_argument('--tokens', type=int, default=60)
+    args = parser.parse_args()
+
+    server = FakeLLMServer(args.host, args.port, args.first_token_ms, args.token_latency_ms, args.tokens)
+    print(f"🤖 Sahte LLM sunucusu: {server.url}")
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,432 @@
+"""Sohbet, TTS, giriş ve socket yolları için tekrarlanabilir yük testi
+
+Kullanım (backend klasöründen):
+    python loadtest/run.py --app ollama --concurrency 1 8 32 --requests 5
+    python loadtest/run.py --app openai --scenarios login chat --output sonuc.json
+    python loadtest/run.py --app ollama --baseline onceki.json --max-regression 0.2
+    python loadtest/run.py --app openai --scenarios login --concurrency 300 --requests 1
+
+Seçilen uygulama (openai: app.py, ollama: app_huggingface.py,
+transformers: app_huggingface_transformers.py) alt süreçte başlatılır. LLM
+çağrıları ayarlanabilir token gecikmeli sahte sunucuya (fake_llm.py), gTTS
+ise sahte seslendiriciye (serve.py) yönlendirilir; böylece sonuçlar ağdan ve
+gerçek modelden bağımsızdır. --target verilirse hiçbir şey başlatılmaz,
+çalışan sunucuya yük verilir.
+
+Senaryolar:
+  login:  POST /api/auth/login (yalnızca openai uygulamasında var)
+  chat:   POST /api/chat
+  tts:    POST /api/tts (varsayılan olarak her istek yeni metin, önbellek ıskası)
+  socket: chat_message olayı; ai_response gelene kadar süre ve ilk parça süresi
+
+Her senaryo ve eş zamanlılık için istek/sn, p50/p95/p99 gecikme, hata oranı ve
+durum kodları JSON olarak yazdırılır. --baseline ile önceki bir çıktıyla
+karşılaştırılır; p95'i --max-regression oranından fazla kötüleşen senaryo
+varsa çıkış kodu 1 olur.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from resilience import percentile  # noqa: E402
+from fake_llm import FakeLLMServer  # noqa: E402
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SERVE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'serve.py')
+
+SCENARIOS = ['login', 'chat', 'tts', 'socket']
+
+FIGURES = ['ataturk', 'fatih_sultan_mehmet', 'napoleon']
+
+QUESTIONS = [
+    "İstanbul'u nasıl fethettin?",
+    "En büyük zaferin hangisiydi?",
+    "Gençlere ne tavsiye edersin?",
+    "Bilime neden önem verdin?"
+]
+
+DEMO_USER = {"email": "ogrenci1@example.com", "password": "123456"}
+
+
+class LoadError(Exception):
+    """İstek başarısız oldu; status durum kodu veya hata türü"""
+
+    def __init__(self, status):
+        super().__init__(status)
+        self.status = status
+
+
+def summarize(scenario, concurrency, latencies, statuses, wall, first_chunks=None):
+    """Gecikme listesinden senaryo sonucu"""
+    total = sum(statuses.values())
+    errors = total - statuses.get('200', 0)
+    result = {
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "requests": total,
+        "errors": errors,
+        "error_rate": errors / total if total else 0.0,
+        "throughput_rps": len(latencies) / wall if wall else 0.0,
+        "latency_s": {
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "max": max(latencies) if latencies else None
+        },
+        "status_codes": dict(statuses),
+        "wall_s": wall
+    }
+    if first_chunks is not None:
+        result["first_chunk_s"] = {
+            "p50": percentile(first_chunks, 50),
+            "p95": percentile(first_chunks, 95),
+            "p99": percentile(first_chunks, 99)
+        }
+    return result
+
+
+def run_load(scenario, concurrency, requests_per_user, setup, call):
+    """concurrency kadar sanal kullanıcıyla call(state, user, i) çağır
+
+    setup(user) her kullanıcı için bir kez (süre ölçülmeden) çalışır ve
+    kullanıcının durumunu döndürür. call başarıda ilk parça süresini (veya
+    None) döndürür, başarısızlıkta LoadError fırlatır.
+    """
+    latencies = []
+    first_chunks = []
+    statuses = Counter()
+    lock = threading.Lock()
+    barrier = threading.Barrier(concurrency + 1)
+
+    def worker(user):
+        try:
+            state = setup(user)
+        except Exception as e:
+            print(f"❌ {scenario} kullanıcı {user} hazırlanamadı: {e}", file=sys.stderr)
+            state = None
+        barrier.wait()
+        for i in range(requests_per_user):
+            started = time.perf_counter()
+            try:
+                if state is None:
+                    raise LoadError('setup_failed')
+                first_chunk = call(state, user, i)
+                status = '200'
+            except LoadError as e:
+                first_chunk, status = None, str(e.status)
+            except Exception as e:
+                first_chunk, status = None, type(e).__name__
+            elapsed = time.perf_counter() - started
+            with lock:
+                statuses[status] += 1
+                if status == '200':
+                    latencies.append(elapsed)
+                    if first_chunk is not None:
+                        first_chunks.append(first_chunk)
+        teardown = getattr(state, 'disconnect', None)
+        if teardown:
+            teardown()
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    # Tüm kullanıcılar hazır olunca (giriş/bağlantı bitince) süre başlar
+    barrier.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    return summarize(scenario, concurrency, latencies, statuses, wall,
+                     first_chunks if scenario == 'socket' else None)
+
+
+class Target:
+    """Yük verilen sunucu ve senaryo çağrıları"""
+
+    def __init__(self, base_url, app, timeout, credentials=None):
+        self.base_url = base_url.rstrip('/')
+        self.app = app
+        self.timeout = timeout
+        self.credentials = credentials or DEMO_USER
+
+    @property
+    def needs_login(self):
+        return self.app == 'openai'
+
+    def login(self, session):
+        response = session.post(f"{self.base_url}/api/auth/login", json=self.credentials, timeout=self.timeout)
+        if response.status_code != 200:
+            raise LoadError(response.status_code)
+        return response.json()['access_token']
+
+    def session(self, user):
+        session = requests.Session()
+        session.loadtest_user = user
+        if self.needs_login:
+            session.headers['Authorization'] = f"Bearer {self.login(session)}"
+        return session
+
+    def chat_payload(self, user, i):
+        return {
+            "figure_id": FIGURES[(user + i) % len(FIGURES)],
+            "message": QUESTIONS[(user + i) % len(QUESTIONS)],
+            "session_id": f"loadtest-{user}"
+        }
+
+    def call_login(self, session, user, i):
+        self.login(session)
+
+    def call_chat(self, session, user, i):
+        response = session.post(f"{self.base_url}/api/chat", json=self.chat_payload(user, i), timeout=self.timeout)
+        if response.status_code != 200:
+            raise LoadError(response.status_code)
+
+    def call_tts(self, session, user, i, unique=True, engine=None):
+        text = "Merhaba, ben yük testi için seslendirilen bir cümleyim."
+        if unique:
+            text = f"{text} Kullanıcı {user}, istek {i}, {time.time_ns()}."
+        payload = {"text": text}
+        if engine:
+            payload["engine"] = engine
+        response = session.post(f"{self.base_url}/api/tts", json=payload, timeout=self.timeout)
+        if response.status_code != 200:
+            raise LoadError(response.status_code)
+
+    def socket_client(self, user):
+        import socketio
+
+        token = self.login(requests.Session()) if self.needs_login else None
+        client = socketio.Client(reconnection=False)
+        client.loadtest_events = {}
+        for event in ('ai_response_chunk', 'ai_response', 'error', 'auth_error'):
+            client.on(event, self._socket_handler(client, event))
+        client.connect(self.base_url, auth={'token': token} if token else None, wait_timeout=self.timeout)
+        return client
+
+    def _socket_handler(self, client, event):
+        def handler(data=None):
+            waiter = client.loadtest_events.get('waiter')
+            if waiter is None:
+                return
+            if event == 'ai_response_chunk':
+                waiter.setdefault('first_chunk', time.perf_counter())
+                return
+            waiter['event'] = event
+            waiter['done'].set()
+        return handler
+
+    def call_socket(self, client, user, i):
+        waiter = {'done': threading.Event()}
+        client.loadtest_events['waiter'] = waiter
+        started = time.perf_counter()
+        client.emit('chat_message', self.chat_payload(user, i))
+        if not waiter['done'].wait(self.timeout):
+            raise LoadError('timeout')
+        if waiter['event'] != 'ai_response':
+            raise LoadError(waiter['event'])
+        return waiter.get('first_chunk', time.perf_counter()) - started
+
+    def stats(self):
+        """Sunucunun kendi sayaçları (varsa)"""
+        stats = {}
+        for name in ('generation', 'llm/backends', 'chat'):
+            path = f"/api/{name}/stats" if name != 'llm/backends' else '/api/llm/backends'
+            try:
+                response = requests.get(self.base_url + path, timeout=self.timeout)
+                if response.status_code == 200:
+                    stats[name] = response.json()
+            except requests.RequestException:
+                pass
+        return stats
+
+
+def start_app(app, port, llm_url, tts_latency_ms, answer_cache, extra_env):
+    """Uygulamayı sahte arka uçlarla alt süreçte başlat"""
+    env = dict(os.environ)
+    env.update({
+        'PORT': str(port),
+        'OLLAMA_BASE_URL': llm_url,
+        'OLLAMA_HEDGE_URL': '',
+        'OPENAI_BASE_URL': f"{llm_url}/v1",
+        'OPENAI_API_KEY': env.get('OPENAI_API_KEY', 'loadtest'),
+        'TTS_CACHE_DIR': tempfile.mkdtemp(prefix='loadtest-tts-'),
+        'PYTHONUNBUFFERED': '1'
+    })
+    if app == 'transformers':
+        # Yerel model yerine sahte sunucu (--real-model ile değiştirilebilir)
+        env.setdefault('LLM_BACKENDS', 'ollama')
+    if not answer_cache:
+        env['ANSWER_CACHE_MAX_ENTRIES'] = '0'
+    env.update(extra_env)
+
+    return subprocess.Popen(
+        [sys.executable, SERVE, '--app', app, '--port', str(port), '--tts-latency-ms', str(tts_latency_ms)],
+        cwd=BACKEND_DIR, env=env, stdout=sys.stderr, stderr=sys.stderr
+    )
+
+
+def wait_for_server(base_url, process, timeout):
+    """Sunucu HTTP yanıtı verene kadar bekle (durum kodu önemsiz)"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"Sunucu başlamadan kapandı (çıkış kodu {process.returncode})")
+        try:
+            requests.get(base_url + '/', timeout=1)
+            return
+        except requests.RequestException:
+            time.sleep(0.2)
+    raise RuntimeError(f"Sunucu {timeout} saniyede hazır olmadı")
+
+
+def compare(results, baseline, max_regression):
+    """p95'i baseline'a göre max_regression oranından fazla artan senaryolar"""
+    previous = {
+        (item["scenario"], item["concurrency"]): item
+        for item in baseline.get("results", [])
+    }
+    regressions = []
+    for item in results:
+        old = previous.get((item["scenario"], item["concurrency"]))
+        if not old:
+            continue
+        old_p95, new_p95 = old["latency_s"]["p95"], item["latency_s"]["p95"]
+        if old_p95 and new_p95 and new_p95 > old_p95 * (1 + max_regression):
+            regressions.append({
+                "scenario": item["scenario"],
+                "concurrency": item["concurrency"],
+                "metric": "p95",
+                "baseline": old_p95,
+                "current": new_p95
+            })
+        if item["error_rate"] > old["error_rate"] + max_regression:
+            regressions.append({
+                "scenario": item["scenario"],
+                "concurrency": item["concurrency"],
+                "metric": "error_rate",
+                "baseline": old["error_rate"],
+                "current": item["error_rate"]
+            })
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--app', choices=['openai', 'ollama', 'transformers'], default='ollama')
+    parser.add_argument('--target', help="Çalışan sunucunun adresi; verilirse uygulama başlatılmaz")
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--requests', type=int, default=5, help="Sanal kullanıcı başına istek")
+    parser.add_argument('--first-token-ms', type=int, default=200)
+    parser.add_argument('--token-latency-ms', type=int, default=30)
+    parser.add_argument('--tokens', type=int, default=60)
+    parser.add_argument('--tts-latency-ms', type=int, default=150)
+    parser.add_argument('--tts-repeat', action='store_true', help="TTS'te hep aynı metni kullan (önbellek isabeti)")
+    parser.add_argument('--tts-engine', help="TTS senaryosunda istenecek motor (gtts sahtedir, espeak gerçek çalışır)")
+    parser.add_argument('--answer-cache', action='store_true', help="Yanıt önbelleğini açık bırak")
+    parser.add_argument('--real-model', action='store_true', help="transformers uygulamasında yerel modeli kullan")
+    parser.add_argument('--env', nargs='*', default=[], metavar='AD=DEĞER', help="Sunucuya ek ortam değişkenleri")
+    parser.add_argument('--login-email', default=DEMO_USER['email'], help="Giriş senaryosunun kullanıcısı")
+    parser.add_argument('--login-password', default=DEMO_USER['password'])
+    parser.add_argument('--timeout', type=float, default=60)
+    parser.add_argument('--startup-timeout', type=float, default=120)
+    parser.add_argument('--output', help="Sonucu bu dosyaya da yaz")
+    parser.add_argument('--baseline', help="Karşılaştırılacak önceki sonuç dosyası")
+    parser.add_argument('--max-regression', type=float, default=0.2)
+    args = parser.parse_args()
+
+    llm = None
+    process = None
+    base_url = args.target
+    if not base_url:
+        llm = FakeLLMServer(
+            first_token_ms=args.first_token_ms,
+            token_latency_ms=args.token_latency_ms,
+            tokens=args.tokens
+        ).start()
+        extra_env = dict(item.split('=', 1) for item in args.env)
+        if args.real_model:
+            extra_env.setdefault('LLM_BACKENDS', 'transformers')
+        process = start_app(args.app, args.port, llm.url, args.tts_latency_ms, args.answer_cache, extra_env)
+        base_url = f"http://127.0.0.1:{args.port}"
+
+    target = Target(base_url, args.app, args.timeout, {"email": args.login_email, "password": args.login_password})
+    scenarios = {
+        'login': (lambda user: requests.Session(), target.call_login),
+        'chat': (target.session, target.call_chat),
+        'tts': (target.session, lambda session, user, i: target.call_tts(session, user, i, not args.tts_repeat, args.tts_engine)),
+        'socket': (target.socket_client, target.call_socket)
+    }
+
+    results = []
+    try:
+        wait_for_server(base_url, process, args.startup_timeout)
+        for scenario in args.scenarios:
+            if scenario == 'login' and not target.needs_login:
+                print(f"⏭️ {args.app} uygulamasında giriş yok, login atlandı", file=sys.stderr)
+                continue
+            setup, call = scenarios[scenario]
+            for concurrency in args.concurrency:
+                print(f"⏱️ {scenario}: {concurrency} eş zamanlı kullanıcı", file=sys.stderr)
+                results.append(run_load(scenario, concurrency, args.requests, setup, call))
+        server_stats = target.stats()
+    finally:
+        if process is not None:
+            process.terminate()
+            try:
+                process.wait(10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        if llm is not None:
+            llm.shutdown()
+
+    report = {
+        "app": args.app,
+        "target": base_url,
+        "config": {
+            "requests_per_user": args.requests,
+            "first_token_ms": args.first_token_ms,
+            "token_latency_ms": args.token_latency_ms,
+            "tokens": args.tokens,
+            "tts_latency_ms": args.tts_latency_ms,
+            "tts_repeat": args.tts_repeat,
+            "tts_engine": args.tts_engine,
+            "answer_cache": args.answer_cache,
+            "real_model": args.real_model
+        },
+        "llm_requests": llm.requests if llm else None,
+        "results": results,
+        "server_stats": server_stats
+    }
+
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            report["regressions"] = compare(results, json.load(f), args.max_regression)
+        if report["regressions"]:
+            print(f"⚠️ {len(report['regressions'])} gerileme bulundu", file=sys.stderr)
+            exit_code = 1
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+    print(output)
+    sys.exit(exit_code)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""Backend uygulamasını yük testi için sahte TTS ile başlatır
+
+Kullanım (backend klasöründen; run.py bunu alt süreç olarak çağırır):
+    python loadtest/serve.py --app ollama --port 5055 --tts-latency-ms 150
+
+LLM arka uçları ortam değişkenleriyle (OLLAMA_BASE_URL, OPENAI_BASE_URL,
+LLM_BACKENDS) sahte sunucuya yönlendirilir. gTTS yerine Google'a gitmeden
+sabit süre bekleyip sessiz MP3 çerçeveleri yazan sahte sınıf kullanılır.
+"""
+import argparse
+import importlib
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+APPS = {
+    'openai': 'app',
+    'ollama': 'app_huggingface',
+    'transformers': 'app_huggingface_transformers'
+}
+
+# 32 kbps, 24 kHz MPEG-2 Layer III sessiz çerçeve başlığı (~24 ms ses)
+SILENT_FRAME = b'\xff\xf3\x44\xc4' + b'\x00' * 92
+
+
+class FakeGTTS:
+    """gTTS ile aynı arayüz; süre metin uzunluğuyla orantılı sessiz ses"""
+
+    latency = 0.15
+    frames_per_char = 2
+
+    def __init__(self, text, lang='tr', slow=False, **kwargs):
+        self.text = text
+
+    def write_to_fp(self, fp):
+        time.sleep(self.latency)
+        fp.write(SILENT_FRAME * max(1, len(self.text) * self.frames_per_char))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--app', choices=sorted(APPS), required=True)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--tts-latency-ms', type=int, default=150)
+    args = parser.parse_args()
+
+    import tts
+    FakeGTTS.latency = args.tts_latency_ms / 1000
+    tts.gTTS = FakeGTTS
+
+    # Warm-up ölçülen isteklerle yarışmasın, önbellekleri önceden doldurmasın
+    os.environ.setdefault('WARMUP_ENABLED', 'false')
+    module = importlib.import_module(APPS[args.app])
+    print(f"🧪 Yük testi sunucusu: {APPS[args.app]} http://{args.host}:{args.port}", flush=True)
+    module.socketio.run(module.app, host=args.host, port=args.port, debug=False,
+                        use_reloader=False, allow_unsafe_werkzeug=True)
+
+
+if __name__ == '__main__':
+    main()
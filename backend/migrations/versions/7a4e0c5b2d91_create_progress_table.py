@@ -0,0 +1,46 @@
+"""create progress table
+
+Revision ID: 7a4e0c5b2d91
+Revises: 3f1c2a9d8b7e
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7a4e0c5b2d91'
+down_revision = '3f1c2a9d8b7e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('progress',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('figure_id', sa.String(length=64), nullable=False),
+    sa.Column('total_study_time', sa.Integer(), nullable=False),
+    sa.Column('notes_count', sa.Integer(), nullable=False),
+    sa.Column('events_studied', sa.Integer(), nullable=False),
+    sa.Column('quizzes_completed', sa.Integer(), nullable=False),
+    sa.Column('correct_answers', sa.Integer(), nullable=False),
+    sa.Column('total_questions', sa.Integer(), nullable=False),
+    sa.Column('achievements_unlocked', sa.Integer(), nullable=False),
+    sa.Column('experience', sa.Integer(), nullable=False),
+    sa.Column('study_sessions', sa.Text(), nullable=True),
+    sa.Column('weekly_progress', sa.Text(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('progress', schema=None) as batch_op:
+        batch_op.create_index('ix_progress_user_figure', ['user_id', 'figure_id'], unique=True)
+
+
+def downgrade():
+    with op.batch_alter_table('progress', schema=None) as batch_op:
+        batch_op.drop_index('ix_progress_user_figure')
+
+    op.drop_table('progress')
@@ -0,0 +1,28 @@
+"""add user class_code
+
+Revision ID: c81d5e3f6a20
+Revises: 7a4e0c5b2d91
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c81d5e3f6a20'
+down_revision = '7a4e0c5b2d91'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('class_code', sa.String(length=32), nullable=True))
+        batch_op.create_index(batch_op.f('ix_user_class_code'), ['class_code'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_user_class_code'))
+        batch_op.drop_column('class_code')
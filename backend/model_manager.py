@@ -0,0 +1,193 @@
+"""Modeli arka planda yükleyip hazır olduğunda atomik olarak devreye alan yönetici"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import metrics
+
+MODEL_LOAD_SECONDS = metrics.histogram(
+    'model_load_seconds', 'Model yükleme süresi', ['model', 'result'],
+    buckets=(1, 5, 10, 30, 60, 120, 300, 600)
+)
+
+
+class ModelNotReady(Exception):
+    """Model belirtilen süre içinde hazır olmadı"""
+
+
+class _Slot:
+    """Bir model paketini ve onu kullanan istek sayısını tutar"""
+
+    def __init__(self, bundle):
+        self.bundle = bundle
+        self.refs = 0
+        self.retired = False
+
+
+def resident_memory_bytes():
+    """Sürecin anlık bellek kullanımı (RSS)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        # Linux dışında yalnızca tepe değer alınabiliyor (macOS'ta bayt, Linux'ta KB)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if peak > 1 << 32 else peak * 1024
+    except (ImportError, OSError):
+        return None
+
+
+class ModelManager:
+    """Tek uçuşlu (single-flight) model yükleme ve çift tamponlu değiştirme
+
+    - Aynı anda yalnızca bir yükleme çalışır; model beklerken gelen istekler
+      kendi yüklemelerini başlatmak yerine hazır olmasını bekler.
+    - Yeni model arka planda yüklenir, eski model bu sırada hizmet vermeye
+      devam eder. Yükleme bitince referans tek adımda değiştirilir.
+    - Eski model, onu kullanan son istek bitince release ile serbest bırakılır.
+    """
+
+    def __init__(self, loader, default_name, fallback_name=None, release=None, on_swap=None):
+        self.loader = loader
+        self.default_name = default_name
+        self.fallback_name = fallback_name
+        self.release = release
+        self.on_swap = on_swap
+
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._current = None
+        self._retired = []
+
+        self.loading = None
+        self.error = None
+        self.last_load_seconds = None
+        self.loaded_at = None
+        self.swaps = 0
+
+    @property
+    def current_name(self):
+        slot = self._current
+        return slot.bundle.name if slot else None
+
+    @property
+    def state(self):
+        """empty | loading | ready | swapping | failed"""
+        if self.loading:
+            return 'swapping' if self._current else 'loading'
+        if self._current:
+            return 'ready'
+        return 'failed' if self.error else 'empty'
+
+    def start_loading(self, name):
+        """Yüklemeyi arka planda başlat
+
+        Aynı model zaten yükleniyorsa True, başka bir model yükleniyorsa
+        False döner.
+        """
+        with self._lock:
+            if self.loading is not None:
+                return self.loading == name
+            self.loading = name
+            self.error = None
+
+        threading.Thread(target=self._load, args=(name,), name='model-loader', daemon=True).start()
+        return True
+
+    def wait_ready(self, timeout=None):
+        """Model hazır olana kadar bekle; hiç yükleme yoksa varsayılanı başlat"""
+        if not self._ready.is_set() and self.loading is None:
+            self.start_loading(self.default_name)
+        return self._ready.wait(timeout)
+
+    @contextmanager
+    def acquire(self, timeout=None):
+        """Geçerli modeli istek boyunca kullanım için ödünç al"""
+        if not self.wait_ready(timeout):
+            raise ModelNotReady(self.loading or self.default_name)
+
+        with self._lock:
+            slot = self._current
+            slot.refs += 1
+        try:
+            yield slot.bundle
+        finally:
+            with self._lock:
+                slot.refs -= 1
+                drained = slot.retired and slot.refs == 0
+                if drained:
+                    self._retired.remove(slot)
+            if drained:
+                self._release(slot)
+
+    def health(self):
+        """Yükleme durumu ve bellek kullanımı"""
+        with self._lock:
+            in_flight = self._current.refs if self._current else 0
+            draining = [slot.bundle.name for slot in self._retired]
+        return {
+            "state": self.state,
+            "ready": self._ready.is_set(),
+            "current_model": self.current_name,
+            "loading_model": self.loading,
+            "error": self.error,
+            "in_flight": in_flight,
+            "draining_models": draining,
+            "last_load_seconds": self.last_load_seconds,
+            "loaded_at": self.loaded_at,
+            "swaps": self.swaps,
+            "resident_memory_bytes": resident_memory_bytes()
+        }
+
+    def _load(self, name):
+        started = time.perf_counter()
+        try:
+            bundle = self.loader(name)
+        except Exception as e:
+            print(f"❌ Model yükleme hatası: {e}")
+            bundle = None
+            # Hizmette hiç model yoksa yedek modeli dene; varsa eskisiyle devam et
+            if self._current is None and self.fallback_name and name != self.fallback_name:
+                try:
+                    bundle = self.loader(self.fallback_name)
+                except Exception as fallback_error:
+                    print(f"❌ Yedek model yükleme hatası: {fallback_error}")
+            if bundle is None:
+                MODEL_LOAD_SECONDS.observe(time.perf_counter() - started, model=name, result='error')
+                with self._lock:
+                    self.error = str(e)
+                    self.loading = None
+                return
+
+        with self._lock:
+            previous = self._current
+            self._current = _Slot(bundle)
+            self.loading = None
+            self.last_load_seconds = time.perf_counter() - started
+            self.loaded_at = time.time()
+            self.swaps += 1
+            drained = False
+            if previous is not None:
+                previous.retired = True
+                drained = previous.refs == 0
+                if not drained:
+                    self._retired.append(previous)
+        self._ready.set()
+        MODEL_LOAD_SECONDS.observe(self.last_load_seconds, model=bundle.name, result='ok')
+
+        if self.on_swap:
+            self.on_swap(bundle)
+        if previous is not None and drained:
+            self._release(previous)
+
+    def _release(self, slot):
+        if self.release:
+            try:
+                self.release(slot.bundle)
+            except Exception as e:
+                print(f"⚠️ Eski model serbest bırakılamadı: {e}")
+        slot.bundle = None
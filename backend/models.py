@@ -0,0 +1,121 @@
+"""Veritabanı modelleri
+
+E-posta ve kullanıcı adı benzersiz indekslidir; kayıtta önce sorgulayıp
+sonra eklemek yerine doğrudan eklenir ve çakışma IntegrityError olarak
+yakalanır (duplicate_field). İndeks adları migration'larla aynı olmalıdır.
+"""
+import json
+from datetime import datetime
+
+from database import db
+
+EMAIL_INDEX = 'ix_user_email'
+USERNAME_INDEX = 'ix_user_username'
+
+
+class User(db.Model):
+    __tablename__ = 'user'
+
+    id = db.Column(db.Integer, primary_key=True)
+    username = db.Column(db.String(80), nullable=False)
+    email = db.Column(db.String(120), nullable=False)
+    password_hash = db.Column(db.String(255), nullable=False)
+    full_name = db.Column(db.String(120), nullable=False)
+    level = db.Column(db.Integer, nullable=False, default=1)
+    experience = db.Column(db.Integer, nullable=False, default=0)
+    coins = db.Column(db.Integer, nullable=False, default=100)
+    gems = db.Column(db.Integer, nullable=False, default=10)
+    current_streak = db.Column(db.Integer, nullable=False, default=0)
+    longest_streak = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    last_login = db.Column(db.DateTime)
+    # Sınıf sıralaması için öğretmenin verdiği sınıf kodu (ör. 9A)
+    class_code = db.Column(db.String(32), index=True)
+
+    __table_args__ = (
+        db.Index(EMAIL_INDEX, 'email', unique=True),
+        db.Index(USERNAME_INDEX, 'username', unique=True),
+    )
+
+    def to_dict(self):
+        """İstemciye dönen profil (demo kullanıcılarla aynı anahtarlar)"""
+        return {
+            'id': self.id,
+            'username': self.username,
+            'email': self.email,
+            'fullName': self.full_name,
+            'level': self.level,
+            'experience': self.experience,
+            'coins': self.coins,
+            'gems': self.gems,
+            'currentStreak': self.current_streak,
+            'longestStreak': self.longest_streak,
+            'createdAt': self.created_at.isoformat() if self.created_at else None,
+            'lastLogin': self.last_login.isoformat() if self.last_login else None,
+            'classCode': self.class_code
+        }
+
+
+# İstemcinin ilerleme alanı -> sütun; sayaçlar tamsayı, listeler JSON metni
+PROGRESS_COUNTERS = {
+    'totalStudyTime': 'total_study_time',
+    'notesCount': 'notes_count',
+    'eventsStudied': 'events_studied',
+    'quizzesCompleted': 'quizzes_completed',
+    'correctAnswers': 'correct_answers',
+    'totalQuestions': 'total_questions',
+    'achievementsUnlocked': 'achievements_unlocked',
+    'experience': 'experience'
+}
+PROGRESS_LISTS = {
+    'studySessions': 'study_sessions',
+    'weeklyProgress': 'weekly_progress'
+}
+
+
+class Progress(db.Model):
+    """Kullanıcının bir figürle ilerlemesi; (user_id, figure_id) başına tek satır"""
+    __tablename__ = 'progress'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+    figure_id = db.Column(db.String(64), nullable=False)
+    total_study_time = db.Column(db.Integer, nullable=False, default=0)
+    notes_count = db.Column(db.Integer, nullable=False, default=0)
+    events_studied = db.Column(db.Integer, nullable=False, default=0)
+    quizzes_completed = db.Column(db.Integer, nullable=False, default=0)
+    correct_answers = db.Column(db.Integer, nullable=False, default=0)
+    total_questions = db.Column(db.Integer, nullable=False, default=0)
+    achievements_unlocked = db.Column(db.Integer, nullable=False, default=0)
+    experience = db.Column(db.Integer, nullable=False, default=0)
+    study_sessions = db.Column(db.Text)
+    weekly_progress = db.Column(db.Text)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_progress_user_figure', 'user_id', 'figure_id', unique=True),
+    )
+
+    def to_dict(self):
+        """İstemcinin ProgressData alanları"""
+        data = {field: getattr(self, column) or 0 for field, column in PROGRESS_COUNTERS.items()}
+        for field, column in PROGRESS_LISTS.items():
+            value = getattr(self, column)
+            data[field] = json.loads(value) if value else []
+        data['figureId'] = self.figure_id
+        data['updatedAt'] = self.updated_at.isoformat() if self.updated_at else None
+        return data
+
+
+def duplicate_field(error):
+    """IntegrityError hangi benzersiz alanda çakıştı? 'email', 'username' veya None
+
+    MSSQL mesajı indeks adını ("... with unique index 'ix_user_email'"),
+    SQLite mesajı sütunu ("UNIQUE constraint failed: user.email") içerir.
+    """
+    message = str(getattr(error, 'orig', error)).lower()
+    if EMAIL_INDEX in message or 'user.email' in message:
+        return 'email'
+    if USERNAME_INDEX in message or 'user.username' in message:
+        return 'username'
+    return None
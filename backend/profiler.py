@@ -0,0 +1,112 @@
+"""Canlı süreçte isteğe bağlı örnekleyici (sampling) profil
+
+Ayrı bir thread belirli aralıklarla tüm thread'lerin yığınlarını
+(sys._current_frames) okur ve flamegraph.pl / speedscope'un okuyabildiği
+"collapsed" biçimde sayar:
+
+    thread;fonksiyon (dosya:satır);... örnek_sayısı
+
+eventlet altında greenlet'ler ana thread'de sırayla çalıştığı için yalnızca
+örnek anında çalışan greenlet'in yığını görünür; LLM/TTS işçileri gerçek
+thread olduğundan ayrı ayrı görünür.
+"""
+import hmac
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+from flask import Response, jsonify
+
+MAX_SECONDS = 60
+
+
+def frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def collapsed_stack(frame):
+    """Kökten yaprağa ';' ile birleştirilmiş yığın"""
+    labels = []
+    while frame is not None:
+        labels.append(frame_label(frame))
+        frame = frame.f_back
+    return ';'.join(reversed(labels))
+
+
+class SamplingProfiler:
+    """seconds boyunca her interval saniyede bir tüm thread yığınlarını örnekle"""
+
+    def __init__(self, seconds, interval=0.005):
+        self.seconds = seconds
+        self.interval = interval
+        self.samples = 0
+        self.stacks = Counter()
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def is_alive(self):
+        return self._thread.is_alive()
+
+    def _run(self):
+        own = threading.get_ident()
+        names = {}
+        deadline = time.monotonic() + self.seconds
+        while time.monotonic() < deadline:
+            for thread in threading.enumerate():
+                names[thread.ident] = thread.name
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                thread_name = names.get(ident, str(ident)).replace(' ', '_')
+                self.stacks[f"{thread_name};{collapsed_stack(frame)}"] += 1
+            self.samples += 1
+            time.sleep(self.interval)
+
+    def collapsed(self):
+        """Flamegraph araçlarının okuduğu satırlar, en sık yığın önce"""
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+def profile(seconds, interval=0.005, sleep=time.sleep):
+    """Profili çalıştırıp bitmesini bekle
+
+    sleep, eventlet altında socketio.sleep verilerek bekleme sırasında olay
+    döngüsünün çalışmaya devam etmesi sağlanır.
+    """
+    profiler = SamplingProfiler(seconds, interval).start()
+    while profiler.is_alive():
+        sleep(0.05)
+    return profiler
+
+
+def admin_authorized(request):
+    """X-Admin-Token başlığı ADMIN_TOKEN ile eşleşiyor mu? (tanımlı değilse kapalı)"""
+    expected = os.getenv('ADMIN_TOKEN')
+    given = request.headers.get('X-Admin-Token', '')
+    return bool(expected) and hmac.compare_digest(given.encode(), expected.encode())
+
+
+def profile_request(request, sleep=time.sleep):
+    """/api/admin/profile isteğini işle: ?seconds=10&interval_ms=5"""
+    if not admin_authorized(request):
+        return jsonify({"error": "Yetkisiz"}), 403
+    try:
+        seconds = float(request.args.get('seconds', 10))
+        interval = float(request.args.get('interval_ms', 5)) / 1000
+    except ValueError:
+        return jsonify({"error": "seconds ve interval_ms sayı olmalı"}), 400
+    if not 0 < seconds <= MAX_SECONDS or interval <= 0:
+        return jsonify({"error": f"seconds 0-{MAX_SECONDS} arasında, interval_ms pozitif olmalı"}), 400
+
+    profiler = profile(seconds, interval, sleep)
+    return Response(
+        profiler.collapsed(),
+        mimetype='text/plain',
+        headers={'X-Profile-Samples': str(profiler.samples)}
+    )
@@ -0,0 +1,285 @@
+"""Öğrenci ilerlemesi: arka planda toplu yazan (write-behind) tampon
+
+Arayüz her küçük olayda (not eklendi, olay incelendi...) ilerleme gönderir;
+her biri ayrı bir veritabanı işlemi olsaydı sınıf dolusu öğrenci veritabanını
+gereksiz yere meşgul ederdi. ProgressBuffer güncellemeleri bellekte
+(kullanıcı, figür) başına birleştirir ve interval saniyede bir tek işlemde
+toplu (executemany) yazar. Kapanışta bekleyenler yazılır; yazma başarısız
+olursa güncellemeler tampona geri konur. Satır kaynaklı bir hata (ör. silinmiş
+kullanıcı için yabancı anahtar) tüm batch'i düşürmesin diye batch ikiye
+bölünerek yeniden yazılır; yalnızca hatalı satırların deneme sayısı artar.
+"""
+import atexit
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import DataError, IntegrityError
+
+import metrics
+from database import db
+from models import PROGRESS_COUNTERS, PROGRESS_LISTS, Progress
+
+PROGRESS_FLUSH_SECONDS = metrics.histogram('progress_flush_seconds', 'İlerleme tamponunun veritabanına yazılma süresi')
+PROGRESS_FLUSHED_ROWS = metrics.counter('progress_flushed_rows_total', 'Veritabanına yazılan ilerleme satırları')
+PROGRESS_FLUSH_ERRORS = metrics.counter('progress_flush_errors_total', 'Başarısız ilerleme yazımları')
+
+# MSSQL tek sorguda en fazla 2100 parametre kabul eder
+SELECT_CHUNK = 500
+
+
+def parse_progress(data):
+    """İstemcinin ProgressData alanlarını sütun değerlerine çevir
+
+    Bilinmeyen alanlar yok sayılır; hatalı değerde ValueError fırlatılır.
+    """
+    columns = {}
+    for field, column in PROGRESS_COUNTERS.items():
+        if field in data:
+            value = data[field]
+            if isinstance(value, bool) or not isinstance(value, int) or value < 0:
+                raise ValueError(f"{field} negatif olmayan bir tamsayı olmalı")
+            columns[column] = value
+    for field, column in PROGRESS_LISTS.items():
+        if field in data:
+            if not isinstance(data[field], list):
+                raise ValueError(f"{field} bir liste olmalı")
+            columns[column] = json.dumps(data[field], ensure_ascii=False)
+    return columns
+
+
+def progress_fields(columns):
+    """parse_progress'in tersi: sütun değerlerinden istemci alanları"""
+    fields = {}
+    for field, column in PROGRESS_COUNTERS.items():
+        if column in columns:
+            fields[field] = columns[column]
+    for field, column in PROGRESS_LISTS.items():
+        if column in columns:
+            fields[field] = json.loads(columns[column])
+    return fields
+
+
+def load_progress(user_id, figure_id):
+    """Veritabanındaki ilerleme (yoksa sıfırlar)"""
+    progress = db.session.execute(
+        select(Progress).filter_by(user_id=user_id, figure_id=figure_id)
+    ).scalar_one_or_none()
+    return (progress or Progress(figure_id=figure_id)).to_dict()
+
+
+def save_progress(batch):
+    """{(user_id, figure_id): {sütun: değer}} toplu yaz: bir SELECT, toplu UPDATE ve INSERT
+
+    Uygulama bağlamında çağrılmalıdır. Başka bir süreç aynı satırı araya
+    eklerse benzersiz indeks IntegrityError verir; tampon batch'i geri koyar
+    ve bir sonraki yazımda satır güncellenir.
+    """
+    now = datetime.utcnow()
+    keys = list(batch)
+    existing = {}
+    for start in range(0, len(keys), SELECT_CHUNK):
+        chunk = keys[start:start + SELECT_CHUNK]
+        rows = db.session.execute(
+            select(Progress.id, Progress.user_id, Progress.figure_id).where(
+                Progress.user_id.in_({user_id for user_id, _ in chunk}),
+                Progress.figure_id.in_({figure_id for _, figure_id in chunk})
+            )
+        )
+        for row_id, user_id, figure_id in rows:
+            existing[(user_id, figure_id)] = row_id
+
+    updates = []
+    inserts = []
+    for (user_id, figure_id), columns in batch.items():
+        row_id = existing.get((user_id, figure_id))
+        if row_id is not None:
+            updates.append(dict(columns, id=row_id, updated_at=now))
+        else:
+            inserts.append(dict(columns, user_id=user_id, figure_id=figure_id, updated_at=now))
+
+    try:
+        if updates:
+            db.session.execute(update(Progress), updates)
+        if inserts:
+            db.session.execute(insert(Progress), inserts)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return len(batch)
+
+
+class ProgressBuffer:
+    """(kullanıcı, figür) başına birleştirilen, periyodik toplu yazılan güncellemeler
+
+    - write(batch): {(user_id, figure_id): {sütun: değer}} kalıcı hale getirir
+    - Aynı anahtara gelen güncellemeler alan bazında birleştirilir (son yazan kazanır)
+    - max_pending anahtara ulaşılınca interval beklenmeden yazılır
+    - Yazım row_errors türünde bir hatayla başarısız olursa batch ikiye
+      bölünerek yeniden denenir; hatayı tek başına veren satırların deneme
+      sayısı artar ve max_retries aşılınca yalnızca onlar atılır
+    - Diğer hatalarda (ör. bağlantı kesik) batch olduğu gibi geri konur,
+      deneme sayıları artmaz
+    """
+
+    def __init__(self, write, interval=0.25, max_pending=10000, max_retries=5,
+                 row_errors=(IntegrityError, DataError)):
+        self.write = write
+        self.interval = interval
+        self.max_pending = max_pending
+        self.max_retries = max_retries
+        self.row_errors = row_errors
+
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = {}
+        self._retries = {}
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+        self.updates = 0
+        self.coalesced = 0
+        self.flushed_rows = 0
+        self.batches = 0
+        self.errors = 0
+        self.splits = 0
+        self.dropped = 0
+
+    @classmethod
+    def from_env(cls, write):
+        """Ayarları ortam değişkenlerinden oku"""
+        return cls(
+            write,
+            interval=int(os.getenv('PROGRESS_FLUSH_MS', 250)) / 1000,
+            max_pending=int(os.getenv('PROGRESS_MAX_PENDING', 10000)),
+            max_retries=int(os.getenv('PROGRESS_MAX_RETRIES', 5))
+        )
+
+    def start(self):
+        """Yazıcı thread'ini başlat; süreç kapanırken bekleyenler yazılır"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='progress-writer', daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+        return self
+
+    def update(self, user_id, figure_id, columns):
+        """Güncellemeyi tampona ekle; veritabanına bir sonraki yazımda gider"""
+        key = (user_id, figure_id)
+        with self._lock:
+            self.updates += 1
+            pending = self._pending.get(key)
+            if pending is None:
+                self._pending[key] = dict(columns)
+            else:
+                self.coalesced += 1
+                pending.update(columns)
+            full = len(self._pending) >= self.max_pending
+        if full:
+            self._wake.set()
+
+    def pending(self, user_id, figure_id):
+        """Henüz yazılmamış alanlar (okumada veritabanı değerinin üzerine konur)"""
+        with self._lock:
+            return dict(self._pending.get((user_id, figure_id), {}))
+
+    def flush(self):
+        """Bekleyen güncellemeleri tek seferde yaz; yazılan satır sayısını döndür"""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+            if not batch:
+                return 0
+
+            started = time.perf_counter()
+            try:
+                written, failed = self._write(batch)
+            except Exception as e:
+                # Satırlarla ilgisiz hata: hepsi geri konur, deneme sayılmaz
+                self._restore(batch, count_retry=False)
+                self.errors += 1
+                PROGRESS_FLUSH_ERRORS.inc()
+                print(f"❌ İlerleme yazılamadı ({len(batch)} kayıt): {e}")
+                return 0
+
+            PROGRESS_FLUSH_SECONDS.observe(time.perf_counter() - started)
+            PROGRESS_FLUSHED_ROWS.inc(written)
+            if failed:
+                self._restore({key: columns for key, (columns, _) in failed.items()})
+                self.errors += 1
+                PROGRESS_FLUSH_ERRORS.inc()
+                print(f"❌ İlerleme yazılamadı ({len(failed)}/{len(batch)} kayıt): {next(iter(failed.values()))[1]}")
+            with self._lock:
+                for key in batch:
+                    if key not in failed:
+                        self._retries.pop(key, None)
+                self.flushed_rows += written
+                self.batches += 1
+            return written
+
+    def _write(self, batch):
+        """batch'i yaz; satır hatasında ikiye bölerek dene
+
+        (yazılan satır sayısı, {anahtar: (sütunlar, hata)}) döndürür; yalnızca
+        tek başına yazıldığında da hata veren satırlar başarısız sayılır.
+        """
+        try:
+            return self.write(batch), {}
+        except self.row_errors as e:
+            if len(batch) == 1:
+                key, columns = next(iter(batch.items()))
+                return 0, {key: (columns, e)}
+        items = list(batch.items())
+        middle = len(items) // 2
+        with self._lock:
+            self.splits += 1
+        written, failed = self._write(dict(items[:middle]))
+        more, more_failed = self._write(dict(items[middle:]))
+        failed.update(more_failed)
+        return written + more, failed
+
+    def _restore(self, batch, count_retry=True):
+        """Yazılamayan kayıtları, arada gelen yeni güncellemelerin altına geri koy"""
+        with self._lock:
+            for key, columns in batch.items():
+                if count_retry:
+                    retries = self._retries.get(key, 0) + 1
+                    if retries > self.max_retries:
+                        self._retries.pop(key, None)
+                        self.dropped += 1
+                        continue
+                    self._retries[key] = retries
+                self._pending[key] = dict(columns, **self._pending.get(key, {}))
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self.flush()
+
+    def close(self):
+        """Thread'i durdur ve kalanları yaz"""
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=10)
+        self.flush()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "pending": len(self._pending),
+                "updates": self.updates,
+                "coalesced": self.coalesced,
+                "flushed_rows": self.flushed_rows,
+                "batches": self.batches,
+                "errors": self.errors,
+                "splits": self.splits,
+                "dropped": self.dropped,
+                "interval_ms": int(self.interval * 1000)
+            }
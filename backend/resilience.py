@@ -0,0 +1,234 @@
+"""Model sunucusu yavaşladığında kuyruk gecikmesini sınırlayan yardımcılar
+
+- CircuitBreaker: hata oranı eşiği aşılınca çağrıları bir süre hiç yapmadan
+  hızlıca reddeder.
+- LatencyTracker: son çağrıların yüzdelik gecikmeleri.
+- race_streams: akışı süre sınırıyla okur; birincil akış gecikirse ikinci bir
+  kaynağa yedek (hedged) istek gönderip ilk yanıt vereni kullanır.
+"""
+import queue
+import threading
+import time
+from collections import deque
+
+
+class DeadlineExceeded(Exception):
+    """Çağrı kendisine verilen süre içinde tamamlanmadı"""
+
+
+class CircuitOpen(Exception):
+    """Devre kesici açık; çağrı yapılmadan reddedildi"""
+
+
+def percentile(values, q):
+    """Sıralı olmayan listeden yüzdelik değer (en yakın sıra yöntemi)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+class LatencyTracker:
+    """Son window çağrının gecikme penceresi"""
+
+    def __init__(self, window=100):
+        self._lock = threading.Lock()
+        self._values = deque(maxlen=window)
+
+    def record(self, seconds):
+        with self._lock:
+            self._values.append(seconds)
+
+    def percentile(self, q):
+        with self._lock:
+            return percentile(self._values, q)
+
+    def __len__(self):
+        return len(self._values)
+
+
+class CircuitBreaker:
+    """closed -> open -> half_open durumlu devre kesici
+
+    Son window çağrıda en az min_calls sonuç varken hata oranı failure_rate'i
+    aşarsa devre açılır ve reset_timeout saniye boyunca çağrılar CircuitOpen
+    ile reddedilir. Süre dolunca tek bir deneme çağrısına izin verilir;
+    başarılı olursa devre kapanır, olmazsa yeniden açılır.
+    """
+
+    def __init__(self, name, failure_rate=0.5, window=20, min_calls=5, reset_timeout=30):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.reset_timeout = reset_timeout
+
+        self._lock = threading.Lock()
+        self._outcomes = deque(maxlen=window)
+        self._opened_at = None
+        self._trial = False
+
+        self.rejected = 0
+        self.opened = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state(time.monotonic())
+
+    def _state(self, now):
+        if self._opened_at is None:
+            return 'closed'
+        if now - self._opened_at >= self.reset_timeout:
+            return 'half_open'
+        return 'open'
+
+    def allow(self):
+        """Çağrı yapılabilirse True; açıkken veya deneme sürerken CircuitOpen fırlatır"""
+        with self._lock:
+            state = self._state(time.monotonic())
+            if state == 'closed':
+                return True
+            if state == 'half_open' and not self._trial:
+                self._trial = True
+                return True
+            self.rejected += 1
+        raise CircuitOpen(f"{self.name} devre kesicisi açık")
+
+    def abandon(self):
+        """Sonucu bilinmeden bırakılan çağrı; deneme hakkını geri ver"""
+        with self._lock:
+            self._trial = False
+
+    def record_success(self):
+        with self._lock:
+            self._outcomes.append(True)
+            if self._opened_at is not None and self._trial:
+                # Deneme çağrısı başarılı: pencereyi sıfırlayıp devreyi kapat.
+                # Devre açılmadan önce başlamış çağrıların başarısı durumu
+                # değiştirmez.
+                self._opened_at = None
+                self._trial = False
+                self._outcomes.clear()
+
+    def record_failure(self):
+        with self._lock:
+            now = time.monotonic()
+            self._outcomes.append(False)
+            if self._opened_at is not None:
+                if self._trial:
+                    # Deneme çağrısı başarısız: süreyi baştan başlat
+                    self._opened_at = now
+                    self._trial = False
+                return
+            failures = self._outcomes.count(False)
+            if len(self._outcomes) >= self.min_calls and failures / len(self._outcomes) > self.failure_rate:
+                self._opened_at = now
+                self.opened += 1
+                print(f"⚠️ {self.name} devre kesicisi açıldı (hata oranı {failures}/{len(self._outcomes)})")
+
+    def stats(self):
+        with self._lock:
+            outcomes = len(self._outcomes)
+            return {
+                "state": self._state(time.monotonic()),
+                "error_rate": self._outcomes.count(False) / outcomes if outcomes else 0.0,
+                "opened": self.opened,
+                "rejected": self.rejected
+            }
+
+
+def _pump(index, stream, events, cancelled):
+    """Akışı ayrı thread'de okuyup olayları ortak kuyruğa aktar"""
+    iterator = stream()
+    try:
+        for delta in iterator:
+            if cancelled.is_set():
+                return
+            events.put((index, 'delta', delta))
+        events.put((index, 'end', None))
+    except Exception as e:
+        events.put((index, 'error', e))
+    finally:
+        close = getattr(iterator, 'close', None)
+        if close:
+            close()
+
+
+def race_streams(primary, hedge=None, hedge_after=None, deadline=None, on_first=None, on_hedge=None):
+    """primary() akışını süre sınırıyla oku, gerekirse hedge() ile yarıştır
+
+    - primary ilk parçasını hedge_after saniye içinde vermezse (veya o ana
+      kadar hata verirse) hedge başlatılır; ilk parçayı veren akış kazanır,
+      diğerinin parçaları yok sayılır.
+    - deadline (saniye) dolunca DeadlineExceeded fırlatılır. Takılan okuma
+      thread'i kendi zaman aşımına kadar arka planda kalır, ama çağıran
+      beklemez.
+    - on_first(index, seconds) kazanan akışın ilk parça süresiyle çağrılır
+      (0: primary, 1: hedge); on_hedge() yedek istek gönderilince çağrılır.
+    """
+    started = time.monotonic()
+    expires = started + deadline if deadline else None
+    events = queue.Queue()
+    cancelled = threading.Event()
+    streams = [primary, hedge]
+    running = set()
+    errors = []
+    winner = None
+
+    def start(index):
+        if index == 1 and on_hedge:
+            on_hedge()
+        running.add(index)
+        threading.Thread(
+            target=_pump, args=(index, streams[index], events, cancelled),
+            name=f'stream-race-{index}', daemon=True
+        ).start()
+
+    start(0)
+    hedged = hedge is None
+    try:
+        while True:
+            now = time.monotonic()
+            timeouts = []
+            if expires is not None:
+                timeouts.append(expires - now)
+            if not hedged and winner is None and hedge_after is not None:
+                timeouts.append(started + hedge_after - now)
+            timeout = max(0.0, min(timeouts)) if timeouts else None
+
+            try:
+                index, kind, value = events.get(timeout=timeout)
+            except queue.Empty:
+                if expires is not None and time.monotonic() >= expires:
+                    raise DeadlineExceeded(f"{deadline:.1f} saniyelik süre doldu")
+                # Birincil akış geç kaldı: yedek isteği gönder
+                hedged = True
+                start(1)
+                continue
+
+            if winner is not None and index != winner:
+                continue
+
+            if kind == 'delta':
+                if winner is None:
+                    winner = index
+                    if on_first:
+                        on_first(index, time.monotonic() - started)
+                yield value
+            elif kind == 'end':
+                if winner is None and on_first:
+                    on_first(index, time.monotonic() - started)
+                return
+            else:
+                running.discard(index)
+                if winner is not None:
+                    raise value
+                errors.append(value)
+                if not hedged:
+                    hedged = True
+                    start(1)
+                elif not running:
+                    raise errors[-1]
+    finally:
+        cancelled.set()
@@ -0,0 +1,64 @@
+"""Sohbet yanıtlarını parça parça (streaming) göndermek için ortak yardımcılar"""
+import json
+import time
+from contextlib import contextmanager
+
+from flask import Response, stream_with_context
+
+import metrics
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+SSE_MIMETYPE = 'text/event-stream'
+
+SERIALIZATION_SECONDS = metrics.histogram(
+    'serialization_seconds', 'Yanıtların ve akış olaylarının JSON olarak biçimlendirilme süresi', ['format'],
+    buckets=(0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05)
+)
+
+
+def wants_stream(request, data):
+    """İstemci akış modunda yanıt istiyor mu?"""
+    if data.get('stream'):
+        return True
+    accept = request.headers.get('Accept', '')
+    return NDJSON_MIMETYPE in accept or SSE_MIMETYPE in accept
+
+
+def wants_sse(request):
+    """İstemci Server-Sent Events formatını mı tercih ediyor?"""
+    return SSE_MIMETYPE in request.headers.get('Accept', '')
+
+
+@contextmanager
+def serialize_phase(timer):
+    """jsonify süresini isteğin serialize aşamasına ve serialization_seconds{format="json"} histogramına yaz"""
+    with timer.phase('serialize'), SERIALIZATION_SECONDS.time(format='json'):
+        yield
+
+
+def format_event(event, payload, sse=False):
+    """Tek bir olayı NDJSON satırı veya SSE bloğu olarak biçimlendir"""
+    started = time.perf_counter()
+    body = json.dumps(dict(payload, type=event), ensure_ascii=False)
+    formatted = f"event: {event}\ndata: {body}\n\n" if sse else body + "\n"
+    SERIALIZATION_SECONDS.observe(time.perf_counter() - started, format='sse' if sse else 'ndjson')
+    return formatted
+
+
+def stream_response(events, sse=False):
+    """(olay, veri) çiftleri üreten bir generator'ı HTTP akışına çevir
+
+    Ara katmanların (nginx vb.) yanıtı biriktirmemesi için tamponlama kapatılır.
+    """
+    def generate():
+        for event, payload in events:
+            yield format_event(event, payload, sse)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype=SSE_MIMETYPE if sse else NDJSON_MIMETYPE,
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        }
+    )
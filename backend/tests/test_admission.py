@@ -0,0 +1,50 @@
+"""GenerationPool: sınırlı eş zamanlılık, sınırlı kuyruk ve Overloaded ile reddetme"""
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from admission import GenerationPool, Overloaded  # noqa: E402
+
+
+def blocking(release):
+    release.wait(5)
+    yield 'bitti'
+
+
+def test_rejects_when_workers_and_queue_are_full():
+    pool = GenerationPool(max_concurrent=1, max_queue=1, poll_interval=0.001)
+    release = threading.Event()
+    running = pool.submit(blocking(release))
+    while not running.started:
+        time.sleep(0.001)
+    queued = pool.submit(blocking(release))
+
+    assert queued.position == 1
+    with pytest.raises(Overloaded) as excinfo:
+        pool.submit(blocking(release))
+    assert excinfo.value.retry_after >= 1
+    assert pool.stats()['rejected'] == 1
+
+    release.set()
+    assert list(running.results()) == ['bitti']
+    assert list(queued.results()) == ['bitti']
+    # Kuyruk boşalınca yeni işler kabul edilir
+    while pool.stats()['active']:
+        time.sleep(0.001)
+    assert pool.call(lambda: 42) == 42
+
+
+def test_call_returns_result_and_propagates_errors():
+    pool = GenerationPool(max_concurrent=2, max_queue=0, poll_interval=0.001)
+
+    def fail():
+        raise ValueError('bozuk')
+
+    assert pool.call(lambda: 'tamam') == 'tamam'
+    with pytest.raises(ValueError):
+        pool.call(fail)
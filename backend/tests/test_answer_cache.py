@@ -0,0 +1,68 @@
+"""AnswerCache: soru normalizasyonu, anahtar alanları, TTL/LRU ve hangi yanıtların saklandığı"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from answer_cache import AnswerCache, answer_key, normalize_message  # noqa: E402
+
+SAMPLING = {"temperature": 0.7}
+
+
+class Routed:
+    """llm_backends.RoutedAnswer gibi modeli ve önbelleğe alınabilirliği bildiren akış"""
+
+    def __init__(self, parts, model, cacheable=True):
+        self.parts = parts
+        self.model = model
+        self.cacheable = cacheable
+
+    def __iter__(self):
+        return iter(self.parts)
+
+
+def test_normalization_follows_turkish_rules():
+    assert normalize_message("  İSTANBUL'U   nasıl fethettin?! ") == 'istanbulu nasıl fethettin'
+    assert normalize_message('IŞIK') == 'ışık'
+    assert normalize_message('Hâlâ   orada mı?') == normalize_message('hala orada mı')
+
+
+def test_key_separates_model_sampling_and_history():
+    key = answer_key('fatih', 'Merhaba!', 'gpt', SAMPLING)
+    assert key == answer_key('fatih', 'merhaba', 'gpt', {"temperature": 0.7})
+    assert key != answer_key('fatih', 'merhaba', 'llama', SAMPLING)
+    assert key != answer_key('fatih', 'merhaba', 'gpt', {"temperature": 0.9})
+    assert key != answer_key('fatih', 'merhaba', 'gpt', SAMPLING, [{"role": "user", "content": "selam"}])
+    assert key != answer_key('ataturk', 'merhaba', 'gpt', SAMPLING)
+
+
+def test_ttl_and_lru_eviction():
+    cache = AnswerCache(max_entries=2, ttl=0.05)
+    cache.put('a', 'A')
+    cache.put('b', 'B')
+    cache.get('a')
+    cache.put('c', 'C')
+    assert cache.get('b') is None
+    assert cache.get('a') == 'A'
+
+    time.sleep(0.06)
+    assert cache.get('c') is None
+    assert cache.stats()['expirations'] == 1
+
+
+def test_only_complete_answers_from_the_keyed_model_are_stored():
+    cache = AnswerCache()
+    figure = {}
+
+    def ask(produce):
+        answer = cache.stream('fatih', figure, 'Merhaba', 'gpt', SAMPLING, produce)
+        return ''.join(answer), answer.cached
+
+    assert ask(lambda: Routed(['Yedek ', 'yanıt'], model='stub', cacheable=False)) == ('Yedek yanıt', False)
+    assert ask(lambda: Routed(['Başka ', 'model'], model='llama')) == ('Başka model', False)
+    assert ask(lambda: Routed(['Asıl ', 'yanıt'], model='gpt')) == ('Asıl yanıt', False)
+    assert ask(lambda: Routed(['yeniden üretilmemeli'], model='gpt')) == ('Asıl yanıt', True)
+
+    # Figür bazında kapatılabilir
+    assert not cache.enabled_for('fatih', {"cache_answers": False})
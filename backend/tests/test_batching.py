@@ -0,0 +1,53 @@
+"""BatchScheduler: pencere içindeki istekler gruplarına göre tek batch'te çalışır"""
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batching import BatchScheduler  # noqa: E402
+
+
+class Recorder:
+    def __init__(self, fail=False):
+        self.batches = []
+        self.lock = threading.Lock()
+        self.fail = fail
+
+    def __call__(self, items):
+        with self.lock:
+            self.batches.append(list(items))
+        if self.fail:
+            raise RuntimeError('model hatası')
+        return [item * 10 for item in items]
+
+
+def test_concurrent_requests_share_a_batch_in_order():
+    run_batch = Recorder()
+    scheduler = BatchScheduler(run_batch, max_batch_size=8, max_wait=0.2)
+    futures = [scheduler.submit(i) for i in range(5)]
+
+    assert [future.result(5) for future in futures] == [0, 10, 20, 30, 40]
+    assert run_batch.batches == [[0, 1, 2, 3, 4]]
+    assert scheduler.stats()['avg_batch_size'] == 5
+
+
+def test_batch_size_and_groups_are_respected():
+    run_batch = Recorder()
+    scheduler = BatchScheduler(run_batch, max_batch_size=2, max_wait=0.2)
+    futures = [scheduler.submit(i, group=i % 2) for i in range(4)]
+
+    assert [future.result(5) for future in futures] == [0, 10, 20, 30]
+    assert all(len(batch) <= 2 for batch in run_batch.batches)
+    for batch in run_batch.batches:
+        assert len({item % 2 for item in batch}) == 1
+
+
+def test_batch_error_reaches_every_request():
+    scheduler = BatchScheduler(Recorder(fail=True), max_wait=0.1)
+    futures = [scheduler.submit(i) for i in range(3)]
+    for future in futures:
+        with pytest.raises(RuntimeError):
+            future.result(5)
@@ -0,0 +1,86 @@
+"""ConversationStore: bütçe ve özet, eş zamanlı özetler, sahip ayrımı ve tahliye"""
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from conversation import ConversationStore  # noqa: E402
+
+
+def count_words(text):
+    return len(text.split())
+
+
+def test_summary_counts_against_token_budget():
+    # Turlar 4 kelime, bütçe 12; özet düşen her tur için 3 kelime büyür
+    store = ConversationStore(
+        max_turns=10, token_budget=12, summary_budget=100, count_tokens=count_words,
+        summarize=lambda summary, turns, figure_name: ' '.join([summary] + ['özet özet özet'] * len(turns)).strip()
+    )
+    for i in range(5):
+        store.record('u', 'f', 'Figür', f"soru {i}", f"yanıt {i}")
+
+    session = store._sessions[('u', 'f')]
+    assert store._session_tokens(session) <= store.token_budget or len(session.turns) == 1
+    assert store.summarized_turns + len(session.turns) == 5
+
+
+def test_concurrent_summaries_are_merged():
+    release = threading.Event()
+    blocked = threading.Event()
+
+    def summarize(summary, turns, figure_name):
+        if threading.current_thread().name == 'slow' and not blocked.is_set():
+            blocked.set()
+            release.wait(5)
+        return '\n'.join(filter(None, [summary] + [turn.user for turn in turns]))
+
+    store = ConversationStore(max_turns=2, token_budget=1000, count_tokens=count_words, summarize=summarize)
+    store.record('u', 'f', 'Figür', 'bir', 'yanıt')
+    store.record('u', 'f', 'Figür', 'iki', 'yanıt')
+
+    # 'bir' düşer ve özetleme kilit dışında bekler
+    slow = threading.Thread(target=store.record, args=('u', 'f', 'Figür', 'üç', 'yanıt'), name='slow')
+    slow.start()
+    assert blocked.wait(5)
+    # Bu arada 'iki' düşüp özete yazılır
+    store.record('u', 'f', 'Figür', 'dört', 'yanıt')
+    release.set()
+    slow.join(5)
+
+    summary = store._sessions[('u', 'f')].summary
+    assert set(summary.split('\n')) == {'bir', 'iki'}
+    assert store.summarized_turns == 2
+
+
+def test_history_includes_summary_and_is_isolated_per_owner():
+    store = ConversationStore(max_turns=1, count_tokens=count_words)
+    alice, bob = ('alice', 'default'), ('bob', 'default')
+    store.record(alice, 'f', 'Figür', 'İlk soru.', 'İlk yanıt.')
+    store.record(alice, 'f', 'Figür', 'İkinci soru', 'İkinci yanıt')
+
+    history = store.history(alice, 'f')
+    assert history[0]['role'] == 'system' and 'İlk soru.' in history[0]['content']
+    assert history[1:] == [
+        {"role": "user", "content": "İkinci soru"},
+        {"role": "assistant", "content": "İkinci yanıt"},
+    ]
+    assert store.history(bob, 'f') == []
+    assert store.history(None, 'f') == []
+
+    store.clear(alice, 'f')
+    assert store.history(alice, 'f') == []
+
+
+def test_idle_and_capacity_eviction():
+    store = ConversationStore(max_sessions=2, idle_ttl=0.05, count_tokens=count_words)
+    for owner in ('a', 'b', 'c'):
+        store.record(owner, 'f', 'Figür', 'soru', 'yanıt')
+    assert store.history('a', 'f') == []
+    assert store.stats()['evicted_capacity'] == 1
+
+    time.sleep(0.06)
+    assert store.stats()['sessions'] == 0
+    assert store.stats()['evicted_idle'] == 2
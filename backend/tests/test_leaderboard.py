@@ -0,0 +1,79 @@
+"""Skip list sıra/konum işlemleri, tablo sıralaması ve yeniden kurulumda güncellemelerin yeniden uygulanması"""
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from leaderboard import IndexableSkipList, Leaderboard, LeaderboardIndex  # noqa: E402
+
+
+def test_skiplist_matches_sorted_list():
+    rng = random.Random(7)
+    skiplist = IndexableSkipList(seed=7)
+    reference = []
+    for _ in range(2000):
+        key = rng.randrange(500)
+        if key in reference:
+            skiplist.remove(key)
+            reference.remove(key)
+        else:
+            skiplist.insert(key)
+            reference.append(key)
+            reference.sort()
+
+    assert len(skiplist) == len(reference)
+    assert skiplist.slice(0, len(reference)) == reference
+    for position in (0, len(reference) // 2, len(reference) - 1):
+        assert skiplist.rank(reference[position]) == position
+        assert skiplist.slice(position, 3) == reference[position:position + 3]
+    assert skiplist.rank(-1) is None
+    assert skiplist.slice(len(reference), 5) == []
+
+
+def test_leaderboard_rank_and_top():
+    board = Leaderboard()
+    for member, score in (('ali', 50), ('ayşe', 80), ('can', 50), ('deniz', 10)):
+        board.update(member, score)
+    board.update('deniz', 90)
+
+    # Yüksek puan önde, eşitlikte üye kimliği sırası
+    assert board.top(3) == [(1, 'deniz', 90), (2, 'ayşe', 80), (3, 'ali', 50)]
+    assert board.top(2, offset=2) == [(3, 'ali', 50), (4, 'can', 50)]
+    assert board.rank('can') == (4, 50)
+    board.remove('ayşe')
+    assert board.rank('can') == (3, 50)
+    assert board.rank('ayşe') is None
+
+
+def test_class_change_moves_member():
+    index = LeaderboardIndex()
+    index.update_user(1, 100, '9A', {"username": "ali"})
+    index.update_user(1, 120, '9B')
+
+    assert index.standings('class:9A')['total'] == 0
+    standings = index.standings('class:9B', member=1)
+    assert standings['entries'][0]['username'] == 'ali'
+    assert standings['me'] == {"rank": 1, "score": 120}
+
+
+def test_reconcile_replays_updates_made_during_load():
+    index = LeaderboardIndex()
+    index.update_user(1, 10)
+    index.update_user(2, 999)  # veritabanında 20; bellekte kaymış
+
+    def load():
+        # Kurulum sürerken gelen güncellemeler yeni tablolara da uygulanmalı
+        index.update_user(3, 300)
+        index.update_figure(1, 'fatih', 40)
+        users = [(1, 10, None, {}), (2, 20, None, {})]
+        figures = [(2, 'fatih', 5)]
+        return users, figures
+
+    drift = index.reconcile(load)
+
+    assert drift == 1
+    assert [entry['userId'] for entry in index.standings('global')['entries']] == ['3', '2', '1']
+    assert index.standings('global', member=2)['me'] == {"rank": 2, "score": 20}
+    assert index.standings('figure:fatih')['entries'][0]['userId'] == '1'
+    assert index.stats()['reconciles'] == 1
@@ -0,0 +1,76 @@
+"""ModelManager: tek uçuşlu yükleme, çift tamponlu değiştirme ve eski modelin serbest bırakılması"""
+import os
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from model_manager import ModelManager, ModelNotReady  # noqa: E402
+
+
+class Loader:
+    def __init__(self, fail=()):
+        self.calls = []
+        self.gate = threading.Event()
+        self.gate.set()
+        self.fail = set(fail)
+
+    def __call__(self, name):
+        self.calls.append(name)
+        self.gate.wait(5)
+        if name in self.fail:
+            raise RuntimeError(f"{name} yüklenemedi")
+        return SimpleNamespace(name=name)
+
+
+def test_concurrent_waiters_share_one_load():
+    loader = Loader()
+    loader.gate.clear()
+    manager = ModelManager(loader, 'küçük')
+    waiters = [threading.Thread(target=manager.wait_ready, args=(5,)) for _ in range(5)]
+    for waiter in waiters:
+        waiter.start()
+    while manager.loading is None:
+        time.sleep(0.001)
+    assert manager.state == 'loading'
+    loader.gate.set()
+    for waiter in waiters:
+        waiter.join(5)
+
+    assert loader.calls == ['küçük']
+    assert manager.state == 'ready'
+
+
+def test_swap_releases_old_model_after_last_request():
+    loader = Loader()
+    released = []
+    manager = ModelManager(loader, 'eski', release=lambda bundle: released.append(bundle.name))
+    assert manager.wait_ready(5)
+
+    with manager.acquire(5) as bundle:
+        assert manager.start_loading('yeni')
+        while manager.loading:
+            time.sleep(0.001)
+        # Yeni model devrede, eskisi süren istek bitene kadar tutulur
+        assert manager.current_name == 'yeni'
+        assert bundle.name == 'eski'
+        assert released == []
+        assert manager.health()['draining_models'] == ['eski']
+
+    assert released == ['eski']
+    assert manager.health()['draining_models'] == []
+
+
+def test_fallback_model_and_not_ready():
+    manager = ModelManager(Loader(fail={'büyük'}), 'büyük', fallback_name='küçük')
+    assert manager.wait_ready(5)
+    assert manager.current_name == 'küçük'
+
+    broken = ModelManager(Loader(fail={'büyük'}), 'büyük')
+    with pytest.raises(ModelNotReady):
+        with broken.acquire(0.2):
+            pass
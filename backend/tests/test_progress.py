@@ -0,0 +1,72 @@
+"""ProgressBuffer: hatalı satır aynı batch'teki geçerli güncellemeleri düşürmemeli"""
+import os
+import sys
+
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from progress import ProgressBuffer  # noqa: E402
+
+BAD_USER = 404
+
+
+class FakeStore:
+    """Silinmiş kullanıcının satırını yabancı anahtar hatasıyla reddeden yazıcı"""
+
+    def __init__(self):
+        self.rows = {}
+        self.calls = 0
+        self.down = False
+
+    def write(self, batch):
+        self.calls += 1
+        if self.down:
+            raise OperationalError('UPDATE progress', {}, Exception('bağlantı yok'))
+        if any(user_id == BAD_USER for user_id, _ in batch):
+            raise IntegrityError('INSERT INTO progress', {}, Exception('FOREIGN KEY constraint failed'))
+        for key, columns in batch.items():
+            self.rows.setdefault(key, {}).update(columns)
+        return len(batch)
+
+
+def test_bad_row_does_not_drop_good_rows():
+    store = FakeStore()
+    buffer = ProgressBuffer(store.write, max_retries=2)
+    good = [(user_id, 'ataturk') for user_id in range(1, 8)]
+    for user_id, figure_id in good:
+        buffer.update(user_id, figure_id, {'experience': user_id * 10})
+    buffer.update(BAD_USER, 'ataturk', {'experience': 5})
+
+    assert buffer.flush() == len(good)
+    assert store.rows == {key: {'experience': key[0] * 10} for key in good}
+    assert buffer.pending(BAD_USER, 'ataturk') == {'experience': 5}
+
+    # Sonraki yazımlarda geçerli güncellemeler hatalı satırla birlikte beklemez
+    buffer.update(1, 'ataturk', {'experience': 99})
+    for _ in range(2):
+        buffer.flush()
+    assert store.rows[(1, 'ataturk')] == {'experience': 99}
+
+    stats = buffer.stats()
+    assert stats['dropped'] == 1
+    assert stats['pending'] == 0
+    assert stats['flushed_rows'] == len(good) + 1
+
+
+def test_connection_error_keeps_batch_without_counting_retries():
+    store = FakeStore()
+    buffer = ProgressBuffer(store.write, max_retries=1)
+    buffer.update(1, 'napoleon', {'experience': 10})
+    buffer.update(2, 'napoleon', {'experience': 20})
+
+    store.down = True
+    for _ in range(3):
+        assert buffer.flush() == 0
+    # Bağlantı hatasında batch bölünmez ve hiçbir kayıt atılmaz
+    assert store.calls == 3
+    assert buffer.stats()['dropped'] == 0
+
+    store.down = False
+    assert buffer.flush() == 2
+    assert store.rows == {(1, 'napoleon'): {'experience': 10}, (2, 'napoleon'): {'experience': 20}}
@@ -0,0 +1,87 @@
+"""Devre kesici durumları ve race_streams ile yedek (hedged) istek"""
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from resilience import CircuitBreaker, CircuitOpen, DeadlineExceeded, race_streams  # noqa: E402
+
+
+def open_breaker(reset_timeout=0.05):
+    breaker = CircuitBreaker('test', failure_rate=0.5, window=4, min_calls=2, reset_timeout=reset_timeout)
+    for _ in range(2):
+        breaker.allow()
+        breaker.record_failure()
+    assert breaker.state == 'open'
+    return breaker
+
+
+def test_breaker_rejects_while_open_and_allows_one_trial():
+    breaker = open_breaker()
+    with pytest.raises(CircuitOpen):
+        breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.state == 'half_open'
+    assert breaker.allow() is True
+    # Deneme sürerken başka çağrıya izin verilmez
+    with pytest.raises(CircuitOpen):
+        breaker.allow()
+    breaker.record_success()
+    assert breaker.state == 'closed'
+
+
+def test_breaker_reopens_when_trial_fails():
+    breaker = open_breaker()
+    time.sleep(0.06)
+    breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == 'open'
+
+
+def test_stale_results_do_not_change_open_breaker():
+    breaker = open_breaker()
+    # Devre açılmadan önce başlamış çağrıların sonuçları
+    breaker.record_success()
+    assert breaker.state == 'open'
+    time.sleep(0.06)
+    breaker.record_failure()
+    assert breaker.state == 'half_open'
+    assert breaker.allow() is True
+
+
+def slow_stream(delay, parts):
+    def stream():
+        time.sleep(delay)
+        yield from parts
+    return stream
+
+
+def failing_stream():
+    raise RuntimeError('bağlantı hatası')
+    yield
+
+
+def test_hedge_wins_when_primary_is_late():
+    hedged = []
+    firsts = []
+    result = list(race_streams(
+        slow_stream(0.5, ['yavaş']), slow_stream(0, ['hızlı', ' yanıt']), hedge_after=0.02,
+        on_first=lambda index, seconds: firsts.append(index), on_hedge=lambda: hedged.append(True)
+    ))
+    assert result == ['hızlı', ' yanıt']
+    assert hedged == [True]
+    assert firsts == [1]
+
+
+def test_primary_error_starts_hedge_immediately():
+    result = list(race_streams(failing_stream, slow_stream(0, ['yedek']), hedge_after=10))
+    assert result == ['yedek']
+
+
+def test_deadline_exceeded():
+    with pytest.raises(DeadlineExceeded):
+        list(race_streams(slow_stream(0.5, ['geç']), deadline=0.05))
@@ -0,0 +1,48 @@
+"""TTSCache: içerik adresli anahtar, bellek LRU'su ve boyut sınırlı disk katmanı"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tts_cache import TTSCache  # noqa: E402
+
+
+def test_key_depends_on_every_field():
+    key = TTSCache.make_key('Merhaba', 'tr', False, 'gtts')
+    assert key == TTSCache.make_key('Merhaba', 'tr', 0, 'gtts')
+    assert len({
+        key,
+        TTSCache.make_key('Merhaba', 'en', False, 'gtts'),
+        TTSCache.make_key('Merhaba', 'tr', True, 'gtts'),
+        TTSCache.make_key('Merhaba', 'tr', False, 'espeak'),
+        TTSCache.make_key('merhaba', 'tr', False, 'gtts'),
+    }) == 5
+
+
+def test_memory_lru_falls_back_to_disk(tmp_path):
+    cache = TTSCache(directory=str(tmp_path), memory_items=2)
+    for name in ('a', 'b', 'c'):
+        cache.put(name * 4, name.encode() * 10)
+
+    # 'aaaa' bellekten düştü ama diskten okunur
+    assert cache.get('aaaa') == b'a' * 10
+    assert cache.get('cccc') == b'c' * 10
+    assert cache.get('yok') is None
+    stats = cache.stats()
+    assert (stats['memory_hits'], stats['disk_hits'], stats['misses']) == (1, 1, 1)
+    assert stats['memory_items'] == 2
+
+
+def test_disk_limit_evicts_least_recently_used_and_index_survives_restart(tmp_path):
+    cache = TTSCache(directory=str(tmp_path), memory_items=0, disk_bytes=25)
+    cache.put('k1', b'1' * 10)
+    cache.put('k2', b'2' * 10)
+    cache.put('k3', b'3' * 10)
+
+    assert cache.get('k1') is None
+    assert cache.stats()['evictions'] == 1
+    assert not os.path.exists(cache.path('k1'))
+
+    reopened = TTSCache(directory=str(tmp_path), memory_items=0, disk_bytes=25)
+    assert reopened.stats()['disk_items'] == 2
+    assert reopened.get('k3') == b'3' * 10
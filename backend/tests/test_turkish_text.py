@@ -0,0 +1,40 @@
+"""SentenceSplitter: parça parça gelen Türkçe metni doğru yerlerden cümlelere böler"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from turkish_text import SentenceSplitter, turkish_lower  # noqa: E402
+
+
+def split(chunks, min_chars=0):
+    splitter = SentenceSplitter(min_chars=min_chars)
+    sentences = []
+    for chunk in chunks:
+        sentences += splitter.feed(chunk)
+    return sentences + splitter.flush()
+
+
+def test_turkish_lower():
+    assert turkish_lower('IĞDIR İZMİR') == 'ığdır izmir'
+
+
+def test_abbreviations_initials_and_ordinals_do_not_split():
+    text = "Dr. Ahmet geldi. Mustafa K. Atatürk 15. yüzyılı anlattı. Hz. Ömer burada! Bitti mi?"
+    assert split([text]) == [
+        "Dr. Ahmet geldi.",
+        "Mustafa K. Atatürk 15. yüzyılı anlattı.",
+        "Hz. Ömer burada!",
+        "Bitti mi?",
+    ]
+
+
+def test_chunked_input_matches_whole_input():
+    text = "İstanbul 1453'te fethedildi. Ben o zaman 21 yaşındaydım. \"Ya ben İstanbul'u alırım.\" Sonra döndüm."
+    chunks = [text[i:i + 3] for i in range(0, len(text), 3)]
+    assert split(chunks) == split([text])
+    assert len(split([text])) == 4
+
+
+def test_short_sentences_are_merged():
+    assert split(["Evet. Hayır. Bu cümle yeterince uzun."], min_chars=20) == ["Evet. Hayır. Bu cümle yeterince uzun."]
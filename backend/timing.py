@@ -0,0 +1,98 @@
+"""İstek başına aşama süreleri: Server-Timing başlığı ve socket yükleri için
+
+Bir PhaseTimer istek boyunca aşamaların (kuyruk, llm, tts, serialize...)
+sürelerini toplar. Aşamalar farklı thread'lerde ölçülebilir; aynı adlı
+ölçümler toplanır (ör. paralel seslendirilen cümlelerin toplam TTS süresi),
+bu yüzden aşamaların toplamı duvar saatini aşabilir.
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import g
+
+
+class PhaseTimer:
+    """Aşama adı -> saniye"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+        self._phases = {}
+
+    def add(self, name, seconds):
+        with self._lock:
+            self._phases[name] = self._phases.get(name, 0.0) + seconds
+
+    @contextmanager
+    def phase(self, name):
+        """Blok süresini name aşamasına ekle"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+    def wrap(self, name, fn):
+        """Her çağrısı name aşamasına eklenen fn"""
+        def timed(*args, **kwargs):
+            with self.phase(name):
+                return fn(*args, **kwargs)
+        return timed
+
+    def stream(self, name, iterable, first=None):
+        """Akışı okurken toplam süreyi name, ilk parça süresini first aşamasına yaz"""
+        started = time.perf_counter()
+        seen_first = False
+        try:
+            for item in iterable:
+                if first and not seen_first:
+                    seen_first = True
+                    self.add(first, time.perf_counter() - started)
+                yield item
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+    def as_dict(self):
+        """Milisaniye cinsinden aşamalar ve toplam süre (socket yükleri için)"""
+        with self._lock:
+            phases = dict(self._phases)
+        phases['total'] = time.perf_counter() - self.started
+        return {name: round(seconds * 1000, 1) for name, seconds in phases.items()}
+
+    def header(self):
+        """Server-Timing başlık değeri"""
+        return ', '.join(f"{name};dur={ms}" for name, ms in self.as_dict().items())
+
+
+def start_request_timer():
+    """before_request: isteğin zamanlayıcısını başlat"""
+    g.phase_timer = PhaseTimer()
+
+
+def request_timer():
+    """Geçerli HTTP isteğinin zamanlayıcısı"""
+    timer = getattr(g, 'phase_timer', None)
+    if timer is None:
+        timer = g.phase_timer = PhaseTimer()
+    return timer
+
+
+def add_server_timing(response):
+    """after_request: Server-Timing başlığını ekle
+
+    Akış yanıtlarında başlık gövdeden önce gittiği için yalnızca o ana kadarki
+    aşamaları içerir; tam süreler akışın son olayında gönderilir.
+    """
+    timer = getattr(g, 'phase_timer', None)
+    if timer is not None:
+        response.headers['Server-Timing'] = timer.header()
+        # Frontend farklı origin'den çalıştığı için tarayıcının süreleri göstermesine izin ver
+        response.headers['Timing-Allow-Origin'] = '*'
+    return response
+
+
+def init_app(app):
+    """Uygulamanın tüm yanıtlarına Server-Timing ekle"""
+    app.before_request(start_request_timer)
+    app.after_request(add_server_timing)
@@ -0,0 +1,274 @@
+"""Metinden sese (TTS) ortak yardımcıları
+
+Seslendirme takılabilir motorlarla yapılır; her motor MP3 baytları üretir:
+- gtts: Google'ın TTS servisi (ağ gerekir, okul ağlarında engellenebilir)
+- espeak: yerel espeak-ng + pydub/ffmpeg ile MP3; tamamen çevrimdışı
+
+Motor istek bazında seçilir (TTS_ENGINE varsayılan). Seçilen motor hata
+verirse TTS_FALLBACK_ENGINE denenir; her motorun sesi önbellekte kendi
+anahtarıyla saklanır.
+"""
+import functools
+import io
+import os
+import shutil
+import subprocess
+import threading
+import time
+
+from gtts import gTTS
+
+import metrics
+from tts_cache import TTSCache, get_cache
+
+TTS_SECONDS = metrics.histogram('tts_synthesis_seconds', 'Metnin sese çevrilme süresi', ['engine', 'cache'])
+TTS_ERRORS = metrics.counter('tts_errors_total', 'Başarısız seslendirmeler', ['engine'])
+TTS_FALLBACKS = metrics.counter('tts_fallbacks_total', 'Yedek motora düşen seslendirmeler', ['engine', 'fallback'])
+
+
+def default_lang():
+    """TTS_LANGUAGE ortam değişkeni, yoksa Türkçe"""
+    return os.getenv('TTS_LANGUAGE', 'tr')
+
+
+def default_slow():
+    """TTS_SLOW ortam değişkeni"""
+    return os.getenv('TTS_SLOW', 'False').lower() == 'true'
+
+
+class TTSEngine:
+    """Motor arayüzü: synthesize(text, lang, slow) MP3 baytları döndürür"""
+
+    name = None
+
+    def available(self):
+        return True
+
+    def synthesize(self, text, lang, slow):
+        raise NotImplementedError
+
+    def stats(self):
+        return {"name": self.name, "available": self.available()}
+
+
+class GTTSEngine(TTSEngine):
+    """Google TTS; her seslendirme bir ağ isteğidir"""
+
+    name = 'gtts'
+
+    def synthesize(self, text, lang, slow):
+        audio_buffer = io.BytesIO()
+        gTTS(text=text, lang=lang, slow=slow).write_to_fp(audio_buffer)
+        return audio_buffer.getvalue()
+
+
+def wav_to_mp3(wav, bitrate):
+    """WAV baytlarını mono MP3'e çevir (pydub, ffmpeg gerektirir)"""
+    from pydub import AudioSegment
+
+    segment = AudioSegment.from_file(io.BytesIO(wav), format='wav').set_channels(1)
+    out = io.BytesIO()
+    segment.export(out, format='mp3', bitrate=bitrate)
+    return out.getvalue()
+
+
+class EspeakEngine(TTSEngine):
+    """Yerel espeak-ng; ağ gerektirmez
+
+    Her seslendirme ayrı bir espeak-ng süreci (ardından MP3 için ffmpeg)
+    olarak çalışır; aynı anda en fazla workers süreç (varsayılan çekirdek
+    sayısı) açılır, fazlası sıra bekler.
+    """
+
+    name = 'espeak'
+
+    def __init__(self, binary='espeak-ng', rate=160, slow_rate=120, bitrate='48k', workers=None, timeout=60):
+        self.binary = binary
+        self.rate = rate
+        self.slow_rate = slow_rate
+        self.bitrate = bitrate
+        self.workers = workers or os.cpu_count() or 2
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(self.workers)
+
+    @classmethod
+    def from_env(cls):
+        """Ayarları ortam değişkenlerinden oku"""
+        workers = int(os.getenv('TTS_LOCAL_WORKERS', 0))
+        return cls(
+            binary=os.getenv('TTS_ESPEAK_BINARY', 'espeak-ng'),
+            rate=int(os.getenv('TTS_ESPEAK_RATE', 160)),
+            slow_rate=int(os.getenv('TTS_ESPEAK_SLOW_RATE', 120)),
+            bitrate=os.getenv('TTS_LOCAL_BITRATE', '48k'),
+            workers=workers or None
+        )
+
+    def available(self):
+        return shutil.which(self.binary) is not None
+
+    def synthesize(self, text, lang, slow):
+        command = [
+            self.binary, '--stdin', '--stdout',
+            '-v', lang,
+            '-s', str(self.slow_rate if slow else self.rate)
+        ]
+        with self._slots:
+            # Metin stdin'den verilir; '-' ile başlayan metin seçenek sanılmaz
+            result = subprocess.run(
+                command,
+                input=text.encode('utf-8'),
+                capture_output=True,
+                timeout=self.timeout,
+                check=True
+            )
+            return wav_to_mp3(result.stdout, self.bitrate)
+
+    def stats(self):
+        return dict(super().stats(), binary=self.binary, workers=self.workers, bitrate=self.bitrate)
+
+
+ENGINES = {
+    GTTSEngine.name: GTTSEngine(),
+    EspeakEngine.name: EspeakEngine.from_env()
+}
+
+
+def default_engine():
+    """TTS_ENGINE ortam değişkeni, yoksa gtts"""
+    return os.getenv('TTS_ENGINE', GTTSEngine.name)
+
+
+def fallback_engine():
+    """Seçilen motor hata verirse denenecek motor (TTS_FALLBACK_ENGINE, boşsa yok)"""
+    return os.getenv('TTS_FALLBACK_ENGINE', EspeakEngine.name) or None
+
+
+def resolve_engine(name=None):
+    """İstekteki motor adını doğrula; boşsa varsayılan, bilinmiyorsa ValueError"""
+    name = name or default_engine()
+    if name not in ENGINES:
+        raise ValueError(f"Bilinmeyen TTS motoru: {name} (seçenekler: {', '.join(ENGINES)})")
+    return name
+
+
+def engines_info():
+    """/api/tts/engines için motorlar ve varsayılanlar"""
+    return {
+        "default": default_engine(),
+        "fallback": fallback_engine(),
+        "engines": [engine.stats() for engine in ENGINES.values()]
+    }
+
+
+def _synthesize_cached(text, lang, slow, engine):
+    started = time.perf_counter()
+    cache = get_cache()
+    key = TTSCache.make_key(text, lang, slow, engine)
+    audio = cache.get(key)
+    if audio is None:
+        try:
+            audio = ENGINES[engine].synthesize(text, lang, slow)
+        except Exception:
+            TTS_ERRORS.inc(engine=engine)
+            raise
+        cache.put(key, audio)
+        TTS_SECONDS.observe(time.perf_counter() - started, engine=engine, cache='miss')
+    else:
+        TTS_SECONDS.observe(time.perf_counter() - started, engine=engine, cache='hit')
+    return key, audio, engine
+
+
+def synthesize_with_key(text, lang=None, slow=None, engine=None):
+    """Metni sese çevir; (önbellek anahtarı, MP3 baytları, kullanılan motor) döndür
+
+    Aynı metin aynı motorla daha önce seslendirildiyse motora gidilmeden
+    önbellekten okunur. Motor hata verirse yedek motor (kuruluysa) denenir;
+    bu durumda dönen motor yedek motordur.
+    """
+    lang = lang or default_lang()
+    slow = default_slow() if slow is None else slow
+    engine = resolve_engine(engine)
+
+    try:
+        return _synthesize_cached(text, lang, slow, engine)
+    except Exception:
+        fallback = fallback_engine()
+        if not fallback or fallback == engine or fallback not in ENGINES or not ENGINES[fallback].available():
+            raise
+    TTS_FALLBACKS.inc(engine=engine, fallback=fallback)
+    return _synthesize_cached(text, lang, slow, fallback)
+
+
+def synthesizer(engine=None):
+    """text -> (anahtar, ses, motor) fonksiyonu; seslendirme hattına verilmek üzere"""
+    if engine is None:
+        return synthesize_with_key
+    return functools.partial(synthesize_with_key, engine=engine)
+
+
+def synthesize(text, lang=None, slow=None, engine=None):
+    """Metni MP3 baytlarına çevir"""
+    return synthesize_with_key(text, lang, slow, engine)[1]
+
+
+def engines_label(engines):
+    """Sesi üreten motorlar, ilk kullanım sırasıyla virgülle ayrılmış; ses yoksa None"""
+    return ','.join(dict.fromkeys(engine for engine in engines if engine)) or None
+
+
+def strip_id3(data):
+    """Baştaki ID3v2 etiketini at; ardışık parçaların ortasında etiket kalmasın"""
+    if data[:3] == b'ID3' and len(data) >= 10:
+        size = (data[6] & 0x7f) << 21 | (data[7] & 0x7f) << 14 | (data[8] & 0x7f) << 7 | (data[9] & 0x7f)
+        footer = 10 if data[5] & 0x10 else 0
+        return data[10 + size + footer:]
+    return data
+
+
+def mp3_signature(data):
+    """İlk MP3 çerçeve başlığından (sürüm, katman, örnekleme hızı, kanal modu); bulunamazsa None"""
+    data = strip_id3(data)
+    for i in range(min(len(data) - 3, 4096)):
+        if data[i] != 0xFF or data[i + 1] & 0xE0 != 0xE0:
+            continue
+        version, layer = (data[i + 1] >> 3) & 3, (data[i + 1] >> 1) & 3
+        bitrate, rate = data[i + 2] >> 4, (data[i + 2] >> 2) & 3
+        if version != 1 and layer != 0 and bitrate != 15 and rate != 3:
+            return version, layer, rate, data[i + 3] >> 6
+    return None
+
+
+def reencode_mp3(parts):
+    """Farklı biçimlerdeki MP3 parçalarını çözüp tek bir mono MP3 olarak kodla (pydub)"""
+    from pydub import AudioSegment
+
+    segment = AudioSegment.empty()
+    for part in parts:
+        segment += AudioSegment.from_file(io.BytesIO(part), format='mp3').set_channels(1)
+    out = io.BytesIO()
+    segment.export(out, format='mp3', bitrate=os.getenv('TTS_LOCAL_BITRATE', '48k'))
+    return out.getvalue()
+
+
+def store_concat(keys, parts, engines=None):
+    """MP3 parçalarını tek kayıt olarak sakla, anahtarını döndür
+
+    Parçalar aynı motordan ve aynı biçimde (sürüm, örnekleme hızı, kanal)
+    ise baytlar art arda eklenir. Aksi halde (ör. bir cümle yedek motora
+    düştüyse) ham birleştirme çalmayı ve ileri sarmayı bozar; parçalar
+    çözülüp yeniden kodlanır; bu başarısız olursa (ör. ffmpeg yok) None döner.
+    """
+    if len(keys) == 1:
+        return keys[0]
+    key = TTSCache.make_key('|'.join(keys), '', False, 'concat')
+    signatures = {mp3_signature(part) for part in parts}
+    if len(set(engines or [None])) == 1 and len(signatures) == 1 and None not in signatures:
+        audio = parts[0] + b''.join(strip_id3(part) for part in parts[1:])
+    else:
+        try:
+            audio = reencode_mp3(parts)
+        except Exception as e:
+            print(f"❌ Farklı biçimdeki ses parçaları birleştirilemedi: {e}")
+            return None
+    get_cache().put(key, audio)
+    return key
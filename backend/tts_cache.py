@@ -0,0 +1,210 @@
+"""İçerik adresli TTS ses önbelleği: bellek içi LRU + boyut sınırlı disk katmanı"""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'tts')
+
+
+class TTSCache:
+    """Anahtarı (metin, dil, yavaş, motor) özetinden türetilen ses önbelleği
+
+    Sık kullanılan kayıtlar bellekte LRU sırasıyla tutulur, tüm kayıtlar ayrıca
+    diske yazılır. Disk katmanı toplam boyut sınırını aşınca en uzun süredir
+    kullanılmayan dosyalar silinir. Süreç yeniden başladığında disk dizini
+    taranıp dosyaların değiştirilme zamanına göre LRU sırası yeniden kurulur.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, memory_items=256,
+                 memory_bytes=32 * 1024 * 1024, disk_bytes=512 * 1024 * 1024, extension='mp3'):
+        self.directory = directory
+        self.extension = extension
+        self.memory_items = memory_items
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        self._memory_size = 0
+        self._disk = OrderedDict()
+        self._disk_size = 0
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._load_disk_index()
+
+    @classmethod
+    def from_env(cls):
+        """Ayarları ortam değişkenlerinden oku"""
+        return cls(
+            directory=os.getenv('TTS_CACHE_DIR', DEFAULT_CACHE_DIR),
+            memory_items=int(os.getenv('TTS_CACHE_MEMORY_ITEMS', 256)),
+            memory_bytes=int(os.getenv('TTS_CACHE_MEMORY_MB', 32)) * 1024 * 1024,
+            disk_bytes=int(os.getenv('TTS_CACHE_DISK_MB', 512)) * 1024 * 1024
+        )
+
+    @staticmethod
+    def make_key(text, lang, slow, engine):
+        """Ses içeriğini belirleyen alanlardan sabit bir anahtar üret"""
+        raw = json.dumps([text, lang, bool(slow), engine], ensure_ascii=False)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def path(self, key):
+        """Anahtarın disk üzerindeki dosya yolu"""
+        return os.path.join(self.directory, key[:2], f"{key}.{self.extension}")
+
+    def get(self, key):
+        """Kayıt varsa ses baytlarını, yoksa None döndür"""
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return data
+            on_disk = key in self._disk
+
+        if on_disk:
+            try:
+                with open(self.path(key), 'rb') as f:
+                    data = f.read()
+                os.utime(self.path(key))
+            except OSError:
+                data = None
+
+            with self._lock:
+                if data is None:
+                    # Dosya dışarıdan silinmiş
+                    size = self._disk.pop(key, 0)
+                    self._disk_size -= size
+                else:
+                    if key in self._disk:
+                        self._disk.move_to_end(key)
+                    self.disk_hits += 1
+                    self._remember(key, data)
+                    return data
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, data):
+        """Sesi belleğe ve diske yaz"""
+        with self._lock:
+            self._remember(key, data)
+            if key in self._disk:
+                return
+        self._write_disk(key, data)
+
+    def file_path(self, key):
+        """Kayıt diskteyse yolunu döndür; yalnızca bellekteyse önce diske yaz
+
+        Dosyadan sunum, Range ve koşullu istekleri web sunucusunun
+        karşılamasına izin verir. Kayıt hiç yoksa None döner.
+        """
+        path = self.path(key)
+        with self._lock:
+            on_disk = key in self._disk
+            data = self._memory.get(key)
+        if on_disk and os.path.exists(path):
+            return path
+        if data is None:
+            return None
+        return path if self._write_disk(key, data) else None
+
+    def _write_disk(self, key, data):
+        path = self.path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Yarım yazılmış dosya okunmasın diye önce geçici dosyaya yaz
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"TTS önbellek yazma hatası: {e}")
+            return False
+
+        with self._lock:
+            if key not in self._disk:
+                self._disk[key] = len(data)
+                self._disk_size += len(data)
+            self._evict_disk()
+        return True
+
+    def stats(self):
+        """İsabet/ıskalama sayaçları ve doluluk bilgisi"""
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_ratio": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "memory_items": len(self._memory),
+                "memory_bytes": self._memory_size,
+                "disk_items": len(self._disk),
+                "disk_bytes": self._disk_size
+            }
+
+    def _remember(self, key, data):
+        # Kilit altında çağrılır
+        if len(data) > self.memory_bytes:
+            return
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_size -= len(old)
+        self._memory[key] = data
+        self._memory_size += len(data)
+        while len(self._memory) > self.memory_items or self._memory_size > self.memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_size -= len(evicted)
+
+    def _evict_disk(self):
+        # Kilit altında çağrılır
+        while self._disk_size > self.disk_bytes and self._disk:
+            key, size = self._disk.popitem(last=False)
+            self._disk_size -= size
+            self.evictions += 1
+            try:
+                os.remove(self.path(key))
+            except OSError:
+                pass
+
+    def _load_disk_index(self):
+        entries = []
+        if os.path.isdir(self.directory):
+            for root, _, files in os.walk(self.directory):
+                for name in files:
+                    key, dot, extension = name.partition('.')
+                    if not dot or extension != self.extension:
+                        continue
+                    try:
+                        stat = os.stat(os.path.join(root, name))
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, key, stat.st_size))
+
+        for _, key, size in sorted(entries):
+            self._disk[key] = size
+            self._disk_size += size
+        self._evict_disk()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Süreç genelindeki önbellek (ilk kullanımda .env yüklendikten sonra kurulur)"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = TTSCache.from_env()
+    return _cache
@@ -0,0 +1,190 @@
+"""Cümle bazlı TTS hattı: seslendirmeyi LLM üretimiyle paralel yürütür"""
+import os
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import tts
+from audio_files import audio_url
+from turkish_text import SentenceSplitter
+
+# gTTS ağ beklemesi ağırlıklı olduğu için thread havuzu yeterli
+_workers = int(os.getenv('TTS_WORKERS', 4))
+_executor = ThreadPoolExecutor(
+    max_workers=_workers,
+    thread_name_prefix='tts'
+)
+
+
+class SpeechPipeline:
+    """LLM akışını cümlelere bölüp her cümleyi TTS havuzuna gönderir
+
+    run() gelen her parçayı ('chunk', ...) olarak hemen geri verir; hazır olan
+    ses parçalarını ise ('audio', ...) olarak her zaman cümle sırasıyla
+    teslim eder. Böylece ilk cümle, model geri kalanını yazarken çalınabilir.
+    """
+
+    def __init__(self, synthesize_fn=None, min_chars=None):
+        self.synthesize_fn = synthesize_fn or tts.synthesize_with_key
+        self.min_chars = min_chars or int(os.getenv('TTS_MIN_SENTENCE_CHARS', 20))
+
+    def run(self, deltas):
+        splitter = SentenceSplitter(self.min_chars)
+        pending = deque()
+        index = 0
+
+        def submit(sentence):
+            nonlocal index
+            future = _executor.submit(self.synthesize_fn, sentence)
+            pending.append((index, sentence, future))
+            index += 1
+
+        try:
+            for delta in deltas:
+                yield 'chunk', {'delta': delta}
+                for sentence in splitter.feed(delta):
+                    submit(sentence)
+                # Üretimi bekletmeden, sırası gelmiş ve hazır olanları teslim et
+                while pending and pending[0][2].done():
+                    yield 'audio', self._segment(*pending.popleft())
+
+            for sentence in splitter.flush():
+                submit(sentence)
+            while pending:
+                yield 'audio', self._segment(*pending.popleft())
+        finally:
+            # İstemci koptuysa veya LLM hata verdiyse bekleyen işleri iptal et
+            for _, _, future in pending:
+                future.cancel()
+
+    def _segment(self, index, sentence, future):
+        try:
+            key, audio, engine = future.result()
+        except Exception as e:
+            print(f"TTS hatası: {e}")
+            key, audio, engine = None, None, None
+        return {'index': index, 'text': sentence, 'key': key, 'audio': audio, 'engine': engine}
+
+
+def synthesize_segment(index, text, synthesize_fn=None):
+    """Tek bir metni hattın ürettiği biçimde ses parçasına çevir"""
+    try:
+        key, audio, engine = (synthesize_fn or tts.synthesize_with_key)(text)
+    except Exception as e:
+        print(f"TTS hatası: {e}")
+        key, audio, engine = None, None, None
+    return {'index': index, 'text': text, 'key': key, 'audio': audio, 'engine': engine}
+
+
+def batch_window():
+    """Bir toplu istekte aynı anda seslendirilen en fazla metin (TTS_BATCH_CONCURRENCY)"""
+    return int(os.getenv('TTS_BATCH_CONCURRENCY', 0)) or _workers
+
+
+def synthesize_batch(texts, synthesize_fn=None, window=None):
+    """Metin listesini seslendir; (sıra, metin, anahtar, motor, hata) öğelerini girdi sırasıyla ver
+
+    Aynı metin bir kez seslendirilir. Benzersiz metinler TTS havuzuna en
+    fazla window tanesi aynı anda çalışacak şekilde gönderilir; sıradaki öğe
+    beklenirken pencere dolu tutulur, böylece toplam süre en yavaş öğeye
+    yaklaşır. Okuma yarıda bırakılırsa bekleyen işler iptal edilir.
+    """
+    synthesize_fn = synthesize_fn or tts.synthesize_with_key
+    window = window or batch_window()
+    unique = list(dict.fromkeys(texts))
+    futures = {}
+    submitted = 0
+
+    def running():
+        return [future for future in futures.values() if not future.done()]
+
+    def fill():
+        nonlocal submitted
+        active = len(running())
+        while submitted < len(unique) and active < window:
+            futures[unique[submitted]] = _executor.submit(synthesize_fn, unique[submitted])
+            submitted += 1
+            active += 1
+
+    try:
+        for index, text in enumerate(texts):
+            fill()
+            while text not in futures or not futures[text].done():
+                wait(running(), return_when=FIRST_COMPLETED)
+                fill()
+            try:
+                key, _, engine = futures[text].result()
+                yield index, text, key, engine, None
+            except Exception as e:
+                print(f"TTS hatası: {e}")
+                yield index, text, None, None, str(e)
+    finally:
+        for future in futures.values():
+            future.cancel()
+
+
+def batch_texts(texts):
+    """İstekteki metin listesini doğrula; hatalıysa ValueError"""
+    max_items = int(os.getenv('TTS_BATCH_MAX_ITEMS', 100))
+    if not isinstance(texts, list) or not texts:
+        raise ValueError("texts boş olmayan bir liste olmalı")
+    if len(texts) > max_items:
+        raise ValueError(f"Tek istekte en fazla {max_items} metin seslendirilebilir")
+    if not all(isinstance(text, str) and text.strip() for text in texts):
+        raise ValueError("texts yalnızca boş olmayan metinler içermeli")
+    return texts
+
+
+def batch_events(texts, synthesize_fn=None):
+    """Toplu seslendirme olayları: her metin için sırayla 'item', en sonda 'done'"""
+    failed = 0
+    engines = []
+    for index, text, key, engine, error in synthesize_batch(texts, synthesize_fn):
+        item = {'index': index, 'text': text, 'audio_url': audio_url(key), 'tts_engine': engine}
+        if error is not None:
+            item['error'] = error
+            failed += 1
+        engines.append(engine)
+        yield 'item', item
+    yield 'done', {
+        'count': len(texts),
+        'unique': len(set(texts)),
+        'failed': failed,
+        'tts_engine': tts.engines_label(engines)
+    }
+
+
+def encode_segment(segment):
+    """Ses parçasını JSON/socket ile gönderilebilir hale getir (baytlar yerine URL)"""
+    return {
+        'index': segment['index'],
+        'text': segment['text'],
+        'audio_url': audio_url(segment['key']),
+        'tts_engine': segment['engine']
+    }
+
+
+def speak(deltas, synthesize_fn=None):
+    """Akışı sonuna kadar işle; (tam metin, birleştirilmiş sesin anahtarı, motor) döndür
+
+    MP3 parçaları tek kayıt olarak saklanır ve tek dosya gibi çalınabilir
+    (biçimleri farklıysa yeniden kodlanır, bkz. tts.store_concat). Herhangi
+    bir cümle seslendirilemezse eksik ses yerine None döner. Motor, sesi gerçekten üreten motor(lar)dır (tts.engines_label).
+    """
+    parts = []
+    segments = []
+    for event, payload in SpeechPipeline(synthesize_fn).run(deltas):
+        if event == 'chunk':
+            parts.append(payload['delta'])
+        else:
+            segments.append(payload)
+
+    key = engine = None
+    if segments and all(segment['key'] for segment in segments):
+        key = tts.store_concat(
+            [segment['key'] for segment in segments],
+            [segment['audio'] for segment in segments],
+            [segment['engine'] for segment in segments]
+        )
+        if key is not None:
+            engine = tts.engines_label(segment['engine'] for segment in segments)
+    return ''.join(parts), key, engine
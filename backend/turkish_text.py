@@ -0,0 +1,108 @@
+"""Türkçe metin işleme yardımcıları"""
+
+# Cümle sonu sayılan noktalama işaretleri
+TERMINATORS = '.!?…'
+# Cümle sonundan sonra gelebilecek kapanış karakterleri
+CLOSERS = '"\'”’)»'
+# Noktayla biten ama cümleyi bitirmeyen kısaltmalar (noktasız, küçük harf)
+ABBREVIATIONS = {
+    'dr', 'prof', 'doç', 'yrd', 'av', 'alb', 'gen', 'org', 'sn', 'st',
+    'vb', 'vs', 'örn', 'ör', 'bkz', 'bk', 'çev', 'haz', 'yy', 'no',
+    'mö', 'ms', 'hz', 'bl'
+}
+
+
+def turkish_lower(text):
+    """Noktalı/noktasız i kurallarına uygun küçük harfe çevir"""
+    return text.replace('I', 'ı').replace('İ', 'i').lower()
+
+
+class SentenceSplitter:
+    """Parça parça gelen metni tam cümlelere böler
+
+    Bir noktanın cümleyi bitirip bitirmediğine ancak ardından gelen karakter
+    görülünce karar verilebildiği için son parça, yeni metin gelene veya
+    flush() çağrılana kadar tamponda bekler. min_chars'tan kısa cümleler bir
+    sonrakiyle birleştirilir, böylece TTS'e çok kısa istekler gitmez.
+    """
+
+    def __init__(self, min_chars=20):
+        self.min_chars = min_chars
+        self.buffer = ''
+        self.pending = ''
+
+    def feed(self, text):
+        """Yeni metni ekle, tamamlanan cümleleri döndür"""
+        self.buffer += text
+        buffer = self.buffer
+        n = len(buffer)
+        sentences = []
+        start = 0
+        i = 0
+
+        while i < n:
+            ch = buffer[i]
+            if ch == '\n':
+                sentences.append(buffer[start:i + 1])
+                start = i + 1
+                i += 1
+                continue
+            if ch not in TERMINATORS:
+                i += 1
+                continue
+
+            j = i
+            while j < n and buffer[j] in TERMINATORS:
+                j += 1
+            while j < n and buffer[j] in CLOSERS:
+                j += 1
+            k = j
+            while k < n and buffer[k] in ' \t':
+                k += 1
+
+            if k >= n:
+                # Karar vermek için sonraki karakteri beklemek gerekiyor
+                break
+            if k > j and self._is_boundary(buffer, start, i, buffer[k]):
+                sentences.append(buffer[start:j])
+                start = j
+            i = max(k, i + 1)
+
+        self.buffer = buffer[start:]
+        return self._merge(sentences)
+
+    def flush(self):
+        """Akış bittiğinde tamponda kalan metni döndür"""
+        rest = (self.pending + self.buffer).strip()
+        self.pending = ''
+        self.buffer = ''
+        return [rest] if rest else []
+
+    def _is_boundary(self, buffer, start, i, next_char):
+        if buffer[i] in '!?':
+            return True
+
+        # Noktadan önceki kelime: "Dr.", "M.Ö.", "15." gibi durumlar
+        word_start = i
+        while word_start > start and not buffer[word_start - 1].isspace():
+            word_start -= 1
+        word = buffer[word_start:i].lstrip('("\'')
+
+        if turkish_lower(word).replace('.', '') in ABBREVIATIONS:
+            return False
+        if len(word) == 1 and word.isalpha() and word.isupper():
+            # Baş harf: "Mustafa K. Atatürk"
+            return False
+        if word and word[-1].isdigit():
+            # Sıra sayısı: "15. yüzyıl" bölünmez, "1453. Sonra" bölünür
+            return next_char.isupper()
+        return not next_char.islower()
+
+    def _merge(self, sentences):
+        merged = []
+        for sentence in sentences:
+            self.pending += sentence
+            if len(self.pending.strip()) >= self.min_chars:
+                merged.append(self.pending.strip())
+                self.pending = ''
+        return merged
@@ -0,0 +1,197 @@
+"""Açılıştan sonra tahmin edilebilir içeriği önceden hazırlama (warm-up)
+
+Figür selamlamaları, yedek yanıtlar, quiz ve zaman çizelgesi metinleri her
+dağıtımdan sonra ilk istekte üretiliyordu. Warmup bunları açılıştan kısa
+süre sonra tek bir arka plan thread'inde sırayla hazırlar:
+- tts: metinleri seslendirip TTS önbelleğine yazar
+- model: her figür için bir kısa üretimle süreç içindeki modeli ve
+  önbelleklerini ısıtır; uzak arka uçlar (ücretli API, ayrı sunucu) yalnızca
+  WARMUP_PRIME_MODEL=true ile ısıtılır
+
+Düşük öncelikle çalışır: thread'in nice değeri yükseltilir ve gerçek
+istekler çalışırken (busy_fn) en fazla max_defer saniye beklenir. İlerleme
+stats() ile /ready üzerinden izlenir.
+"""
+import json
+import os
+import threading
+import time
+
+import metrics
+import tts
+
+WARMUP_ITEMS = metrics.counter('warmup_items_total', 'Warm-up adımları', ['kind', 'result'])
+WARMUP_SECONDS = metrics.histogram('warmup_item_seconds', 'Warm-up adımının süresi', ['kind'])
+
+DEFAULT_WARMUP_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'warmup.json')
+PRIME_MESSAGE = "Merhaba"
+
+
+def load_texts(path=DEFAULT_WARMUP_FILE):
+    """Figür kimliği -> seslendirilecek sabit metinler (selamlama, quiz, zaman çizelgesi)"""
+    try:
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"❌ Warm-up metinleri okunamadı ({path}): {e}")
+        return {}
+    return {
+        figure_id: [entry['greeting']] + entry.get('quiz', []) + entry.get('timeline', [])
+        for figure_id, entry in data.items()
+    }
+
+
+def prime_llm(stream_fn, figure):
+    """Figürün sistem prompt'uyla bir kısa üretim yap
+
+    stream_fn bir arka ucun stream'idir; yönlendirici ve yanıt önbelleği
+    atlanır, böylece ısıtma yönlendiricinin gecikme/hata istatistiklerine girmez.
+    """
+    return sum(len(delta) for delta in stream_fn(figure, PRIME_MESSAGE, []))
+
+
+def prime_enabled(local):
+    """WARMUP_PRIME_MODEL verilmişse o; yoksa yalnızca süreç içi modeller ısıtılır"""
+    setting = os.getenv('WARMUP_PRIME_MODEL', '').lower()
+    return setting == 'true' if setting else local
+
+
+class Warmup:
+    """Sıralı warm-up adımlarını düşük öncelikli bir thread'de çalıştırır"""
+
+    def __init__(self, enabled=True, delay=5.0, pause=0.05, max_defer=30.0, nice=10, busy_fn=None):
+        self.enabled = enabled
+        self.delay = delay
+        self.pause = pause
+        self.max_defer = max_defer
+        self.nice = nice
+        self.busy_fn = busy_fn or (lambda: False)
+
+        self._lock = threading.Lock()
+        self._steps = []
+        self._thread = None
+
+        self.state = 'pending' if enabled else 'disabled'
+        self.current = None
+        self.completed = 0
+        self.skipped = 0
+        self.failed = 0
+        self.by_kind = {}
+        self.started_at = None
+        self.finished_at = None
+
+    @classmethod
+    def from_env(cls, busy_fn=None):
+        """Ayarları ortam değişkenlerinden oku"""
+        return cls(
+            enabled=os.getenv('WARMUP_ENABLED', 'true').lower() == 'true',
+            delay=float(os.getenv('WARMUP_DELAY_SECONDS', 5)),
+            pause=float(os.getenv('WARMUP_PAUSE_SECONDS', 0.05)),
+            max_defer=float(os.getenv('WARMUP_MAX_DEFER_SECONDS', 30)),
+            nice=int(os.getenv('WARMUP_NICE', 10)),
+            busy_fn=busy_fn
+        )
+
+    def add(self, kind, name, fn):
+        """fn()'i warm-up adımı olarak sıraya ekle"""
+        with self._lock:
+            self._steps.append((kind, name, fn))
+            self.by_kind.setdefault(kind, {"total": 0, "completed": 0, "skipped": 0, "failed": 0})["total"] += 1
+        return self
+
+    def add_speech(self, texts, engine=None):
+        """Metinleri (tekrarsız) seslendirip önbelleğe alma adımları"""
+        for text in dict.fromkeys(texts):
+            self.add('tts', text[:60], lambda text=text: tts.synthesize_with_key(text, engine=engine))
+        return self
+
+    def add_figures(self, figures, texts=None, fallback_fn=None, prime_fn=None, prime_local=False, engine=None):
+        """Her figür için selamlama/quiz/zaman çizelgesi ve yedek yanıt sesi, model ısıtma
+
+        prime_fn(figure_id, figure) False dönerse adım atlanmış sayılır (ör.
+        model zamanında yüklenemedi). prime_local: ısıtılacak model süreç içinde mi.
+        """
+        texts = texts if texts is not None else load_texts(os.getenv('WARMUP_FILE') or DEFAULT_WARMUP_FILE)
+        for figure_id, figure in figures.items():
+            speech = list(texts.get(figure_id, []))
+            if fallback_fn is not None:
+                speech.append(fallback_fn(figure))
+            self.add_speech(speech, engine)
+        if prime_fn is not None and prime_enabled(prime_local):
+            for figure_id, figure in figures.items():
+                self.add('model', figure_id, lambda figure_id=figure_id, figure=figure: prime_fn(figure_id, figure))
+        return self
+
+    def start(self):
+        """delay saniye sonra adımları çalıştıracak thread'i başlat"""
+        if self.enabled and self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='warmup', daemon=True)
+            self._thread.start()
+        return self
+
+    def _lower_priority(self):
+        # Linux'ta nice değeri thread bazındadır; başlatılan alt süreçler
+        # (espeak-ng, ffmpeg) de bu değeri devralır
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), self.nice)
+        except (AttributeError, OSError):
+            pass
+
+    def _wait_idle(self):
+        deadline = time.monotonic() + self.max_defer
+        while self.busy_fn() and time.monotonic() < deadline:
+            time.sleep(0.5)
+
+    def _run(self):
+        time.sleep(self.delay)
+        self._lower_priority()
+        with self._lock:
+            self.state = 'running'
+            self.started_at = time.time()
+            steps = list(self._steps)
+        print(f"🔥 Warm-up başladı: {len(steps)} adım")
+
+        for kind, name, fn in steps:
+            self._wait_idle()
+            self.current = f"{kind}:{name}"
+            started = time.perf_counter()
+            try:
+                result = 'skipped' if fn() is False else 'completed'
+            except Exception as e:
+                print(f"❌ Warm-up adımı başarısız ({kind}: {name}): {e}")
+                result = 'failed'
+            WARMUP_SECONDS.observe(time.perf_counter() - started, kind=kind)
+            WARMUP_ITEMS.inc(kind=kind, result=result)
+            with self._lock:
+                setattr(self, result, getattr(self, result) + 1)
+                self.by_kind[kind][result] += 1
+            time.sleep(self.pause)
+
+        with self._lock:
+            self.state = 'done'
+            self.current = None
+            self.finished_at = time.time()
+        print(f"✅ Warm-up tamamlandı: {self.completed} adım, {self.skipped} atlandı, {self.failed} hata "
+              f"({self.finished_at - self.started_at:.1f} sn)")
+
+    @property
+    def ready(self):
+        """Warm-up bitti mi (kapalıysa her zaman hazır); hatalı adımlar beklemez"""
+        return self.state in ('done', 'disabled')
+
+    def stats(self):
+        with self._lock:
+            total = len(self._steps)
+            return {
+                "state": self.state,
+                "ready": self.ready,
+                "total": total,
+                "completed": self.completed,
+                "failed": self.failed,
+                "skipped": self.skipped,
+                "progress": (self.completed + self.skipped + self.failed) / total if total else 1.0,
+                "current": self.current,
+                "by_kind": {kind: dict(counts) for kind, counts in self.by_kind.items()},
+                "started_at": self.started_at,
+                "finished_at": self.finished_at
+            }
@@ -13,6 +13,28 @@ interface ChatInterfaceProps {
   onSpeakingChange?: (v: boolean) => void;
 }
 
+// Tarayıcının çalabildiği en küçük biçim: Opus (Ogg, sonra WebM), yoksa düşük bit hızlı mono MP3
+const preferredAudioFormat = (() => {
+  const probe = typeof Audio !== 'undefined' ? new Audio() : null;
+  if (probe?.canPlayType('audio/ogg; codecs="opus"')) return 'format=ogg&bitrate=24k';
+  if (probe?.canPlayType('audio/webm; codecs="opus"')) return 'format=webm&bitrate=24k';
+  return 'format=mp3&bitrate=32k';
+})();
+
+// Backend sesleri /api/audio/<hash> yolu olarak döndürür
+const resolveAudioUrl = (audioUrl?: string | null) =>
+  audioUrl ? `http://localhost:5000${audioUrl}?${preferredAudioFormat}` : undefined;
+
+// Backend sohbet geçmişini bu tarayıcıya özgü oturum kimliğiyle saklar
+const getChatSessionId = () => {
+  let sessionId = localStorage.getItem('chat_session_id');
+  if (!sessionId) {
+    sessionId = `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
+    localStorage.setItem('chat_session_id', sessionId);
+  }
+  return sessionId;
+};
+
 const ChatInterface: React.FC<ChatInterfaceProps> = ({
   figure,
   socket,
@@ -24,6 +46,7 @@ const ChatInterface: React.FC<ChatInterfaceProps> = ({
   const [messages, setMessages] = useState<ChatMessage[]>([]);
   const [inputMessage, setInputMessage] = useState('');
   const [isLoading, setIsLoading] = useState(false);
+  const [queuePosition, setQueuePosition] = useState<number | null>(null);
   const [isListening, setIsListening] = useState(false);
   const [isAvatarSpeaking, setIsAvatarSpeaking] = useState(false);
   const [messageCount, setMessageCount] = useState(0);
@@ -104,14 +127,15 @@ const ChatInterface: React.FC<ChatInterfaceProps> = ({
           isUser: false,
           timestamp: new Date(),
           figureName: data.figure_name,
-          audioUrl: data.audio
+          audioUrl: resolveAudioUrl(data.audio_url)
         };
         setMessages(prev => [...prev, newMessage]);
         setIsLoading(false);
+        setQueuePosition(null);
 
         // Auto-play TTS if available and drive speaking state by playback
-        if (data.audio) {
-          const audio = new Audio(`data:audio/mp3;base64,${data.audio}`);
+        if (data.audio_url) {
+          const audio = new Audio(resolveAudioUrl(data.audio_url));
           audioRef.current = audio;
           setIsAvatarSpeaking(true);
           onSpeakingChange?.(true);
@@ -225,15 +249,27 @@ const ChatInterface: React.FC<ChatInterfaceProps> = ({
         }
       });
 
+      // Sunucu yoğunken istek kuyrukta bekler
+      socket.on('queue_position', (data) => {
+        setQueuePosition(data.position);
+      });
+
+      socket.on('ai_response_chunk', () => {
+        setQueuePosition(null);
+      });
+
       socket.on('error', (data) => {
         console.error('Socket error:', data.message);
         setIsLoading(false);
+        setQueuePosition(null);
       });
     }
 
     return () => {
       if (socket) {
         socket.off('ai_response');
+        socket.off('queue_position');
+        socket.off('ai_response_chunk');
         socket.off('error');
       }
     };
@@ -258,7 +294,8 @@ const ChatInterface: React.FC<ChatInterfaceProps> = ({
     if (socket && isConnected) {
       socket.emit('chat_message', {
         figure_id: figure.id,
-        message: messageToSend
+        message: messageToSend,
+        session_id: getChatSessionId()
       });
     } else {
       // Fallback: HTTP API kullan
@@ -270,7 +307,8 @@ const ChatInterface: React.FC<ChatInterfaceProps> = ({
           },
           body: JSON.stringify({
             figure_id: figure.id,
-            message: messageToSend
+            message: messageToSend,
+            session_id: getChatSessionId()
           })
         });
 
@@ -282,7 +320,7 @@ const ChatInterface: React.FC<ChatInterfaceProps> = ({
             isUser: false,
             timestamp: new Date(),
             figureName: data.figure_name,
-            audioUrl: data.audio
+            audioUrl: resolveAudioUrl(data.audio_url)
           };
           setMessages(prev => [...prev, aiMessage]);
           
@@ -357,8 +395,8 @@ const ChatInterface: React.FC<ChatInterfaceProps> = ({
     }
   };
 
-  const playAudio = (audioBase64: string) => {
-    const audio = new Audio(`data:audio/mp3;base64,${audioBase64}`);
+  const playAudio = (audioUrl: string) => {
+    const audio = new Audio(audioUrl);
     audioRef.current = audio;
     setIsAvatarSpeaking(true);
     onSpeakingChange?.(true);
@@ -482,7 +520,9 @@ const ChatInterface: React.FC<ChatInterfaceProps> = ({
             <div className="bg-gray-100 text-gray-800 px-4 py-2 rounded-lg">
               <div className="flex items-center space-x-2">
                 <div className="animate-spin rounded-full h-4 w-4 border-b-2 border-gray-600"></div>
-                <span className="text-sm">Düşünüyor...</span>
+                <span className="text-sm">
+                  {queuePosition ? `Sırada bekliyor (${queuePosition}. sıra)...` : 'Düşünüyor...'}
+                </span>
               </div>
             </div>
           </div>
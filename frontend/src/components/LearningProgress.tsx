@@ -4,6 +4,7 @@ import { Card, CardContent, CardHeader, CardTitle } from './ui/card';
 import { Badge } from './ui/badge';
 import { Progress } from './ui/progress';
 import { useAuth } from '../contexts/AuthContext';
+import ApiService from '../services/api';
 import { 
   ChartBarIcon, 
   TrophyIcon,
@@ -80,6 +81,8 @@ const LearningProgress: React.FC<LearningProgressProps> = ({
     const updatedData = { ...progressData, ...updates };
     setProgressData(updatedData);
     localStorage.setItem(`progress_${user.id}_${character.id}`, JSON.stringify(updatedData));
+    // Sunucuya yalnızca değişen alanlar gider; cihaz değişince ilerleme korunur
+    ApiService.updateProgress(character.id, updates).catch(() => {});
   };
 
   // Çalışma oturumu ekle
@@ -184,6 +187,18 @@ const LearningProgress: React.FC<LearningProgressProps> = ({
       setProgressData(initialData);
       localStorage.setItem(`progress_${user.id}_${character.id}`, JSON.stringify(initialData));
     }
+
+    // Sunucudaki ilerleme yerel kopyadan önceliklidir (demo kullanıcılarda null döner)
+    ApiService.getProgress(character.id)
+      .then((data) => {
+        if (!data?.progress) return;
+        setProgressData((current) => {
+          const merged = { ...current, ...data.progress };
+          localStorage.setItem(`progress_${user.id}_${character.id}`, JSON.stringify(merged));
+          return merged;
+        });
+      })
+      .catch(() => {});
   }, [character.id, user]);
 
   const getAccuracy = () => {
@@ -66,6 +66,17 @@ export class ApiService {
     return response.json();
   }
 
+  // Birden çok metni tek istekte seslendir (quiz soruları, notlar, zaman çizelgesi)
+  static async synthesizeBatch(texts: string[], engine?: string) {
+    const response = await fetch(`${API_BASE_URL}/api/tts/batch`, {
+      method: 'POST',
+      headers: this.getAuthHeaders(),
+      body: JSON.stringify({ texts, engine }),
+    });
+
+    return response.json();
+  }
+
   // Progress tracking endpoints
   static async getProgress(figureId: string) {
     const response = await fetch(`${API_BASE_URL}/api/progress/${figureId}`, {